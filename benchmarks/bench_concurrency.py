@@ -0,0 +1,313 @@
+"""
+Prueba de carga del acceso concurrente a la base de datos.
+
+Siembra un catálogo determinista en una base de datos temporal y lanza N
+trabajadores que, durante unos segundos, mezclan lecturas (búsqueda FTS y
+página de categoría) y escrituras (alta y cambio de precio) de
+inventory.crud. Los trabajadores pueden ser hilos de un mismo proceso
+(comparten el pool de conexiones, una conexión por hilo) o procesos
+independientes, como varias instancias de main.py sobre el mismo fichero.
+
+Para cada modo y número de trabajadores informa del rendimiento sostenido
+de lecturas y escrituras, de sus latencias p50/p99, de las transacciones
+repetidas por bloqueo y de los errores, para ver cómo escala al añadir
+trabajadores y que no aparecen errores "database is locked".
+
+Uso:
+    python -m benchmarks.bench_concurrency --workers 1,2,4,8 --output concurrencia.json
+    python -m benchmarks.bench_concurrency --modes processes --busy-timeout 0 --retries 0
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional, Sequence
+
+from benchmarks.bench_crud import (
+    DEFAULT_SEED,
+    Contexto,
+    _git_commit,
+    _percentile,
+    generate_catalog,
+    temp_database
+)
+from inventory import crud, db
+from inventory.schemas import CATEGORIAS_PREDEFINIDAS
+
+# Valores por defecto
+DEFAULT_WORKERS: List[int] = [1, 2, 4, 8]
+DEFAULT_MODES: List[str] = ["threads", "processes"]
+DEFAULT_SIZE: int = 10_000
+DEFAULT_SECONDS: float = 3.0
+DEFAULT_READ_RATIO: float = 0.8
+
+
+def _bucle(
+    ids: Sequence[str],
+    terminos: Sequence[str],
+    segundos: float,
+    read_ratio: float,
+    seed: int
+) -> Dict[str, object]:
+    """
+    Ejecuta operaciones durante 'segundos' y devuelve sus latencias (por
+    separado lecturas y escrituras) y los errores contados.
+    """
+    rng = random.Random(seed)
+    lecturas: List[float] = []
+    escrituras: List[float] = []
+    resultado: Dict[str, object] = {"busy_errors": 0, "errors": 0}
+
+    fin = time.perf_counter() + segundos
+    i = 0
+    while True:
+        t0 = time.perf_counter()
+        if t0 >= fin:
+            break
+        i += 1
+        try:
+            if rng.random() < read_ratio:
+                if rng.random() < 0.5:
+                    crud.search_product(rng.choice(terminos), mode="fts")
+                else:
+                    crud.search_category_page(rng.choice(CATEGORIAS_PREDEFINIDAS), page_size=50)
+                lecturas.append(time.perf_counter() - t0)
+            else:
+                if rng.random() < 0.5:
+                    crud.add_product(rng.choice(CATEGORIAS_PREDEFINIDAS), f"Carga {seed}-{i}", 5.0)
+                else:
+                    crud.update_product(rng.choice(ids), None, None, float(i % 100))
+                escrituras.append(time.perf_counter() - t0)
+        except db.DatabaseBusyError:
+            resultado["busy_errors"] += 1
+        except RuntimeError:
+            resultado["errors"] += 1
+
+    resultado["reads"] = lecturas
+    resultado["writes"] = escrituras
+    return resultado
+
+
+def _trabajador_hilo(barrera, salida: list, *args) -> None:
+    barrera.wait()
+    salida.append(_bucle(*args))
+
+
+def _trabajador_proceso(
+    path: str,
+    busy_timeout_ms: Optional[int],
+    retries: Optional[int],
+    barrera,
+    cola,
+    *args
+) -> None:
+    # Proceso nuevo: abre su propio pool contra el mismo fichero
+    with temp_database(path):
+        db.configure_locking(busy_timeout_ms=busy_timeout_ms, retries=retries)
+        with db.connection():
+            pass
+        barrera.wait()
+        resultado = _bucle(*args)
+        resultado.update(db.lock_stats())
+    cola.put(resultado)
+
+
+def run_workers(
+    mode: str,
+    workers: int,
+    path: str,
+    ids: Sequence[str],
+    terminos: Sequence[str],
+    seconds: float,
+    read_ratio: float,
+    seed: int,
+    busy_timeout_ms: Optional[int] = None,
+    retries: Optional[int] = None
+) -> Dict[str, object]:
+    """
+    Lanza 'workers' hilos o procesos sobre la base de datos de 'path' (que
+    en modo "threads" debe ser ya la del pool) y agrega sus resultados. El
+    tiempo se mide desde que todos están listos hasta que acaba el último.
+    """
+    parciales: List[Dict[str, object]] = []
+
+    if mode == "threads":
+        db.reset_lock_stats()
+        barrera = threading.Barrier(workers + 1)
+        hilos = [
+            threading.Thread(
+                target=_trabajador_hilo,
+                args=(barrera, parciales, ids, terminos, seconds, read_ratio, seed * 1000 + n)
+            )
+            for n in range(workers)
+        ]
+        for hilo in hilos:
+            hilo.start()
+        barrera.wait()
+        inicio = time.perf_counter()
+        for hilo in hilos:
+            hilo.join()
+        total = time.perf_counter() - inicio
+        bloqueos = db.lock_stats()
+
+    elif mode == "processes":
+        # spawn: cada proceso arranca de cero, como una instancia más de main.py
+        contexto = multiprocessing.get_context("spawn")
+        barrera = contexto.Barrier(workers + 1)
+        cola = contexto.Queue()
+        procesos = [
+            contexto.Process(
+                target=_trabajador_proceso,
+                args=(path, busy_timeout_ms, retries, barrera, cola,
+                      ids, terminos, seconds, read_ratio, seed * 1000 + n)
+            )
+            for n in range(workers)
+        ]
+        for proceso in procesos:
+            proceso.start()
+        barrera.wait()
+        inicio = time.perf_counter()
+        parciales = [cola.get() for _ in procesos]
+        total = time.perf_counter() - inicio
+        for proceso in procesos:
+            proceso.join()
+        bloqueos = {
+            clave: sum(p[clave] for p in parciales) for clave in ("retries", "busy_errors")
+        }
+
+    else:
+        raise ValueError(f"Modo no válido: {mode!r}")
+
+    lecturas = [t for p in parciales for t in p["reads"]]
+    escrituras = [t for p in parciales for t in p["writes"]]
+    resultado: Dict[str, object] = {
+        "mode": mode,
+        "workers": workers,
+        "seconds": total,
+        "reads": len(lecturas),
+        "writes": len(escrituras),
+        "reads_per_sec": len(lecturas) / total,
+        "writes_per_sec": len(escrituras) / total,
+        "retries": bloqueos["retries"],
+        "busy_errors": sum(p["busy_errors"] for p in parciales),
+        "errors": sum(p["errors"] for p in parciales),
+    }
+    for nombre, latencias in (("read", lecturas), ("write", escrituras)):
+        resultado[f"{nombre}_p50_ms"] = _percentile(latencias, 0.50) * 1000 if latencias else None
+        resultado[f"{nombre}_p99_ms"] = _percentile(latencias, 0.99) * 1000 if latencias else None
+    return resultado
+
+
+def run(
+    workers: List[int],
+    modes: List[str],
+    size: int = DEFAULT_SIZE,
+    seconds: float = DEFAULT_SECONDS,
+    read_ratio: float = DEFAULT_READ_RATIO,
+    seed: int = DEFAULT_SEED,
+    busy_timeout_ms: Optional[int] = None,
+    retries: Optional[int] = None
+) -> Dict[str, object]:
+    """
+    Siembra el catálogo y mide cada modo con cada número de trabajadores.
+    """
+    resultados: List[Dict[str, object]] = []
+    anteriores = (db.SQLITE_PRAGMAS["busy_timeout"], db.LOCK_RETRIES)
+
+    with tempfile.TemporaryDirectory(prefix="inventory-bench-") as carpeta:
+        path = os.path.join(carpeta, "bench.db")
+        with temp_database(path):
+            db.configure_locking(busy_timeout_ms=busy_timeout_ms, retries=retries)
+            try:
+                crud.add_products(generate_catalog(size, seed))
+                ctx = Contexto(size, seed, muestras=1000)
+
+                for mode in modes:
+                    for n in workers:
+                        medidas = run_workers(
+                            mode, n, path, ctx.ids, ctx.terminos, seconds, read_ratio, seed,
+                            busy_timeout_ms, retries
+                        )
+                        resultados.append(medidas)
+                        print(
+                            f"{mode:9s} x{n:<3d} lecturas {medidas['reads_per_sec']:8.1f}/s "
+                            f"escrituras {medidas['writes_per_sec']:7.1f}/s  "
+                            f"p99 escritura {medidas['write_p99_ms'] or 0:8.2f} ms  "
+                            f"reintentos {medidas['retries']}  "
+                            f"bloqueos {medidas['busy_errors']}  errores {medidas['errors']}",
+                            file=sys.stderr
+                        )
+            finally:
+                db.configure_locking(busy_timeout_ms=anteriores[0], retries=anteriores[1])
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "seed": seed,
+            "size": size,
+            "seconds": seconds,
+            "read_ratio": read_ratio,
+            "busy_timeout_ms": db.SQLITE_PRAGMAS["busy_timeout"] if busy_timeout_ms is None else busy_timeout_ms,
+            "retries": db.LOCK_RETRIES if retries is None else retries,
+        },
+        "results": resultados,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.bench_concurrency",
+        description="Carga concurrente de lecturas y escrituras sobre una base de datos temporal."
+    )
+    parser.add_argument("--workers", default=",".join(str(n) for n in DEFAULT_WORKERS),
+                        help="Números de trabajadores separados por comas (por defecto 1,2,4,8).")
+    parser.add_argument("--modes", default=",".join(DEFAULT_MODES),
+                        help="threads, processes o ambos separados por comas.")
+    parser.add_argument("--size", type=int, default=DEFAULT_SIZE,
+                        help="Productos del catálogo sembrado.")
+    parser.add_argument("--seconds", type=float, default=DEFAULT_SECONDS,
+                        help="Duración de cada medida.")
+    parser.add_argument("--read-ratio", type=float, default=DEFAULT_READ_RATIO,
+                        help="Proporción de lecturas (por defecto 0.8).")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--busy-timeout", type=int, default=None,
+                        help="PRAGMA busy_timeout en ms (por defecto, el de inventory.db).")
+    parser.add_argument("--retries", type=int, default=None,
+                        help="Reintentos tras un bloqueo (por defecto, los de inventory.db).")
+    parser.add_argument("--output", "-o", default=None,
+                        help="Fichero JSON de salida (por defecto, salida estándar).")
+    args = parser.parse_args(argv)
+
+    documento = run(
+        [int(n) for n in args.workers.split(",") if n.strip()],
+        [m.strip() for m in args.modes.split(",") if m.strip()],
+        size=args.size,
+        seconds=args.seconds,
+        read_ratio=args.read_ratio,
+        seed=args.seed,
+        busy_timeout_ms=args.busy_timeout,
+        retries=args.retries,
+    )
+    texto = json.dumps(documento, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(texto + "\n")
+    else:
+        print(texto)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,394 @@
+"""
+Benchmarks del módulo inventory.crud.
+
+Para cada tamaño de catálogo crea una base de datos temporal con datos
+deterministas (misma semilla -> mismos nombres, precios y categorías),
+mide cada función de crud y varias cargas mixtas de lectura/escritura, y
+escribe los resultados en JSON para poder compararlos entre commits.
+
+Como en los tests, la base de datos real no se toca: se sustituye
+`inventory.db.get_connection` con monkeypatch por una fábrica que abre el
+fichero temporal.
+
+Uso:
+    python -m benchmarks.bench_crud --sizes 1000,100000,1000000 --output bench.json
+    python -m benchmarks.bench_crud --compare base.json bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import pytest
+
+from inventory import crud, db
+from inventory.models import decode_product_id
+from inventory.schemas import CATEGORIAS_PREDEFINIDAS
+
+# Valores por defecto
+DEFAULT_SIZES: List[int] = [1_000, 100_000, 1_000_000]
+DEFAULT_SEED: int = 1234
+DEFAULT_OPS: int = 200           # operaciones máximas por benchmark
+DEFAULT_MAX_SECONDS: float = 3.0  # tiempo máximo por benchmark
+MIN_OPS: int = 5                 # operaciones mínimas aunque se agote el tiempo
+
+# Vocabulario para generar nombres realistas y términos de búsqueda
+ADJETIVOS: List[str] = [
+    "Clásico", "Integral", "Natural", "Premium", "Mini", "Extra", "Ligero", "Eco",
+]
+SUSTANTIVOS: List[str] = [
+    "Café", "Galleta", "Zumo", "Cable", "Cuaderno", "Lápiz", "Agua", "Cargador",
+    "Queso", "Carpeta", "Refresco", "Auriculares",
+]
+
+
+def generate_catalog(size: int, seed: int) -> Iterator[Tuple[str, str, float]]:
+    """
+    Genera 'size' productos (category, name, price) de forma determinista.
+    """
+    rng = random.Random(seed)
+    for i in range(size):
+        categoria = rng.choice(CATEGORIAS_PREDEFINIDAS)
+        nombre = f"{rng.choice(SUSTANTIVOS)} {rng.choice(ADJETIVOS)} {i}"
+        precio = round(rng.uniform(1.0, 100.0), 2)
+        yield categoria, nombre, precio
+
+
+@contextmanager
+def temp_database(path: str) -> Iterator[None]:
+    """
+    Redirige inventory.db.get_connection a 'path' (igual que el fixture de
+    los tests) e inicializa allí el esquema.
+    """
+    def get_bench_connection() -> sqlite3.Connection:
+        conn = sqlite3.connect(path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        db.close_pool()
+        monkeypatch.setattr(db, "get_connection", get_bench_connection)
+        try:
+            db._initialize_database()
+            yield
+        finally:
+            db.close_pool()
+
+
+def _percentile(valores: List[float], q: float) -> float:
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, max(0, round(q * (len(ordenados) - 1))))
+    return ordenados[indice]
+
+
+def measure(
+    operacion: Callable[[int], object],
+    max_ops: int,
+    max_seconds: float
+) -> Dict[str, float]:
+    """
+    Ejecuta operacion(i) hasta 'max_ops' veces (o hasta agotar 'max_seconds',
+    con un mínimo de MIN_OPS) y devuelve rendimiento y latencias.
+    """
+    latencias: List[float] = []
+    inicio = time.perf_counter()
+    limite = inicio + max_seconds
+    for i in range(max_ops):
+        t0 = time.perf_counter()
+        operacion(i)
+        t1 = time.perf_counter()
+        latencias.append(t1 - t0)
+        if t1 > limite and len(latencias) >= MIN_OPS:
+            break
+    total = time.perf_counter() - inicio
+
+    return {
+        "ops": len(latencias),
+        "seconds": total,
+        "ops_per_sec": len(latencias) / total if total else 0.0,
+        "p50_ms": _percentile(latencias, 0.50) * 1000,
+        "p99_ms": _percentile(latencias, 0.99) * 1000,
+        "max_ms": max(latencias) * 1000,
+    }
+
+
+class Contexto:
+    """
+    Datos auxiliares de un catálogo ya sembrado: ids de muestra y términos
+    de búsqueda, elegidos de forma determinista.
+    """
+
+    def __init__(self, size: int, seed: int, muestras: int) -> None:
+        self.size = size
+        self.rng = random.Random(seed + 1)
+        # Los rowid se asignan en orden al sembrar: 1..size
+        rowids = self.rng.sample(range(1, size + 1), min(muestras, size))
+        with db.connection() as conn:
+            self.ids: List[str] = []
+            for inicio in range(0, len(rowids), 500):
+                bloque = rowids[inicio:inicio + 500]
+                marcas = ",".join("?" * len(bloque))
+                filas = conn.execute(
+                    f"SELECT id FROM products WHERE rowid IN ({marcas}) ORDER BY rowid;",
+                    bloque
+                ).fetchall()
+                self.ids.extend(decode_product_id(fila[0]) for fila in filas)
+        self.terminos = [
+            self.rng.choice(SUSTANTIVOS) + " " + self.rng.choice(ADJETIVOS)
+            for _ in range(50)
+        ]
+        self.nombres_exactos = [
+            f"{self.rng.randrange(size)}" for _ in range(50)
+        ]
+
+    def id(self, i: int) -> str:
+        return self.ids[i % len(self.ids)]
+
+    def categoria(self, i: int) -> str:
+        return CATEGORIAS_PREDEFINIDAS[i % len(CATEGORIAS_PREDEFINIDAS)]
+
+
+def crud_benchmarks(ctx: Contexto) -> Dict[str, Callable[[int], object]]:
+    """
+    Una operación por función de crud. Las lecturas van primero y los
+    borrados al final, para alterar lo menos posible el catálogo medido.
+    """
+    def pagina_categoria(i: int) -> object:
+        return crud.search_category_page(ctx.categoria(i), page_size=50, order_by="price")
+
+    def pagina_categoria_profunda(i: int) -> object:
+        # Segunda página tras avanzar: coste de "página N" con keyset
+        pagina, cursor = crud.search_category_page(ctx.categoria(i), page_size=50)
+        return crud.search_category_page(ctx.categoria(i), page_size=50, cursor=cursor)
+
+    def primeros_de_iter(i: int) -> object:
+        # Tiempo hasta los 50 primeros resultados en streaming
+        iterador = crud.iter_search_category(ctx.categoria(i))
+        resultado = [p for _, p in zip(range(50), iterador)]
+        iterador.close()
+        return resultado
+
+    return {
+        # Lecturas primero, sobre el catálogo recién sembrado
+        "search_product_like": lambda i: crud.search_product(ctx.nombres_exactos[i % 50]),
+        "search_product_fts": lambda i: crud.search_product(
+            ctx.terminos[i % 50], mode="fts"
+        ),
+        "search_category": lambda i: crud.search_category(ctx.categoria(i)),
+        "search_category_compact": lambda i: crud.search_category(
+            ctx.categoria(i), compact=True
+        ),
+        "iter_search_category_first50": primeros_de_iter,
+        "search_product_page": lambda i: crud.search_product_page(
+            ctx.terminos[i % 50], page_size=50, mode="fts"
+        ),
+        "search_category_page": pagina_categoria,
+        "search_category_page_2": pagina_categoria_profunda,
+        "get_categories": lambda i: crud.get_categories(),
+        # Después las escrituras
+        "add_product": lambda i: crud.add_product(ctx.categoria(i), f"Bench {i}", 9.99),
+        "add_products_x1000": lambda i: crud.add_products(
+            (ctx.categoria(j), f"Bulk {i}-{j}", 1.0) for j in range(1000)
+        ),
+        "update_product": lambda i: crud.update_product(ctx.id(i), None, None, float(i % 100)),
+        "update_product_category": lambda i: crud.update_product(
+            ctx.id(i), ctx.categoria(i + 1), None, None
+        ),
+        "update_products_x1000": lambda i: crud.update_products(
+            (ctx.id(i * 1000 + j), None, None, float(j % 100)) for j in range(1000)
+        ),
+        "delete_product": lambda i: crud.delete_product(ctx.id(i)),
+    }
+
+
+def mixed_benchmark(ctx: Contexto, read_ratio: float) -> Callable[[int], object]:
+    """
+    Carga mixta: en cada operación se elige, con un generador determinista,
+    una lectura (búsqueda FTS, página de categoría o recuentos) con
+    probabilidad 'read_ratio' o una escritura (alta o cambio de precio).
+    """
+    rng = random.Random(int(read_ratio * 1000))
+    lecturas: List[Callable[[int], object]] = [
+        lambda i: crud.search_product(ctx.terminos[i % 50], mode="fts"),
+        lambda i: crud.search_category_page(ctx.categoria(i), page_size=50),
+        lambda i: crud.get_categories(),
+    ]
+    escrituras: List[Callable[[int], object]] = [
+        lambda i: crud.add_product(ctx.categoria(i), f"Mixto {i}", 5.0),
+        lambda i: crud.update_product(ctx.id(i), None, None, float(i % 50)),
+    ]
+
+    def operacion(i: int) -> object:
+        if rng.random() < read_ratio:
+            return rng.choice(lecturas)(i)
+        return rng.choice(escrituras)(i)
+
+    return operacion
+
+
+def run_size(
+    size: int,
+    seed: int,
+    max_ops: int,
+    max_seconds: float,
+    solo: Optional[List[str]] = None
+) -> List[Dict[str, object]]:
+    """
+    Siembra un catálogo de 'size' productos en un fichero temporal y mide
+    todos los benchmarks sobre él.
+    """
+    resultados: List[Dict[str, object]] = []
+
+    with tempfile.TemporaryDirectory(prefix="inventory-bench-") as carpeta:
+        path = os.path.join(carpeta, "bench.db")
+        with temp_database(path):
+            inicio = time.perf_counter()
+            crud.add_products(generate_catalog(size, seed))
+            sembrado = time.perf_counter() - inicio
+            with db.connection() as conn:
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE);")
+            resultados.append({
+                "size": size, "benchmark": "seed_add_products",
+                "ops": size, "seconds": sembrado,
+                "ops_per_sec": size / sembrado if sembrado else 0.0,
+                "db_bytes": os.path.getsize(path),
+            })
+            print(f"[{size}] sembrado en {sembrado:.2f} s", file=sys.stderr)
+
+            ctx = Contexto(size, seed, muestras=max(max_ops, 1000))
+            benchmarks = dict(crud_benchmarks(ctx))
+            for ratio in (0.95, 0.50):
+                benchmarks[f"mixed_{int(ratio * 100)}r_{100 - int(ratio * 100)}w"] = \
+                    mixed_benchmark(ctx, ratio)
+            # Los borrados, al final
+            benchmarks["delete_product"] = benchmarks.pop("delete_product")
+
+            for nombre, operacion in benchmarks.items():
+                if solo and nombre not in solo:
+                    continue
+                medidas = measure(operacion, max_ops, max_seconds)
+                resultados.append({"size": size, "benchmark": nombre, **medidas})
+                print(
+                    f"[{size}] {nombre:32s} {medidas['ops_per_sec']:10.1f} ops/s "
+                    f"p50 {medidas['p50_ms']:8.3f} ms  p99 {medidas['p99_ms']:8.3f} ms",
+                    file=sys.stderr
+                )
+
+    return resultados
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def run(
+    sizes: List[int],
+    seed: int = DEFAULT_SEED,
+    max_ops: int = DEFAULT_OPS,
+    max_seconds: float = DEFAULT_MAX_SECONDS,
+    solo: Optional[List[str]] = None
+) -> Dict[str, object]:
+    """
+    Ejecuta la suite para cada tamaño y devuelve el documento de resultados.
+    """
+    resultados: List[Dict[str, object]] = []
+    for size in sizes:
+        resultados.extend(run_size(size, seed, max_ops, max_seconds, solo))
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "seed": seed,
+            "sizes": sizes,
+            "max_ops": max_ops,
+            "max_seconds": max_seconds,
+        },
+        "results": resultados,
+    }
+
+
+def compare(base: Dict[str, object], nuevo: Dict[str, object]) -> List[str]:
+    """
+    Compara dos documentos de resultados y devuelve una línea por benchmark
+    común con el cambio de rendimiento y de p99.
+    """
+    def indexar(doc):
+        return {(r["size"], r["benchmark"]): r for r in doc["results"]}
+
+    antes, despues = indexar(base), indexar(nuevo)
+    lineas = []
+    for clave in sorted(antes.keys() & despues.keys()):
+        a, d = antes[clave], despues[clave]
+        ratio = d["ops_per_sec"] / a["ops_per_sec"] if a["ops_per_sec"] else float("inf")
+        linea = f"[{clave[0]}] {clave[1]:32s} x{ratio:6.2f} ops/s"
+        if "p99_ms" in a and "p99_ms" in d:
+            linea += f"  p99 {a['p99_ms']:.3f} -> {d['p99_ms']:.3f} ms"
+        lineas.append(linea)
+    return lineas
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.bench_crud",
+        description="Benchmarks de inventory.crud sobre bases de datos temporales."
+    )
+    parser.add_argument(
+        "--sizes", default=",".join(str(s) for s in DEFAULT_SIZES),
+        help="Tamaños de catálogo separados por comas (por defecto 1000,100000,1000000)."
+    )
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--ops", type=int, default=DEFAULT_OPS,
+                        help="Operaciones máximas por benchmark.")
+    parser.add_argument("--max-seconds", type=float, default=DEFAULT_MAX_SECONDS,
+                        help="Tiempo máximo por benchmark.")
+    parser.add_argument("--only", default=None,
+                        help="Ejecuta solo los benchmarks indicados (separados por comas).")
+    parser.add_argument("--output", "-o", default=None,
+                        help="Fichero JSON de salida (por defecto, salida estándar).")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "NUEVO"),
+                        help="Compara dos ficheros de resultados en lugar de medir.")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        with open(args.compare[0], encoding="utf-8") as f:
+            base = json.load(f)
+        with open(args.compare[1], encoding="utf-8") as f:
+            nuevo = json.load(f)
+        for linea in compare(base, nuevo):
+            print(linea)
+        return 0
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    solo = args.only.split(",") if args.only else None
+    documento = run(sizes, args.seed, args.ops, args.max_seconds, solo)
+
+    salida = json.dumps(documento, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(salida + "\n")
+    else:
+        print(salida)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,170 @@
+"""
+Comandos de mantenimiento de la base de datos del inventario.
+
+Uso:
+    python -m inventory migrate
+    python -m inventory explain
+    python -m inventory rebuild-fts
+    python -m inventory check-counts [--fix]
+    python -m inventory export FICHERO [--format csv|jsonl] [--category NOMBRE]
+    python -m inventory import FICHERO [--format csv|jsonl] [--chunk-size N] [--restart]
+    python -m inventory price-stats [--category NOMBRE] [--buckets N]
+"""
+import argparse
+import sys
+
+from inventory import analytics, db, migrations, transfer
+
+
+def _rebuild_fts(args: argparse.Namespace) -> int:
+    if db.rebuild_fts_index():
+        print("Índice de búsqueda reconstruido.")
+        return 0
+    print("Esta versión de SQLite no incluye FTS5; no hay índice que reconstruir.")
+    return 1
+
+
+def _migrate(args: argparse.Namespace) -> int:
+    # La primera conexión ya deja la base de datos migrada a la última versión
+    with db.connection() as conn:
+        version = migrations.get_schema_version(conn)
+    print(f"Esquema en la versión {version} (última: {migrations.SCHEMA_VERSION}).")
+    return 0
+
+
+def _explain(args: argparse.Namespace) -> int:
+    db.print_query_plans()
+    return 0
+
+
+def _check_counts(args: argparse.Namespace) -> int:
+    descuadres = db.check_category_counts()
+    if not descuadres:
+        print("Los recuentos de categorías son correctos.")
+        return 0
+    for categoria, (guardado, real) in descuadres.items():
+        print(f"{categoria}: guardado {guardado}, real {real}")
+    if args.fix:
+        db.rebuild_category_counts()
+        print("Recuentos recalculados.")
+        return 0
+    return 1
+
+
+def _export(args: argparse.Namespace) -> int:
+    resultado = transfer.export_products(args.path, args.format, args.category)
+    # El informe va a stderr para no mezclarse con una exportación a stdout
+    print(
+        f"{resultado['rows']} productos exportados en {resultado['seconds']:.2f} s "
+        f"({resultado['rows_per_sec']:.0f} filas/s).",
+        file=sys.stderr
+    )
+    return 0
+
+
+def _import(args: argparse.Namespace) -> int:
+    resultado = transfer.import_products(
+        args.path, args.format, chunk_size=args.chunk_size, restart=args.restart
+    )
+    if resultado["skipped"]:
+        print(f"Reanudada: {resultado['skipped']} filas ya importadas anteriormente.")
+    print(
+        f"{resultado['rows']} productos importados en {resultado['seconds']:.2f} s "
+        f"({resultado['rows_per_sec']:.0f} filas/s)."
+    )
+    return 0
+
+
+def _price_stats(args: argparse.Namespace) -> int:
+    estadisticas = analytics.category_price_stats(args.category, args.buckets)
+    for categoria, datos in estadisticas.items():
+        print(f"{categoria}: {datos['count']} productos")
+        if not datos["count"]:
+            continue
+        print(
+            f"  mín {datos['min']:.2f}  máx {datos['max']:.2f}  media {datos['avg']:.2f}  "
+            f"mediana {datos['median']:.2f}  p90 {datos['p90']:.2f}  p99 {datos['p99']:.2f}"
+        )
+        for desde, hasta, total in datos["histogram"]:
+            print(f"  {desde:10.2f} - {hasta:10.2f}  {total}")
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m inventory",
+        description="Mantenimiento de la base de datos del inventario."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser(
+        "migrate",
+        help="Aplica las migraciones pendientes y muestra la versión del esquema."
+    ).set_defaults(func=_migrate)
+
+    subparsers.add_parser(
+        "explain",
+        help="Muestra EXPLAIN QUERY PLAN de cada consulta de inventory.schemas."
+    ).set_defaults(func=_explain)
+
+    rebuild = subparsers.add_parser(
+        "rebuild-fts",
+        help="Reconstruye el índice de texto completo de nombres de producto."
+    )
+    rebuild.set_defaults(func=_rebuild_fts)
+
+    check_counts = subparsers.add_parser(
+        "check-counts",
+        help="Comprueba la tabla category_counts contra un recuento real."
+    )
+    check_counts.add_argument(
+        "--fix", action="store_true",
+        help="Recalcula los recuentos si hay descuadres."
+    )
+    check_counts.set_defaults(func=_check_counts)
+
+    export = subparsers.add_parser(
+        "export",
+        help="Exporta el catálogo a CSV o JSONL (\"-\" para la salida estándar)."
+    )
+    export.add_argument("path", help="Fichero de destino o \"-\".")
+    export.add_argument("--format", choices=transfer.FORMATOS, default=None)
+    export.add_argument("--category", default=None, help="Exportar solo esta categoría.")
+    export.set_defaults(func=_export)
+
+    importar = subparsers.add_parser(
+        "import",
+        help="Importa productos desde CSV o JSONL, reanudando si quedó a medias."
+    )
+    importar.add_argument("path", help="Fichero de origen.")
+    importar.add_argument("--format", choices=transfer.FORMATOS, default=None)
+    importar.add_argument(
+        "--chunk-size", type=int, default=transfer.IMPORT_CHUNK_SIZE,
+        help="Filas por transacción."
+    )
+    importar.add_argument(
+        "--restart", action="store_true",
+        help="Ignora el progreso guardado y empieza desde el principio."
+    )
+    importar.set_defaults(func=_import)
+
+    price_stats = subparsers.add_parser(
+        "price-stats",
+        help="Estadísticas de precio por categoría (percentiles e histograma)."
+    )
+    price_stats.add_argument("--category", default=None, help="Solo esta categoría.")
+    price_stats.add_argument(
+        "--buckets", type=int, default=analytics.HISTOGRAM_BUCKETS,
+        help="Cubetas del histograma."
+    )
+    price_stats.set_defaults(func=_price_stats)
+
+    args = parser.parse_args(argv)
+    try:
+        return args.func(args)
+    finally:
+        db.close_pool()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+"""
+API asíncrona (asyncio) sobre inventory.crud.
+
+Las funciones de este módulo son equivalentes a las de crud, pero no
+bloquean el bucle de eventos: las lecturas se ejecutan en un grupo acotado
+de hilos lectores y todas las escrituras en un único hilo escritor. Como
+cada hilo tiene su propia conexión del pool (en modo WAL), los lectores
+nunca esperan al escritor y las escrituras nunca compiten entre sí, así que
+no aparecen errores "database is locked".
+
+Uso:
+    from inventory import aio
+
+    pid = await aio.add_product("bebidas", "Agua", 0.50)
+    resultados = await aio.search_product("Agua")
+    await aio.shutdown()
+"""
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple, TypeVar, Union
+
+from inventory import crud
+from inventory.models import Product
+
+T = TypeVar("T")
+
+# Número de hilos lectores por defecto
+READER_THREADS: int = 4
+
+_lock = threading.Lock()
+_readers: Optional[ThreadPoolExecutor] = None
+_writer: Optional[ThreadPoolExecutor] = None
+
+
+def configure(reader_threads: int = READER_THREADS) -> None:
+    """
+    Crea los hilos lectores y el hilo escritor. Es opcional: se llama
+    automáticamente, con los valores por defecto, en el primer uso.
+
+    Args:
+        reader_threads (int): Tamaño del grupo de hilos lectores.
+    """
+    if reader_threads <= 0:
+        raise ValueError("reader_threads debe ser mayor que 0")
+
+    with _lock:
+        if _readers is not None:
+            raise RuntimeError("La API asíncrona ya está en marcha; llama antes a shutdown().")
+        _crear_executors(reader_threads)
+
+
+def _crear_executors(reader_threads: int) -> None:
+    # Siempre con _lock tomado: nadie debe ver uno creado y el otro no
+    global _readers, _writer
+
+    _readers = ThreadPoolExecutor(
+        max_workers=reader_threads, thread_name_prefix="inventory-reader"
+    )
+    _writer = ThreadPoolExecutor(
+        max_workers=1, thread_name_prefix="inventory-writer"
+    )
+
+
+async def shutdown() -> None:
+    """
+    Espera a que terminen las operaciones en curso y detiene los hilos.
+    Las conexiones de esos hilos se liberan al terminar el hilo o al
+    llamar a inventory.db.close_pool().
+    """
+    global _readers, _writer
+
+    with _lock:
+        readers, writer = _readers, _writer
+        _readers = _writer = None
+
+    loop = asyncio.get_running_loop()
+    for executor in (writer, readers):
+        if executor is not None:
+            await loop.run_in_executor(None, executor.shutdown)
+
+
+def _executors() -> Tuple[ThreadPoolExecutor, ThreadPoolExecutor]:
+    """
+    Devuelve (lectores, escritor), creándolos con los valores por defecto
+    si aún no existen. Se leen juntos bajo _lock: con uno de los dos a None,
+    run_in_executor usaría el executor por defecto del bucle y las
+    escrituras dejarían de pasar por un único hilo.
+    """
+    with _lock:
+        if _readers is None:
+            _crear_executors(READER_THREADS)
+        readers, writer = _readers, _writer
+    if readers is None or writer is None:
+        raise RuntimeError("La API asíncrona no tiene hilos lectores o escritor.")
+    return readers, writer
+
+
+async def _read(funcion: Callable[..., T], *args) -> T:
+    readers, _ = _executors()
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(readers, functools.partial(funcion, *args))
+
+
+async def _write(funcion: Callable[..., T], *args) -> T:
+    _, writer = _executors()
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(writer, functools.partial(funcion, *args))
+
+
+async def add_product(category: str, name: str, price: float) -> str:
+    """
+    Equivalente asíncrono de crud.add_product (hilo escritor).
+    """
+    return await _write(crud.add_product, category, name, price)
+
+
+async def delete_product(product_id: str) -> bool:
+    """
+    Equivalente asíncrono de crud.delete_product (hilo escritor).
+    """
+    return await _write(crud.delete_product, product_id)
+
+
+async def update_product(
+    product_id: str,
+    category: Optional[str],
+    name: Optional[str],
+    price: Optional[float]
+) -> bool:
+    """
+    Equivalente asíncrono de crud.update_product (hilo escritor).
+    """
+    return await _write(crud.update_product, product_id, category, name, price)
+
+
+async def search_product(
+    name: str,
+    mode: str = "like",
+    compact: bool = False
+) -> Union[List[Dict[str, object]], List[Product]]:
+    """
+    Equivalente asíncrono de crud.search_product (hilos lectores).
+    """
+    return await _read(crud.search_product, name, mode, compact)
+
+
+async def search_category(
+    category: str,
+    compact: bool = False
+) -> Union[List[Dict[str, object]], List[Product]]:
+    """
+    Equivalente asíncrono de crud.search_category (hilos lectores).
+    """
+    return await _read(crud.search_category, category, compact)
+
+
+async def get_categories() -> Dict[str, int]:
+    """
+    Equivalente asíncrono de crud.get_categories (hilos lectores).
+    """
+    return await _read(crud.get_categories)
@@ -0,0 +1,144 @@
+"""
+Estadísticas de precio por categoría para los informes de precios.
+
+Los agregados (número de productos, mínimo, máximo y media) los calcula
+SQLite en una sola consulta sobre el índice (category_id, price, id). Para
+los percentiles y el histograma, los precios de cada categoría se leen ya
+ordenados del mismo índice a un array('d') contiguo (8 bytes por precio,
+sin crear un dict ni un sqlite3.Row por fila): sobre un array ordenado
+cada percentil es un acceso por posición y cada cubeta del histograma una
+búsqueda binaria. Solo se mantiene en memoria una categoría a la vez.
+"""
+import math
+import sqlite3
+from array import array
+from bisect import bisect_left
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from inventory.db import connection
+from inventory.instrumentation import instrumented
+from inventory.schemas import SQL_CATEGORY_PRICE_AGGREGATES, SQL_CATEGORY_PRICES_SORTED
+
+# Cubetas por defecto del histograma
+HISTOGRAM_BUCKETS: int = 10
+
+# Filas leídas del cursor en cada fetchmany al cargar los precios
+FETCH_BATCH_SIZE: int = 10_000
+
+
+def percentile(precios: Sequence[float], q: float) -> float:
+    """
+    Percentil 'q' (0-100) de una secuencia ya ordenada, interpolando
+    linealmente entre las dos posiciones más cercanas (el método por
+    defecto de numpy).
+    """
+    posicion = (len(precios) - 1) * q / 100
+    inferior = math.floor(posicion)
+    superior = min(inferior + 1, len(precios) - 1)
+    return precios[inferior] + (precios[superior] - precios[inferior]) * (posicion - inferior)
+
+
+def histogram(precios: Sequence[float], buckets: int) -> List[Tuple[float, float, int]]:
+    """
+    Histograma de 'buckets' cubetas de igual anchura entre el mínimo y el
+    máximo de una secuencia ya ordenada. Cada cubeta incluye su límite
+    inferior; la última incluye también el máximo.
+
+    Returns:
+        List[Tuple[float, float, int]]: (desde, hasta, productos) por cubeta.
+    """
+    minimo, maximo = precios[0], precios[-1]
+    if maximo == minimo:
+        return [(minimo, maximo, len(precios))]
+
+    anchura = (maximo - minimo) / buckets
+    limites = [minimo + anchura * i for i in range(buckets)] + [maximo]
+    posiciones = [bisect_left(precios, limite) for limite in limites[:-1]] + [len(precios)]
+    return [
+        (limites[i], limites[i + 1], posiciones[i + 1] - posiciones[i])
+        for i in range(buckets)
+    ]
+
+
+def _primera_columna(cursor: sqlite3.Cursor, row: Tuple) -> object:
+    return row[0]
+
+
+def _cargar_precios(conn: sqlite3.Connection, category_id: int) -> array:
+    """
+    Lee los precios ordenados de una categoría en un array('d').
+    """
+    precios = array("d")
+    cursor = conn.cursor()
+    # Solo necesitamos el valor: ni sqlite3.Row ni tuplas
+    cursor.row_factory = _primera_columna
+    try:
+        cursor.execute(SQL_CATEGORY_PRICES_SORTED, (category_id,))
+        while True:
+            filas = cursor.fetchmany(FETCH_BATCH_SIZE)
+            if not filas:
+                break
+            precios.extend(filas)
+    finally:
+        cursor.close()
+    return precios
+
+
+@instrumented
+def category_price_stats(
+    category: Optional[str] = None,
+    buckets: int = HISTOGRAM_BUCKETS
+) -> Dict[str, Dict[str, object]]:
+    """
+    Calcula las estadísticas de precio de cada categoría (o solo de una).
+
+    Args:
+        category (Optional[str]): Limitar el cálculo a esta categoría.
+        buckets  (int): Cubetas del histograma.
+
+    Returns:
+        Dict[str, Dict[str, object]]: Para cada categoría, un diccionario con:
+            - "count"     (int)
+            - "min", "max", "avg", "median", "p90", "p99" (float, o None
+              si la categoría no tiene productos)
+            - "histogram" (List[Tuple[float, float, int]]): ver histogram().
+        Si 'category' no existe, devuelve un diccionario vacío.
+    """
+    if buckets <= 0:
+        raise ValueError("buckets debe ser mayor que 0")
+
+    resultado: Dict[str, Dict[str, object]] = {}
+
+    try:
+        with connection() as conn:
+            # 1. Agregados en SQL, una fila por categoría
+            agregados = conn.execute(
+                SQL_CATEGORY_PRICE_AGGREGATES, (category, category)
+            ).fetchall()
+
+            for row in agregados:
+                estadisticas: Dict[str, object] = {
+                    "count": row["total"],
+                    "min": row["min_price"],
+                    "max": row["max_price"],
+                    "avg": row["avg_price"],
+                    "median": None,
+                    "p90": None,
+                    "p99": None,
+                    "histogram": [],
+                }
+                # 2. Percentiles e histograma sobre los precios ordenados
+                if row["total"]:
+                    precios = _cargar_precios(conn, row["category_id"])
+                    estadisticas["median"] = percentile(precios, 50)
+                    estadisticas["p90"] = percentile(precios, 90)
+                    estadisticas["p99"] = percentile(precios, 99)
+                    estadisticas["histogram"] = histogram(precios, buckets)
+                    del precios
+
+                resultado[row["category"]] = estadisticas
+
+        return resultado
+
+    except Exception as e:
+        raise RuntimeError(f"Error al calcular las estadísticas de precios: {e}") from e
@@ -0,0 +1,218 @@
+"""
+Caché de resultados en memoria para las lecturas más repetidas de crud.
+
+Desactivada por defecto. Al activarla (`enable()`), search_product,
+search_category, search_price_range, top_products_by_price y
+get_categories guardan su resultado en una caché LRU de
+tamaño acotado, con caducidad (TTL), indexada por función y argumentos.
+
+No se sirven resultados obsoletos tras ninguna escritura de la biblioteca:
+    - Las escrituras de crud (add_product, add_products, update_product,
+      update_products, delete_product, delete_products, reprice_products,
+      reassign_products y add_category), las importaciones de transfer y
+      las reconstrucciones de db (rebuild_fts_index y
+      rebuild_category_counts) incrementan un contador de generación; las
+      entradas guardadas con una generación anterior dejan de valer.
+    - Los cambios hechos por otras conexiones (otros hilos u otros
+      procesos) se detectan con `PRAGMA data_version`, que cambia en una
+      conexión cada vez que otra confirma una transacción en el fichero.
+      Se comprueba antes de cada consulta a la caché, en la conexión del
+      hilo, y si ha cambiado también se incrementa la generación.
+    - Una conexión nueva del pool no sabe qué pasó antes de abrirse, así
+      que también incrementa la generación.
+
+Lo que se escriba a mano con la conexión del pool del propio hilo no
+cambia su data_version: después hay que llamar a invalidate().
+
+Las entradas se etiquetan con la generación vigente *antes* de ejecutar la
+consulta, de modo que una escritura concurrente con la consulta invalida
+ya su resultado.
+"""
+import collections
+import functools
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, Hashable, Tuple, TypeVar
+
+from inventory import db
+
+F = TypeVar("F", bound=Callable)
+
+# Entradas máximas y caducidad por defecto
+CACHE_MAX_ENTRIES: int = 1024
+CACHE_TTL: float = 30.0  # segundos
+
+_enabled: bool = False
+_max_entries: int = CACHE_MAX_ENTRIES
+_ttl: float = CACHE_TTL
+
+_lock = threading.Lock()
+_local = threading.local()
+# clave -> (generación, instante de caducidad, resultado)
+_entries: "collections.OrderedDict[Hashable, Tuple[int, float, object]]" = collections.OrderedDict()
+_generation: int = 0
+_stats: Dict[str, int] = {"hits": 0, "misses": 0, "invalidations": 0, "evictions": 0}
+
+
+def _vaciar() -> None:
+    global _generation
+    with _lock:
+        _generation += 1
+        _stats["invalidations"] += 1
+        _entries.clear()
+
+
+def invalidate() -> None:
+    """
+    Incrementa la generación: ninguna entrada guardada hasta ahora se
+    volverá a servir. Las escrituras de crud la llaman tras confirmar.
+    Con la caché desactivada no hace nada.
+    """
+    if _enabled:
+        _vaciar()
+
+
+def _data_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA data_version;").fetchone()[0]
+
+
+def _on_connect(conn: sqlite3.Connection) -> None:
+    # Cada conexión pertenece al hilo que la abre: guardamos su data_version
+    # inicial en ese hilo
+    _local.conexion = id(conn)
+    _local.version = _data_version(conn)
+    invalidate()
+
+
+def _comprobar_otras_conexiones(conn: sqlite3.Connection) -> None:
+    """
+    Invalida la caché si otra conexión ha confirmado cambios desde la
+    última vez que este hilo lo comprobó.
+    """
+    version = _data_version(conn)
+    if getattr(_local, "conexion", None) != id(conn):
+        # Conexión abierta antes de registrar el hook: no sabemos qué pasó
+        _local.conexion = id(conn)
+        _local.version = version
+        invalidate()
+    elif _local.version != version:
+        _local.version = version
+        invalidate()
+
+
+def _copiar(resultado: object) -> object:
+    """
+    Copia superficial para que el llamador pueda modificar el resultado
+    (listas de dicts, dict de recuentos o dict de listas por categoría)
+    sin alterar la entrada guardada.
+    """
+    if isinstance(resultado, list):
+        return [dict(x) if isinstance(x, dict) else x for x in resultado]
+    if isinstance(resultado, dict):
+        return {clave: _copiar(valor) for clave, valor in resultado.items()}
+    return resultado
+
+
+def cached(funcion: F) -> F:
+    """
+    Decorador para las lecturas de crud. Si la caché está desactivada,
+    llama directamente a la función original.
+    """
+    nombre = funcion.__name__
+
+    @functools.wraps(funcion)
+    def envoltorio(*args, **kwargs):
+        if not _enabled:
+            return funcion(*args, **kwargs)
+
+        clave = (nombre, args, tuple(sorted(kwargs.items())))
+        # Mantenemos la misma conexión durante la comprobación y la consulta
+        with db.connection() as conn:
+            _comprobar_otras_conexiones(conn)
+
+            ahora = time.monotonic()
+            with _lock:
+                generacion = _generation
+                entrada = _entries.get(clave)
+                if entrada is not None and entrada[0] == generacion and entrada[1] > ahora:
+                    _entries.move_to_end(clave)
+                    _stats["hits"] += 1
+                    return _copiar(entrada[2])
+                _stats["misses"] += 1
+
+            resultado = funcion(*args, **kwargs)
+
+        with _lock:
+            # Si hubo una escritura mientras tanto, el resultado ya no vale
+            if generacion == _generation:
+                _entries[clave] = (generacion, ahora + _ttl, resultado)
+                _entries.move_to_end(clave)
+                while len(_entries) > _max_entries:
+                    _entries.popitem(last=False)
+                    _stats["evictions"] += 1
+        return _copiar(resultado)
+
+    return envoltorio  # type: ignore[return-value]
+
+
+def enable(max_entries: int = CACHE_MAX_ENTRIES, ttl: float = CACHE_TTL) -> None:
+    """
+    Activa la caché (o cambia su configuración, vaciándola).
+
+    Args:
+        max_entries (int): Resultados distintos que se conservan (LRU).
+        ttl         (float): Segundos que vale cada resultado como máximo.
+    """
+    global _enabled, _max_entries, _ttl
+    if max_entries <= 0:
+        raise ValueError("max_entries debe ser mayor que 0")
+    if ttl <= 0:
+        raise ValueError("ttl debe ser mayor que 0")
+    _max_entries = max_entries
+    _ttl = ttl
+    _vaciar()
+    _enabled = True
+
+
+def disable() -> None:
+    """
+    Desactiva la caché y la vacía. Los contadores se conservan hasta reset().
+    """
+    global _enabled
+    _enabled = False
+    _vaciar()
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def reset() -> None:
+    """
+    Pone a cero los contadores de aciertos y fallos.
+    """
+    with _lock:
+        for clave in _stats:
+            _stats[clave] = 0
+
+
+def stats() -> Dict[str, float]:
+    """
+    Devuelve "hits", "misses", "hit_ratio", "entries", "generation",
+    "invalidations" y "evictions".
+    """
+    with _lock:
+        copia: Dict[str, float] = dict(_stats)
+        copia["entries"] = len(_entries)
+        copia["generation"] = _generation
+    consultas = copia["hits"] + copia["misses"]
+    copia["hit_ratio"] = copia["hits"] / consultas if consultas else 0.0
+    return copia
+
+
+db.register_connect_hook(_on_connect)
+# Al cerrar el pool (p. ej. al cambiar de base de datos) nada de lo guardado vale
+db.register_close_hook(_vaciar)
+# Las reconstrucciones de db confirman en la conexión del hilo: data_version no cambia
+db.register_write_hook(invalidate)
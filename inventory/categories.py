@@ -0,0 +1,132 @@
+import sqlite3
+import threading
+from typing import Dict, Optional
+
+from inventory.db import connection, register_close_hook, run_in_transaction
+from inventory.schemas import (
+    SQL_SELECT_ALL_CATEGORIES,
+    SQL_INSERT_CATEGORY
+)
+
+# Categoría a la que van los productos con una categoría desconocida
+CATEGORIA_POR_DEFECTO: str = "otros"
+
+
+class CategoryRegistry:
+    """
+    Caché en memoria de la tabla 'categories' (nombre -> id).
+
+    La tabla se lee una sola vez, en el primer uso, y a partir de ahí las
+    búsquedas se sirven desde un diccionario sin ir a SQLite. Las categorías
+    añadidas con `add()` se incorporan al momento. Las creadas por otra
+    conexión (otro hilo u otro proceso) se descubren al buscar un nombre
+    que no está: si `PRAGMA data_version` indica que otra conexión ha
+    confirmado cambios desde la última comprobación del hilo, se relee la
+    tabla una vez antes de dar el nombre por inexistente. `invalidate()`
+    fuerza una recarga en el siguiente acceso; el pool de conexiones la
+    llama al cerrarse, por si la siguiente conexión apunta a otra base de
+    datos.
+    """
+
+    def __init__(self) -> None:
+        self._ids: Optional[Dict[str, int]] = None
+        self._lock = threading.Lock()
+        # Por hilo: (id de la conexión, data_version) de la última comprobación
+        self._local = threading.local()
+
+    def _cargar(self) -> Dict[str, int]:
+        ids = self._ids
+        if ids is not None:
+            return ids
+        with self._lock:
+            if self._ids is None:
+                with connection() as conn:
+                    self._ids = {
+                        row["name"]: row["id"]
+                        for row in conn.execute(SQL_SELECT_ALL_CATEGORIES)
+                    }
+            return self._ids
+
+    def _recargar_si_cambio(self) -> bool:
+        """
+        Tras no encontrar un nombre: descarta el mapeo si otra conexión ha
+        confirmado cambios desde la última comprobación de este hilo. Así
+        los nombres que de verdad no existen no releen la tabla cada vez.
+
+        Returns:
+            bool: True si se descartó (la siguiente búsqueda relee la tabla).
+        """
+        with connection() as conn:
+            visto = (id(conn), conn.execute("PRAGMA data_version;").fetchone()[0])
+        if getattr(self._local, "visto", None) == visto:
+            return False
+        self._local.visto = visto
+        self.invalidate()
+        return True
+
+    def _buscar(self, name: object) -> Optional[int]:
+        category_id = self._cargar().get(name)
+        if category_id is None and self._recargar_si_cambio():
+            category_id = self._cargar().get(name)
+        return category_id
+
+    def __contains__(self, name: object) -> bool:
+        return self._buscar(name) is not None
+
+    def names(self) -> Dict[str, int]:
+        """
+        Devuelve una copia del mapeo completo nombre -> id.
+        """
+        return dict(self._cargar())
+
+    def get_id(self, name: str) -> Optional[int]:
+        """
+        Devuelve el id de la categoría 'name', o None si no existe.
+        """
+        return self._buscar(name)
+
+    def resolve(self, name: str) -> int:
+        """
+        Devuelve el id de la categoría 'name'; si no existe, el de "otros".
+
+        Raises:
+            RuntimeError: Si tampoco existe la categoría "otros".
+        """
+        category_id = self._buscar(name)
+        if category_id is None:
+            category_id = self._cargar().get(CATEGORIA_POR_DEFECTO)
+            if category_id is None:
+                # Esto no debería pasar, porque 'otros' se creó en la inicialización
+                raise RuntimeError(
+                    f"La categoría '{CATEGORIA_POR_DEFECTO}' no existe en la base de datos."
+                )
+        return category_id
+
+    def add(self, name: str) -> int:
+        """
+        Crea la categoría 'name' si no existía y devuelve su id.
+        """
+        category_id = self.get_id(name)
+        if category_id is not None:
+            return category_id
+
+        def insertar(conn: sqlite3.Connection) -> Dict[str, int]:
+            conn.execute(SQL_INSERT_CATEGORY, (name,))
+            # Releemos la tabla entera: otro proceso pudo añadir categorías
+            return {row["name"]: row["id"] for row in conn.execute(SQL_SELECT_ALL_CATEGORIES)}
+
+        with self._lock:
+            self._ids = run_in_transaction(insertar)
+            return self._ids[name]
+
+    def invalidate(self) -> None:
+        """
+        Descarta la caché; se recargará en el siguiente acceso.
+        """
+        with self._lock:
+            self._ids = None
+
+
+# Registro global usado por inventory.crud
+registry: CategoryRegistry = CategoryRegistry()
+register_close_hook(registry.invalidate)
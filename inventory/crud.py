@@ -1,21 +1,80 @@
-import uuid
-from typing import List, Dict, Optional
-
-from inventory.db import get_connection
+import base64
+import functools
+import json
+import sqlite3
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from inventory import cache, writequeue
+from inventory.categories import registry
+from inventory.db import DatabaseBusyError, connection, run_in_transaction
+from inventory.instrumentation import instrumented
+from inventory.models import (
+    Product,
+    category_row_factory,
+    decode_product_id,
+    encode_product_id,
+    new_product_id,
+    product_row_factory
+)
 from inventory.schemas import (
-    CATEGORIAS_PREDEFINIDAS,
-    SQL_SELECT_CATEGORY_ID,
     SQL_INSERT_PRODUCT_IN_DB,
     SQL_DELETE_PRODUCT_IN_DB,
     SQL_SEARCH_PRODUCTS_BY_NAME,
+    SQL_SEARCH_PRODUCTS_BY_NAME_FTS,
     SQL_SEARCH_PRODUCTS_BY_CATEGORY,
-    SQL_SELECT_ALL_CATEGORIES_COUNT
+    SQL_SEARCH_PRODUCTS_BY_PRICE_RANGE,
+    SQL_SEARCH_PRODUCTS_BY_PRICE_RANGE_DESC,
+    SQL_TOP_PRODUCTS_BY_PRICE,
+    SQL_TOP_PRODUCTS_BY_PRICE_DESC,
+    SQL_SELECT_ALL_CATEGORIES_COUNT,
+    SQL_UPDATE_PRODUCT_RETURNING,
+    SQL_UPDATE_PRODUCTS_FROM_VALUES,
+    PAGE_SORT_COLUMNS,
+    SQL_PAGE_PRODUCTS_BY_NAME,
+    SQL_PAGE_PRODUCTS_BY_NAME_FTS,
+    SQL_PAGE_PRODUCTS_BY_CATEGORY
 )
 
+# Número de filas que add_products inserta por transacción
+BULK_CHUNK_SIZE: int = 10_000
+
+# Número de filas que los iteradores iter_search_* leen en cada fetchmany
+ITER_BATCH_SIZE: int = 500
+
+# Columnas que puede cambiar un patch de update_products, en el orden de
+# la tupla (product_id, category, name, price)
+UPDATE_COLUMNS: Tuple[str, ...] = ("category_id", "name", "price")
+
+# Ids que las operaciones masivas enlazan por sentencia ("id IN (?, ...)"),
+# muy por debajo del límite de variables de SQLite
+BIND_CHUNK_SIZE: int = 500
+
+
+def _insert_product(cursor: sqlite3.Cursor, category: str, name: str, price: float) -> str:
+    """
+    Inserta el producto usando 'cursor', sin confirmar la transacción.
+    """
+    # 1-2. Obtener el category_id desde el registro en memoria;
+    #      si la categoría no existe, se usa la de "otros"
+    category_id = registry.resolve(category)
+
+    # 3. Generar el ID único para el producto (UUIDv7, 16 bytes en la base)
+    product_id = new_product_id()
+
+    # 4. Insertar en la tabla 'products'
+    cursor.execute(
+        SQL_INSERT_PRODUCT_IN_DB,
+        (product_id.bytes, category_id, name, price)
+    )
+    return str(product_id)
+
+
+@instrumented
 def add_product(category: str, name: str, price: float) -> str:
     """
-    Inserta un producto en la tabla 'products' con un id generado por uuid.
-    Si la categoría no está en CATEGORIAS_PREDEFINIDAS, asigna "otros".
+    Inserta un producto en la tabla 'products' con un id UUIDv7 generado.
+    Si la categoría no existe en la tabla 'categories', asigna "otros".
 
     Args:
         category (str): Categoría del producto.
@@ -26,53 +85,119 @@ def add_product(category: str, name: str, price: float) -> str:
         str: El 'product_id' generado si se insertó correctamente.
              En caso de error, lanza RuntimeError.
     """
-    # 1. Validar categoría; si no existe en la lista, usar "otros"
-    if category not in CATEGORIAS_PREDEFINIDAS:
-        category = "otros"
-
-    conn = get_connection()
     try:
-        with conn:
-            cursor = conn.cursor()
-
-            # 2. Obtener el category_id correspondiente al nombre de categoría
-            cursor.execute(SQL_SELECT_CATEGORY_ID, (category,))
-            fila = cursor.fetchone()
-            if fila:
-                category_id = fila["id"]
-            else:
-                # Por seguridad: si no existe "otros", buscamos su id
-                cursor.execute(SQL_SELECT_CATEGORY_ID, ("otros",))
-                fila_otros = cursor.fetchone()
-                if fila_otros:
-                    category_id = fila_otros["id"]
-                else:
-                    # Esto no debería pasar, porque 'otros' se creó en la inicialización
-                    raise RuntimeError(
-                        f"La categoría 'otros' no existe en la base de datos."
-                    )
-
-            # 3. Generar el ID único para el producto
-            product_id = str(uuid.uuid4())
-
-            # 4. Insertar en la tabla 'products'
-            cursor.execute(
-                SQL_INSERT_PRODUCT_IN_DB,
-                (product_id, category_id, name, price)
+        # Modo de escritura diferida: la cola confirma en lote y nos
+        # devuelve el resultado a través del Future
+        cola = writequeue.get_queue()
+        if cola is not None:
+            product_id = cola.submit(_insert_product, category, name, price).result()
+        else:
+            product_id = run_in_transaction(
+                lambda conn: _insert_product(conn.cursor(), category, name, price)
             )
 
-        # Si llegamos aquí, el INSERT fue exitoso (se hizo commit en el with)
+        # Si llegamos aquí, el INSERT fue exitoso (run_in_transaction ya hizo commit)
+        cache.invalidate()
         return product_id
 
+    except DatabaseBusyError:
+        raise
+
     except Exception as e:
-        # Podemos relaizar rollback implícito (el 'with conn' ya hace rollback si hay excepción)
+        # No hace falta rollback: run_in_transaction ya deshizo la transacción
         raise RuntimeError(f"Error al insertar el producto en la base de datos: {e}") from e
 
+
+@instrumented
+def add_products(
+    products: Iterable[Tuple[str, str, float]],
+    chunk_size: int = BULK_CHUNK_SIZE
+) -> List[str]:
+    """
+    Inserta muchos productos de una vez. Acepta cualquier iterable o generador
+    de tuplas (category, name, price) y lo consume por bloques de 'chunk_size'
+    filas, insertando cada bloque con executemany en una única transacción.
+    Las categorías se resuelven en memoria y, como en add_product, las que no
+    existen se guardan como "otros".
+
+    Args:
+        products   (Iterable[Tuple[str, str, float]]): Productos a insertar.
+        chunk_size (int): Filas por transacción.
+
+    Returns:
+        List[str]: Los 'product_id' generados, en el mismo orden de entrada.
+                   En caso de error, lanza RuntimeError; los bloques ya
+                   confirmados antes del fallo permanecen en la base.
+    """
+    if chunk_size <= 0:
+        raise ValueError("chunk_size debe ser mayor que 0")
+
+    product_ids: List[str] = []
+    iterador = iter(products)
+
+    try:
+        # Insertar por bloques, una transacción por bloque
+        while True:
+            bloque = list(islice(iterador, chunk_size))
+            if not bloque:
+                break
+
+            filas = []
+            ids = []
+            for category, name, price in bloque:
+                product_id = new_product_id()
+                category_id = registry.resolve(category)
+                filas.append((product_id.bytes, category_id, name, price))
+                ids.append(str(product_id))
+
+            run_in_transaction(lambda conn: conn.executemany(SQL_INSERT_PRODUCT_IN_DB, filas))
+            product_ids.extend(ids)
+
+        return product_ids
+
+    except DatabaseBusyError:
+        raise
+
+    except Exception as e:
+        raise RuntimeError(f"Error al insertar productos en bloque: {e}") from e
+
     finally:
-        # Nos aseguramos de cerrar la conexión
-        conn.close()
+        # Aunque falle, los bloques anteriores ya están confirmados
+        if product_ids:
+            cache.invalidate()
 
 
+@instrumented
+def add_category(name: str) -> int:
+    """
+    Crea una nueva categoría (si no existía) y la registra en memoria,
+    de modo que add_product y update_product la acepten a partir de ahora.
+
+    Args:
+        name (str): Nombre de la categoría.
+
+    Returns:
+        int: El id de la categoría.
+    """
+    try:
+        category_id = registry.add(name)
+        cache.invalidate()
+        return category_id
+    except DatabaseBusyError:
+        raise
+    except Exception as e:
+        raise RuntimeError(f"Error al crear la categoría: {e}") from e
+
+
+def _delete_product(cursor: sqlite3.Cursor, product_id: str) -> bool:
+    """
+    Borra el producto usando 'cursor', sin confirmar la transacción.
+    """
+    cursor.execute(SQL_DELETE_PRODUCT_IN_DB, (encode_product_id(product_id),))
+    return cursor.rowcount == 1
+
+
+@instrumented
 def delete_product(product_id: str) -> bool:
     """
     Elimina un producto de la tabla 'products' dado su product_id.
@@ -83,32 +208,72 @@ def delete_product(product_id: str) -> bool:
     Returns:
         bool: True si se eliminó exactamente un registro; False en caso contrario.
     """
-    conn = get_connection()
     try:
-        cursor = conn.cursor()
-        cursor.execute(SQL_DELETE_PRODUCT_IN_DB, (product_id,))
-
-        if cursor.rowcount == 1:
-            conn.commit()
-            return True
+        cola = writequeue.get_queue()
+        if cola is not None:
+            borrado = cola.submit(_delete_product, product_id).result()
         else:
-            conn.rollback()
-            return False
+            borrado = run_in_transaction(lambda conn: _delete_product(conn.cursor(), product_id))
+
+        if borrado:
+            cache.invalidate()
+        return borrado
+
+    except DatabaseBusyError:
+        raise
 
     except Exception as e:
-        conn.rollback()
         raise RuntimeError(f"Error al borrar el producto en la base de datos: {e}") from e
 
-    finally:
-        conn.close()
 
+def _fts_query(texto: str) -> str:
+    """
+    Convierte el texto del usuario en una consulta FTS5 segura: cada palabra
+    se entrecomilla (para neutralizar la sintaxis de FTS5) y se busca como
+    prefijo. "coca col" -> '"coca"* "col"*'.
+    """
+    palabras = texto.split()
+    return " ".join('"' + palabra.replace('"', '""') + '"*' for palabra in palabras)
 
-def search_product(name: str) -> List[Dict[str, object]]:
+
+def _execute_search_product(cursor: sqlite3.Cursor, name: str, mode: str) -> None:
+    """
+    Lanza sobre 'cursor' la búsqueda por nombre en el modo indicado,
+    recurriendo a LIKE si el índice FTS5 no está disponible.
     """
-    Busca todos los productos cuyo nombre contenga la cadena 'name' (case-insensitive).
+    consulta_fts = _fts_query(name) if mode == "fts" else ""
+    if consulta_fts:
+        try:
+            cursor.execute(SQL_SEARCH_PRODUCTS_BY_NAME_FTS, (consulta_fts,))
+            return
+        except sqlite3.OperationalError as e:
+            # Sin FTS5 o sin tabla products_fts: búsqueda clásica
+            if "no such" not in str(e):
+                raise
+    cursor.execute(SQL_SEARCH_PRODUCTS_BY_NAME, (name,))
+
+
+@instrumented
+@cache.cached
+def search_product(
+    name: str,
+    mode: str = "like",
+    compact: bool = False
+) -> Union[List[Dict[str, object]], List[Product]]:
+    """
+    Busca productos por nombre (case-insensitive).
 
     Args:
-        name (str): Fragmento o nombre completo del producto a buscar.
+        name    (str): Fragmento o nombre completo del producto a buscar.
+        mode    (str): "like" (por defecto) busca 'name' como subcadena en
+                       cualquier posición, recorriendo toda la tabla.
+                       "fts" usa el índice de texto completo: cada palabra de
+                       'name' debe coincidir con el inicio de una palabra del
+                       nombre ("caf mol" encuentra "Café Molido"). Si SQLite
+                       no tiene FTS5, se recurre a "like".
+        compact (bool): Devolver objetos Product (tuplas con nombre, creadas
+                        directamente por el cursor) en lugar de diccionarios.
+                        Ocupan menos memoria y son más rápidos de construir.
 
     Returns:
         List[Dict[str, object]]: Lista de diccionarios con las claves:
@@ -116,39 +281,50 @@ def search_product(name: str) -> List[Dict[str, object]]:
             - "category"   (str)
             - "name"       (str)
             - "price"      (float)
+        Con compact=True, List[Product] con los mismos campos.
         Si no hay coincidencias, devuelve lista vacía.
     """
-    conn = get_connection()
+    if mode not in ("like", "fts"):
+        raise ValueError(f"Modo de búsqueda no válido: {mode!r}")
+
     resultados: List[Dict[str, object]] = []
 
     try:
-        cursor = conn.cursor()
-        cursor.execute(SQL_SEARCH_PRODUCTS_BY_NAME, (name,))
-        rows = cursor.fetchall()
-
-        for row in rows:
-            resultados.append({
-                "product_id": row["product_id"],
-                "category":   row["category"],
-                "name":       row["name"],
-                "price":      row["price"],
-            })
-
-        return resultados
+        with connection() as conn:
+            cursor = conn.cursor()
+            if compact:
+                cursor.row_factory = product_row_factory
+            _execute_search_product(cursor, name, mode)
+            rows = cursor.fetchall()
+            if compact:
+                return rows
+
+            for row in rows:
+                resultados.append({
+                    "product_id": decode_product_id(row["product_id"]),
+                    "category":   row["category"],
+                    "name":       row["name"],
+                    "price":      row["price"],
+                })
+
+            return resultados
 
     except Exception as e:
         raise RuntimeError(f"Error al buscar productos en la base de datos: {e}") from e
 
-    finally:
-        conn.close()
-
 
-def search_category(category: str) -> List[Dict[str, object]]:
+@instrumented
+@cache.cached
+def search_category(
+    category: str,
+    compact: bool = False
+) -> Union[List[Dict[str, object]], List[Product]]:
     """
     Devuelve todos los productos que pertenecen a la categoría exacta 'category'.
 
     Args:
         category (str): Nombre de la categoría a buscar.
+        compact  (bool): Devolver objetos Product en lugar de diccionarios.
 
     Returns:
         List[Dict[str, object]]: Lista de diccionarios con las claves:
@@ -156,39 +332,504 @@ def search_category(category: str) -> List[Dict[str, object]]:
             - "category"   (str) – siempre igual al parámetro 'category'
             - "name"       (str)
             - "price"      (float)
+        Con compact=True, List[Product] con los mismos campos.
         Si la categoría no existe o no tiene productos, devuelve lista vacía.
     """
-    conn = get_connection()
     resultados: List[Dict[str, object]] = []
 
     try:
-        cursor = conn.cursor()
+        with connection() as conn:
+            cursor = conn.cursor()
+
+            # COMPROBAR QUE LA CATEGORÍA EXISTE
+            if category not in registry:
+                # Si no existe, devolvemos lista vacía
+                return []
+
+            if compact:
+                cursor.row_factory = category_row_factory(category)
+            cursor.execute(SQL_SEARCH_PRODUCTS_BY_CATEGORY, (category,))
+            rows = cursor.fetchall()
+            if compact:
+                return rows
+
+            for row in rows:
+                resultados.append({
+                    "product_id": decode_product_id(row["product_id"]),
+                    "category":   category,
+                    "name":       row["name"],
+                    "price":      row["price"],
+                })
+
+            return resultados
+
+    except Exception as e:
+        raise RuntimeError(f"Error al buscar productos por categoría: {e}") from e
 
+
+@instrumented
+def iter_search_product(
+    name: str,
+    mode: str = "like",
+    batch_size: int = ITER_BATCH_SIZE,
+    compact: bool = False
+) -> Iterator[Union[Dict[str, object], Product]]:
+    """
+    Versión en streaming de search_product: devuelve un iterador que lee el
+    cursor por bloques de 'batch_size' filas (fetchmany) en lugar de cargar
+    todos los resultados en memoria.
+
+    La conexión solo se retiene mientras se consume el iterador; se libera al
+    agotarlo o al cerrarlo (close(), o al salir de un bucle for con break y
+    descartar el generador).
+
+    Args:
+        name       (str): Fragmento o nombre completo del producto a buscar.
+        mode       (str): "like" o "fts", como en search_product.
+        batch_size (int): Filas leídas del cursor en cada fetchmany.
+        compact    (bool): Producir objetos Product en lugar de diccionarios.
+
+    Yields:
+        Dict[str, object]: Diccionarios con las mismas claves que search_product
+                           (o Product, con compact=True).
+    """
+    if mode not in ("like", "fts"):
+        raise ValueError(f"Modo de búsqueda no válido: {mode!r}")
+
+    try:
+        with connection() as conn:
+            cursor = conn.cursor()
+            try:
+                if compact:
+                    cursor.row_factory = product_row_factory
+                _execute_search_product(cursor, name, mode)
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    if compact:
+                        yield from rows
+                        continue
+                    for row in rows:
+                        yield {
+                            "product_id": decode_product_id(row["product_id"]),
+                            "category":   row["category"],
+                            "name":       row["name"],
+                            "price":      row["price"],
+                        }
+            finally:
+                # Cerramos el cursor para liberar la lectura aunque no se agote
+                cursor.close()
+
+    except Exception as e:
+        raise RuntimeError(f"Error al buscar productos en la base de datos: {e}") from e
+
+
+@instrumented
+def iter_search_category(
+    category: str,
+    batch_size: int = ITER_BATCH_SIZE,
+    compact: bool = False
+) -> Iterator[Union[Dict[str, object], Product]]:
+    """
+    Versión en streaming de search_category: devuelve un iterador que lee el
+    cursor por bloques de 'batch_size' filas (fetchmany). La conexión solo
+    se retiene mientras se consume el iterador.
+
+    Args:
+        category   (str): Nombre de la categoría a buscar.
+        batch_size (int): Filas leídas del cursor en cada fetchmany.
+        compact    (bool): Producir objetos Product en lugar de diccionarios.
+
+    Yields:
+        Dict[str, object]: Diccionarios con las mismas claves que search_category
+                           (o Product, con compact=True).
+        Si la categoría no existe o no tiene productos, no produce nada.
+    """
+    try:
         # COMPROBAR QUE LA CATEGORÍA EXISTE
-        if category not in CATEGORIAS_PREDEFINIDAS:
-            # Si no existe, devolvemos lista vacía
-            return []
+        if category not in registry:
+            return
 
-        cursor.execute(SQL_SEARCH_PRODUCTS_BY_CATEGORY, (category,))
-        rows = cursor.fetchall()
+        with connection() as conn:
+            cursor = conn.cursor()
+            try:
+                if compact:
+                    cursor.row_factory = category_row_factory(category)
+                cursor.execute(SQL_SEARCH_PRODUCTS_BY_CATEGORY, (category,))
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    if compact:
+                        yield from rows
+                        continue
+                    for row in rows:
+                        yield {
+                            "product_id": decode_product_id(row["product_id"]),
+                            "category":   category,
+                            "name":       row["name"],
+                            "price":      row["price"],
+                        }
+            finally:
+                cursor.close()
 
-        for row in rows:
-            resultados.append({
-                "product_id": row["product_id"],
-                "category":   category,
+    except Exception as e:
+        raise RuntimeError(f"Error al buscar productos por categoría: {e}") from e
+
+
+def _encode_page_cursor(
+    order_by: str,
+    descending: bool,
+    row: Union[Dict[str, object], Product]
+) -> str:
+    """
+    Codifica la clave de ordenación de la última fila de una página como un
+    cursor opaco (base64 de un JSON con la ordenación, el valor y el id).
+    """
+    if isinstance(row, Product):
+        row = row.as_dict()
+    clave = [order_by, descending, row[order_by if order_by != "id" else "product_id"], row["product_id"]]
+    return base64.urlsafe_b64encode(json.dumps(clave).encode("utf-8")).decode("ascii")
+
+
+def _decode_page_cursor(cursor: str, order_by: str, descending: bool) -> Tuple[object, str]:
+    """
+    Decodifica un cursor de _encode_page_cursor y comprueba que corresponde
+    a la misma ordenación. Devuelve (valor de ordenación, product_id).
+    """
+    try:
+        orden, descendente, valor, product_id = json.loads(base64.urlsafe_b64decode(cursor))
+    except Exception as e:
+        raise ValueError("Cursor de paginación no válido") from e
+    if orden != order_by or descendente != descending:
+        raise ValueError("El cursor pertenece a otra ordenación")
+    return valor, product_id
+
+
+def _build_page_sql(
+    template: str,
+    order_by: str,
+    descending: bool,
+    cursor: Optional[str]
+) -> Tuple[str, List[object]]:
+    """
+    Completa una plantilla SQL_PAGE_* con la condición de búsqueda por clave
+    ("filas posteriores al cursor") y la ordenación estable (columna, id).
+
+    Returns:
+        Tuple[str, List[object]]: El SQL y los parámetros de la condición.
+    """
+    if order_by not in PAGE_SORT_COLUMNS:
+        raise ValueError(f"No se puede ordenar por {order_by!r}")
+
+    columna = PAGE_SORT_COLUMNS[order_by]
+    sentido = "DESC" if descending else "ASC"
+    comparador = "<" if descending else ">"
+
+    if order_by == "id":
+        order = f"p.id {sentido}"
+    else:
+        order = f"{columna} {sentido}, p.id {sentido}"
+
+    seek = ""
+    parametros: List[object] = []
+    if cursor is not None:
+        valor, product_id = _decode_page_cursor(cursor, order_by, descending)
+        clave = encode_product_id(product_id)
+        if order_by == "id":
+            seek = f"AND p.id {comparador} ?"
+            parametros = [clave]
+        else:
+            seek = f"AND ({columna}, p.id) {comparador} (?, ?)"
+            parametros = [valor, clave]
+
+    return template.format(seek=seek, order=order), parametros
+
+
+def _fetch_page(
+    sql: str,
+    parametros: List[object],
+    page_size: int,
+    order_by: str,
+    descending: bool,
+    category: Optional[str] = None,
+    compact: bool = False
+) -> Tuple[Union[List[Dict[str, object]], List[Product]], Optional[str]]:
+    """
+    Ejecuta una consulta de página pidiendo una fila de más para saber si
+    existe página siguiente sin tener que hacer otra consulta.
+    """
+    with connection() as conn:
+        cursor = conn.cursor()
+        if compact:
+            cursor.row_factory = (
+                product_row_factory if category is None else category_row_factory(category)
+            )
+        rows = cursor.execute(sql, (*parametros, page_size + 1)).fetchall()
+
+    if compact:
+        pagina = rows[:page_size]
+    else:
+        pagina = []
+        for row in rows[:page_size]:
+            pagina.append({
+                "product_id": decode_product_id(row["product_id"]),
+                "category":   category if category is not None else row["category"],
                 "name":       row["name"],
                 "price":      row["price"],
             })
 
-        return resultados
+    siguiente = None
+    if len(rows) > page_size:
+        siguiente = _encode_page_cursor(order_by, descending, pagina[-1])
+    return pagina, siguiente
+
+
+@instrumented
+def search_product_page(
+    name: str,
+    page_size: int = 50,
+    cursor: Optional[str] = None,
+    order_by: str = "name",
+    descending: bool = False,
+    mode: str = "like",
+    compact: bool = False
+) -> Tuple[Union[List[Dict[str, object]], List[Product]], Optional[str]]:
+    """
+    Versión paginada de search_product con paginación por clave (keyset):
+    cada página continúa justo después de la última fila de la anterior
+    usando una condición WHERE sobre la clave de ordenación, en lugar de
+    OFFSET, por lo que la página N cuesta lo mismo que la primera.
+
+    Args:
+        name       (str): Fragmento o nombre completo del producto a buscar.
+        page_size  (int): Número máximo de productos por página.
+        cursor     (Optional[str]): Cursor opaco devuelto por la página
+                                    anterior; None para la primera página.
+        order_by   (str): "name", "price" o "id". El id desempata, así que
+                          el orden es estable aunque haya valores repetidos.
+        descending (bool): Orden descendente en lugar de ascendente.
+        mode       (str): "like" o "fts", como en search_product.
+        compact    (bool): Devolver objetos Product en lugar de diccionarios.
+
+    Returns:
+        Tuple[List[Dict[str, object]], Optional[str]]:
+            - Los productos de la página (mismas claves que search_product).
+            - El cursor de la página siguiente, o None si es la última.
+    """
+    if page_size <= 0:
+        raise ValueError("page_size debe ser mayor que 0")
+    if mode not in ("like", "fts"):
+        raise ValueError(f"Modo de búsqueda no válido: {mode!r}")
+
+    consulta_fts = _fts_query(name) if mode == "fts" else ""
+    template = SQL_PAGE_PRODUCTS_BY_NAME_FTS if consulta_fts else SQL_PAGE_PRODUCTS_BY_NAME
+    sql, parametros = _build_page_sql(template, order_by, descending, cursor)
+
+    try:
+        try:
+            return _fetch_page(
+                sql, [consulta_fts or name, *parametros], page_size, order_by, descending,
+                compact=compact
+            )
+        except sqlite3.OperationalError as e:
+            # Sin FTS5 o sin tabla products_fts: búsqueda clásica
+            if not consulta_fts or "no such" not in str(e):
+                raise
+            sql, parametros = _build_page_sql(
+                SQL_PAGE_PRODUCTS_BY_NAME, order_by, descending, cursor
+            )
+            return _fetch_page(
+                sql, [name, *parametros], page_size, order_by, descending, compact=compact
+            )
+
+    except Exception as e:
+        raise RuntimeError(f"Error al buscar productos en la base de datos: {e}") from e
+
+
+@instrumented
+def search_category_page(
+    category: str,
+    page_size: int = 50,
+    cursor: Optional[str] = None,
+    order_by: str = "name",
+    descending: bool = False,
+    compact: bool = False
+) -> Tuple[Union[List[Dict[str, object]], List[Product]], Optional[str]]:
+    """
+    Versión paginada de search_category con paginación por clave (keyset).
+    Se apoya en los índices (category_id, name) y (category_id, price), de
+    modo que cada página es un recorrido acotado del índice.
+
+    Args:
+        category   (str): Nombre de la categoría a buscar.
+        page_size  (int): Número máximo de productos por página.
+        cursor     (Optional[str]): Cursor opaco devuelto por la página
+                                    anterior; None para la primera página.
+        order_by   (str): "name", "price" o "id".
+        descending (bool): Orden descendente en lugar de ascendente.
+        compact    (bool): Devolver objetos Product en lugar de diccionarios.
+
+    Returns:
+        Tuple[List[Dict[str, object]], Optional[str]]:
+            - Los productos de la página (mismas claves que search_category).
+            - El cursor de la página siguiente, o None si es la última.
+        Si la categoría no existe, devuelve ([], None).
+    """
+    if page_size <= 0:
+        raise ValueError("page_size debe ser mayor que 0")
+
+    sql, parametros = _build_page_sql(
+        SQL_PAGE_PRODUCTS_BY_CATEGORY, order_by, descending, cursor
+    )
+
+    try:
+        # COMPROBAR QUE LA CATEGORÍA EXISTE
+        category_id = registry.get_id(category)
+        if category_id is None:
+            return [], None
+
+        return _fetch_page(
+            sql, [category_id, *parametros], page_size, order_by, descending, category,
+            compact
+        )
 
     except Exception as e:
         raise RuntimeError(f"Error al buscar productos por categoría: {e}") from e
 
-    finally:
-        conn.close()
 
+@instrumented
+@cache.cached
+def search_price_range(
+    category: str,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    limit: Optional[int] = None,
+    descending: bool = False,
+    compact: bool = False
+) -> Union[List[Dict[str, object]], List[Product]]:
+    """
+    Devuelve los productos de la categoría 'category' con precio entre
+    'min_price' y 'max_price' (ambos incluidos), ordenados por precio. Es
+    un recorrido acotado del índice (category_id, price, id): solo se leen
+    las filas del rango (y, con 'limit', solo las primeras).
+
+    Args:
+        category   (str): Nombre de la categoría.
+        min_price  (Optional[float]): Precio mínimo. None = sin mínimo.
+        max_price  (Optional[float]): Precio máximo. None = sin máximo.
+        limit      (Optional[int]): Número máximo de productos. None = todos.
+        descending (bool): Del más caro al más barato.
+        compact    (bool): Devolver objetos Product en lugar de diccionarios.
+
+    Returns:
+        List[Dict[str, object]]: Mismas claves que search_category. A igual
+                                 precio, ordenados por id.
+        Si la categoría no existe, devuelve lista vacía.
+    """
+    if limit is not None and limit <= 0:
+        raise ValueError("limit debe ser mayor que 0")
+
+    sql = SQL_SEARCH_PRODUCTS_BY_PRICE_RANGE_DESC if descending else SQL_SEARCH_PRODUCTS_BY_PRICE_RANGE
+    parametros = (
+        float("-inf") if min_price is None else min_price,
+        float("inf") if max_price is None else max_price,
+        -1 if limit is None else limit,
+    )
+
+    try:
+        # COMPROBAR QUE LA CATEGORÍA EXISTE
+        category_id = registry.get_id(category)
+        if category_id is None:
+            return []
+
+        with connection() as conn:
+            cursor = conn.cursor()
+            if compact:
+                cursor.row_factory = category_row_factory(category)
+            rows = cursor.execute(sql, (category_id, *parametros)).fetchall()
+
+        if compact:
+            return rows
+        return [
+            {
+                "product_id": decode_product_id(row["product_id"]),
+                "category":   category,
+                "name":       row["name"],
+                "price":      row["price"],
+            }
+            for row in rows
+        ]
+
+    except Exception as e:
+        raise RuntimeError(f"Error al buscar productos por rango de precios: {e}") from e
+
+
+@instrumented
+@cache.cached
+def top_products_by_price(
+    n: int = 10,
+    descending: bool = False,
+    category: Optional[str] = None,
+    compact: bool = False
+) -> Dict[str, Union[List[Dict[str, object]], List[Product]]]:
+    """
+    Devuelve los 'n' productos más baratos (o más caros) de cada categoría
+    en una sola consulta. Para cada categoría solo se leen sus 'n' primeras
+    entradas del índice (category_id, price, id), así que el coste depende
+    de n y del número de categorías, no del tamaño del catálogo.
+
+    Args:
+        n          (int): Productos por categoría.
+        descending (bool): Los más caros en lugar de los más baratos.
+        category   (Optional[str]): Solo esta categoría.
+        compact    (bool): Devolver objetos Product en lugar de diccionarios.
+
+    Returns:
+        Dict[str, List[Dict[str, object]]]: Para cada categoría (por orden
+            alfabético), sus productos ordenados por precio, con las mismas
+            claves que search_product. Las categorías sin productos tienen
+            lista vacía; si 'category' no existe, devuelve un diccionario vacío.
+    """
+    if n <= 0:
+        raise ValueError("n debe ser mayor que 0")
+
+    sql = SQL_TOP_PRODUCTS_BY_PRICE_DESC if descending else SQL_TOP_PRODUCTS_BY_PRICE
+
+    try:
+        if category is None:
+            nombres = sorted(registry.names())
+        elif category in registry:
+            nombres = [category]
+        else:
+            return {}
+        resultado: Dict[str, list] = {nombre: [] for nombre in nombres}
+
+        with connection() as conn:
+            cursor = conn.cursor()
+            if compact:
+                cursor.row_factory = product_row_factory
+            rows = cursor.execute(sql, (n, category, category)).fetchall()
+
+        for row in rows:
+            if compact:
+                resultado.setdefault(row.category, []).append(row)
+            else:
+                resultado.setdefault(row["category"], []).append({
+                    "product_id": decode_product_id(row["product_id"]),
+                    "category":   row["category"],
+                    "name":       row["name"],
+                    "price":      row["price"],
+                })
+        return resultado
+
+    except Exception as e:
+        raise RuntimeError(f"Error al buscar los productos por precio de cada categoría: {e}") from e
 
+
+@instrumented
+@cache.cached
 def get_categories() -> Dict[str, int]:
     """
     Obtiene todas las categorías junto con el número de productos que tienen.
@@ -198,26 +839,151 @@ def get_categories() -> Dict[str, int]:
             - La clave es el nombre de la categoría (str).
             - El valor es el entero (int) de productos en esa categoría.
     """
-    conn = get_connection()
     resultado: Dict[str, int] = {}
 
     try:
-        cursor = conn.cursor()
-        cursor.execute(SQL_SELECT_ALL_CATEGORIES_COUNT)
-        rows = cursor.fetchall()
+        with connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(SQL_SELECT_ALL_CATEGORIES_COUNT)
+            rows = cursor.fetchall()
 
-        for row in rows:
-            resultado[row["category"]] = row["total"]
+            for row in rows:
+                resultado[row["category"]] = row["total"]
 
-        return resultado
+            return resultado
 
     except Exception as e:
         raise RuntimeError(f"Error al obtener categorías: {e}") from e
 
-    finally:
-        conn.close()
 
+@functools.lru_cache(maxsize=64)
+def _update_products_sql(columnas: Tuple[str, ...], filas: int) -> str:
+    """
+    Completa SQL_UPDATE_PRODUCTS_FROM_VALUES para 'filas' productos que
+    cambian 'columnas'. Para un solo producto basta un UPDATE por id (sin
+    materializar la tabla de valores), con el id como último parámetro.
+    """
+    if filas == 1:
+        return SQL_UPDATE_PRODUCT_RETURNING.format(
+            asignaciones=", ".join(f"{c} = ?" for c in columnas)
+        )
+    marcas = "(" + ", ".join("?" * (len(columnas) + 1)) + ")"
+    return SQL_UPDATE_PRODUCTS_FROM_VALUES.format(
+        columnas=", ".join(columnas),
+        filas=", ".join([marcas] * filas),
+        asignaciones=", ".join(f"{c} = cambios.{c}" for c in columnas),
+    )
+
+
+def _update_products(
+    cursor: sqlite3.Cursor,
+    patches: Iterable[Tuple[str, Optional[str], Optional[str], Optional[float]]],
+    chunk_size: int = BIND_CHUNK_SIZE
+) -> Dict[str, bool]:
+    """
+    Aplica los patches usando 'cursor', sin confirmar la transacción.
+    """
+    # 1. Fusionar los patches de un mismo id: aplicar varios seguidos
+    #    equivale a uno solo en el que mandan los campos posteriores
+    fusionados: Dict[str, List[object]] = {}
+    for product_id, category, name, price in patches:
+        valores = fusionados.setdefault(product_id, [None, None, None])
+        # 1.1. La categoría se resuelve en memoria (si no existe, "otros")
+        if category is not None:
+            valores[0] = registry.resolve(category)
+        if name is not None:
+            valores[1] = name
+        if price is not None:
+            valores[2] = price
+
+    resultado = {product_id: False for product_id in fusionados}
+
+    # 2. Agrupar por el conjunto de columnas que cambian; los patches sin
+    #    cambios no se ejecutan (y cuentan como no actualizados)
+    grupos: Dict[Tuple[str, ...], List[Tuple[object, ...]]] = {}
+    for product_id, valores in fusionados.items():
+        columnas = tuple(
+            columna for columna, valor in zip(UPDATE_COLUMNS, valores) if valor is not None
+        )
+        if columnas:
+            grupos.setdefault(columnas, []).append(
+                (encode_product_id(product_id), *(v for v in valores if v is not None))
+            )
+
+    # 3. Un UPDATE ... FROM (VALUES ...) RETURNING por grupo y bloque: el
+    #    texto SQL solo depende de las columnas y del tamaño del bloque, así
+    #    que se reutiliza desde la caché de sentencias
+    for columnas, filas in grupos.items():
+        for inicio in range(0, len(filas), chunk_size):
+            bloque = filas[inicio:inicio + chunk_size]
+            sql = _update_products_sql(columnas, len(bloque))
+            if len(bloque) == 1:
+                parametros = [*bloque[0][1:], bloque[0][0]]
+            else:
+                parametros = [valor for fila in bloque for valor in fila]
+            for row in cursor.execute(sql, parametros).fetchall():
+                resultado[decode_product_id(row[0])] = True
+
+    return resultado
 
+
+def _apply_patches(
+    patches: List[Tuple[str, Optional[str], Optional[str], Optional[float]]],
+    chunk_size: int = BIND_CHUNK_SIZE
+) -> Dict[str, bool]:
+    """
+    Aplica los patches en una transacción (o a través de la cola de
+    escritura diferida, si está activa) e invalida la caché si algo cambió.
+    """
+    cola = writequeue.get_queue()
+    if cola is not None:
+        resultado = cola.submit(_update_products, patches, chunk_size).result()
+    else:
+        resultado = run_in_transaction(
+            lambda conn: _update_products(conn.cursor(), patches, chunk_size)
+        )
+
+    if any(resultado.values()):
+        cache.invalidate()
+    return resultado
+
+
+@instrumented
+def update_products(
+    patches: Iterable[Tuple[str, Optional[str], Optional[str], Optional[float]]],
+    chunk_size: int = BIND_CHUNK_SIZE
+) -> Dict[str, bool]:
+    """
+    Actualiza muchos productos en una sola transacción. Cada patch es una
+    tupla (product_id, category, name, price) en la que los campos None no
+    se cambian, como en update_product. Los patches se agrupan por las
+    columnas que cambian y cada grupo se aplica con un UPDATE que devuelve
+    (RETURNING) los ids realmente actualizados, en bloques de 'chunk_size'
+    productos. Si un id aparece varias veces, los patches se aplican en orden.
+
+    Args:
+        patches    (Iterable[Tuple[str, Optional[str], Optional[str], Optional[float]]]):
+                   Cambios a aplicar.
+        chunk_size (int): Productos por sentencia.
+
+    Returns:
+        Dict[str, bool]: Para cada product_id, True si se actualizó; False si
+                         no existe o su patch no cambiaba ningún campo.
+    """
+    if chunk_size <= 0:
+        raise ValueError("chunk_size debe ser mayor que 0")
+
+    try:
+        return _apply_patches(list(patches), chunk_size)
+
+    except DatabaseBusyError:
+        raise
+
+    except Exception as e:
+        raise RuntimeError(f"Error al actualizar productos en bloque: {e}") from e
+
+
+@instrumented
 def update_product(
     product_id: str,
     category: Optional[str],
@@ -230,7 +996,7 @@ def update_product(
 
     Args:
         product_id (str): ID del producto a actualizar.
-        category   (Optional[str]): Nueva categoría. Si no está en predefinidas, se usa "otros". 
+        category   (Optional[str]): Nueva categoría. Si no existe, se usa "otros". 
                                     Si es None, no se cambia.
         name       (Optional[str]): Nuevo nombre. Si es None, no se cambia.
         price      (Optional[float]): Nuevo precio. Si es None, no se cambia.
@@ -238,80 +1004,255 @@ def update_product(
     Returns:
         bool: True si se actualizó exactamente un registro, False en otro caso.
     """
-    conn = get_connection()
     try:
-        cursor = conn.cursor()
+        # Mismo camino que update_products, con un único patch
+        return _apply_patches([(product_id, category, name, price)])[product_id]
 
-        # 1. Verificar que exista el producto
-        cursor.execute("SELECT 1 FROM products WHERE id = ?;", (product_id,))
-        if cursor.fetchone() is None:
-            # No hay ningún producto con ese id
-            return False
+    except DatabaseBusyError:
+        raise
 
-        # 2. Preparar la lista de campos a actualizar
-        campos_a_actualizar: List[str] = []
-        valores: List[object] = []
+    except Exception as e:
+        raise RuntimeError(f"Error al actualizar el producto: {e}") from e
 
-        # 2.1. Si 'category' no es None, obtenemos su category_id
-        if category is not None:
-            if category not in CATEGORIAS_PREDEFINIDAS:
-                category = "otros"
-
-            # Buscamos el id numérico de la categoría
-            cursor.execute(SQL_SELECT_CATEGORY_ID, (category,))
-            fila_cat = cursor.fetchone()
-            if fila_cat:
-                cat_id = fila_cat["id"]
-            else:
-                # Por seguridad, nos aseguramos de usar el id de "otros"
-                cursor.execute(SQL_SELECT_CATEGORY_ID, ("otros",))
-                fila_otros = cursor.fetchone()
-                if fila_otros:
-                    cat_id = fila_otros["id"]
-                else:
-                    raise RuntimeError("La categoría 'otros' no está en la base de datos.")
-
-            campos_a_actualizar.append("category_id = ?")
-            valores.append(cat_id)
-
-        # 2.2. Si 'name' no es None, agregamos al SET
-        if name is not None:
-            campos_a_actualizar.append("name = ?")
-            valores.append(name)
 
-        # 2.3. Si 'price' no es None, agregamos al SET
-        if price is not None:
-            campos_a_actualizar.append("price = ?")
-            valores.append(price)
-
-        # 2.4. Si no hay nada que actualizar, salimos
-        if not campos_a_actualizar:
-            return False
-
-        # 3. Construir la cláusula SET de manera dinámica
-        set_clause = ", ".join(campos_a_actualizar)
-
-        sql_update = f"""
-        UPDATE products
-           SET {set_clause}
-         WHERE id = ?;
-        """
-        valores.append(product_id)
-
-        # 4. Ejecutar el UPDATE
-        cursor.execute(sql_update, tuple(valores))
-
-        # 5. Comprobar cuántas filas afectó
-        if cursor.rowcount == 1:
-            conn.commit()
-            return True
-        else:
-            conn.rollback()
-            return False
+def _filtro_productos(
+    category: Optional[str],
+    min_price: Optional[float],
+    max_price: Optional[float]
+) -> Optional[Tuple[List[str], List[object]]]:
+    """
+    Construye las condiciones WHERE comunes de las operaciones masivas.
+
+    Returns:
+        Optional[Tuple[List[str], List[object]]]: Las condiciones y sus
+            parámetros, o None si la categoría no existe (no hay nada que
+            tocar).
+    """
+    condiciones: List[str] = []
+    parametros: List[object] = []
+
+    if category is not None:
+        category_id = registry.get_id(category)
+        if category_id is None:
+            return None
+        condiciones.append("category_id = ?")
+        parametros.append(category_id)
+    if min_price is not None:
+        condiciones.append("price >= ?")
+        parametros.append(min_price)
+    if max_price is not None:
+        condiciones.append("price <= ?")
+        parametros.append(max_price)
+
+    return condiciones, parametros
+
+
+def _execute_bulk(
+    cursor: sqlite3.Cursor,
+    sentencia: str,
+    valores: List[object],
+    condiciones: List[str],
+    parametros: List[object],
+    product_ids: Optional[Iterable[str]],
+    chunk_size: int
+) -> int:
+    """
+    Ejecuta 'sentencia' (UPDATE ... SET ... o DELETE FROM ...) con las
+    condiciones dadas, sin confirmar la transacción. Si se pasan
+    'product_ids', se añaden como "id IN (...)" en bloques de 'chunk_size'
+    parámetros para no superar el límite de variables de SQLite.
+
+    Returns:
+        int: Filas afectadas en total.
+    """
+    if product_ids is None:
+        where = f" WHERE {' AND '.join(condiciones)}" if condiciones else ""
+        cursor.execute(sentencia + where + ";", (*valores, *parametros))
+        return cursor.rowcount
+
+    total = 0
+    iterador = iter(product_ids)
+    while True:
+        bloque = [encode_product_id(pid) for pid in islice(iterador, chunk_size)]
+        if not bloque:
+            break
+        marcas = ",".join("?" * len(bloque))
+        where = " AND ".join([*condiciones, f"id IN ({marcas})"])
+        cursor.execute(f"{sentencia} WHERE {where};", (*valores, *parametros, *bloque))
+        total += cursor.rowcount
+    return total
+
+
+@instrumented
+def reprice_products(
+    percent: Optional[float] = None,
+    amount: Optional[float] = None,
+    category: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    product_ids: Optional[Iterable[str]] = None,
+    chunk_size: int = BIND_CHUNK_SIZE
+) -> int:
+    """
+    Cambia el precio de muchos productos con un único UPDATE (o uno por
+    bloque de ids) en una sola transacción. Los filtros se combinan: sin
+    ninguno, se cambian todos los productos.
+
+    Args:
+        percent     (Optional[float]): Porcentaje a aplicar (5 sube un 5 %,
+                                       -10 baja un 10 %).
+        amount      (Optional[float]): Cantidad fija a sumar (o restar si es
+                                       negativa). Se indica 'percent' o
+                                       'amount', no ambos.
+        category    (Optional[str]): Solo los productos de esta categoría.
+        min_price   (Optional[float]): Solo los de precio >= min_price.
+        max_price   (Optional[float]): Solo los de precio <= max_price.
+        product_ids (Optional[Iterable[str]]): Solo estos productos.
+        chunk_size  (int): Ids por sentencia.
+
+    Returns:
+        int: Número de productos actualizados. El precio resultante se
+             redondea a céntimos y nunca baja de 0.
+    """
+    if (percent is None) == (amount is None):
+        raise ValueError("Indica 'percent' o 'amount' (solo uno de los dos)")
+    if chunk_size <= 0:
+        raise ValueError("chunk_size debe ser mayor que 0")
+
+    if percent is not None:
+        sentencia = "UPDATE products SET price = ROUND(MAX(price * ?, 0), 2)"
+        valores: List[object] = [1 + percent / 100]
+    else:
+        sentencia = "UPDATE products SET price = ROUND(MAX(price + ?, 0), 2)"
+        valores = [amount]
+
+    try:
+        filtro = _filtro_productos(category, min_price, max_price)
+        if filtro is None:
+            return 0
+        if product_ids is not None:
+            # La transacción puede repetirse tras un bloqueo
+            product_ids = list(product_ids)
+
+        actualizados = run_in_transaction(lambda conn: _execute_bulk(
+            conn.cursor(), sentencia, valores, *filtro, product_ids, chunk_size
+        ))
+
+        if actualizados:
+            cache.invalidate()
+        return actualizados
+
+    except DatabaseBusyError:
+        raise
 
     except Exception as e:
-        conn.rollback()
-        raise RuntimeError(f"Error al actualizar el producto: {e}") from e
+        raise RuntimeError(f"Error al actualizar precios en bloque: {e}") from e
+
+
+@instrumented
+def reassign_products(
+    new_category: str,
+    category: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    product_ids: Optional[Iterable[str]] = None,
+    chunk_size: int = BIND_CHUNK_SIZE
+) -> int:
+    """
+    Mueve muchos productos a 'new_category' en una sola transacción. Los
+    filtros se combinan como en reprice_products.
 
-    finally:
-        conn.close()
\ No newline at end of file
+    Args:
+        new_category (str): Categoría de destino. Si no existe, se usa "otros".
+        category     (Optional[str]): Solo los productos de esta categoría.
+        min_price    (Optional[float]): Solo los de precio >= min_price.
+        max_price    (Optional[float]): Solo los de precio <= max_price.
+        product_ids  (Optional[Iterable[str]]): Solo estos productos.
+        chunk_size   (int): Ids por sentencia.
+
+    Returns:
+        int: Número de productos que han cambiado de categoría.
+    """
+    if chunk_size <= 0:
+        raise ValueError("chunk_size debe ser mayor que 0")
+
+    try:
+        filtro = _filtro_productos(category, min_price, max_price)
+        if filtro is None:
+            return 0
+        if product_ids is not None:
+            # La transacción puede repetirse tras un bloqueo
+            product_ids = list(product_ids)
+        condiciones, parametros = filtro
+
+        # Los que ya están en la categoría de destino no cuentan como cambios
+        category_id = registry.resolve(new_category)
+        condiciones.append("category_id <> ?")
+        parametros.append(category_id)
+
+        movidos = run_in_transaction(lambda conn: _execute_bulk(
+            conn.cursor(), "UPDATE products SET category_id = ?", [category_id],
+            condiciones, parametros, product_ids, chunk_size
+        ))
+
+        if movidos:
+            cache.invalidate()
+        return movidos
+
+    except DatabaseBusyError:
+        raise
+
+    except Exception as e:
+        raise RuntimeError(f"Error al cambiar la categoría en bloque: {e}") from e
+
+
+@instrumented
+def delete_products(
+    product_ids: Optional[Iterable[str]] = None,
+    category: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    chunk_size: int = BIND_CHUNK_SIZE
+) -> int:
+    """
+    Borra muchos productos en una sola transacción: los ids indicados (en
+    bloques de 'chunk_size' parámetros), los de una categoría o rango de
+    precios, o la combinación de ambos filtros.
+
+    Args:
+        product_ids (Optional[Iterable[str]]): Ids de los productos a borrar.
+        category    (Optional[str]): Solo los productos de esta categoría.
+        min_price   (Optional[float]): Solo los de precio >= min_price.
+        max_price   (Optional[float]): Solo los de precio <= max_price.
+        chunk_size  (int): Ids por sentencia.
+
+    Returns:
+        int: Número de productos borrados (los ids inexistentes no cuentan).
+    """
+    if product_ids is None and category is None and min_price is None and max_price is None:
+        # Por seguridad, nunca se borra todo el catálogo sin filtros
+        raise ValueError("Indica al menos un filtro (product_ids, category o precio)")
+    if chunk_size <= 0:
+        raise ValueError("chunk_size debe ser mayor que 0")
+
+    try:
+        filtro = _filtro_productos(category, min_price, max_price)
+        if filtro is None:
+            return 0
+        if product_ids is not None:
+            # La transacción puede repetirse tras un bloqueo
+            product_ids = list(product_ids)
+
+        borrados = run_in_transaction(lambda conn: _execute_bulk(
+            conn.cursor(), "DELETE FROM products", [], *filtro, product_ids, chunk_size
+        ))
+
+        if borrados:
+            cache.invalidate()
+        return borrados
+
+    except DatabaseBusyError:
+        raise
+
+    except Exception as e:
+        raise RuntimeError(f"Error al borrar productos en bloque: {e}") from e
@@ -1,11 +1,26 @@
+import atexit
 import os
+import random
 import sqlite3
-from typing import Final
+import threading
+import time
+import weakref
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Dict, Final, Iterator, List, Optional, Tuple, TypeVar
 
+from inventory import schemas
+from inventory.migrations import SCHEMA_VERSION, create_fts_index, get_schema_version, migrate
 from inventory.schemas import (
     CATEGORIAS_PREDEFINIDAS,
     SQL_CREATE_TABLE_CATEGORIES,
-    SQL_CREATE_TABLE_PRODUCTS
+    SQL_CREATE_TABLE_PRODUCTS,
+    SQL_CREATE_TABLE_PRODUCTS_COMPACT,
+    SQL_COUNT_PRODUCTS_BY_CATEGORY,
+    SQL_INSERT_CATEGORY,
+    SQL_REBUILD_CATEGORY_COUNTS,
+    SQL_REBUILD_PRODUCTS_FTS,
+    SQL_SELECT_ALL_CATEGORIES_COUNT,
+    SQL_TABLE_EXISTS
 )
 
 BASE_DIR: Final[str] = os.path.dirname(__file__)
@@ -13,11 +28,24 @@ DB_DIR: Final[str] = "data"
 DB_FILENAME: Final[str] = "inventario.db"
 DB_PATH: Final[str] = os.path.join(BASE_DIR, "..", DB_DIR, DB_FILENAME)
 
+# PRAGMAs de rendimiento que se aplican una sola vez a cada conexión nueva del pool
+SQLITE_PRAGMAS: Final[Dict[str, object]] = {
+    "busy_timeout": 5000,        # ms que SQLite espera a que otra conexión suelte el bloqueo
+    "journal_mode": "WAL",       # lectores y escritor no se bloquean entre sí
+    "synchronous": "NORMAL",     # con WAL es seguro y evita un fsync por commit
+    "cache_size": -20000,        # valor negativo = KiB (~20 MB de caché de páginas)
+    "mmap_size": 268435456,      # 256 MB de lectura mapeada en memoria
+    "temp_store": "MEMORY",
+}
+
 
 def get_connection() -> sqlite3.Connection:
     """
     Retorna una conexión a la base de datos SQLite en data/inventario.db.
     Si la carpeta 'data/' no existe, la crea antes de conectar.
+
+    Es la fábrica que usa el pool para abrir conexiones nuevas; el código
+    de la aplicación debería usar `connection()` en su lugar.
     """
     # Construimos la ruta absoluta a la carpeta data/
     data_dir_path = os.path.join(BASE_DIR, "..", DB_DIR)
@@ -26,42 +54,620 @@ def get_connection() -> sqlite3.Connection:
     if not os.path.exists(data_dir_path):
         os.makedirs(data_dir_path)
 
-    # Conectamos al archivo inventario.db (se crea si no existía)
-    conn = sqlite3.connect(DB_PATH)
+    # Conectamos al archivo inventario.db (se crea si no existía).
+    # check_same_thread=False solo para poder cerrarla desde close_pool();
+    # el pool nunca comparte una misma conexión entre dos hilos.
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
     # Configuramos row_factory para poder acceder a columnas por nombre
     conn.row_factory = sqlite3.Row
     return conn
 
+
+def _apply_pragmas(conn: sqlite3.Connection) -> None:
+    """
+    Aplica SQLITE_PRAGMAS sobre una conexión recién abierta.
+    """
+    for pragma, valor in SQLITE_PRAGMAS.items():
+        conn.execute(f"PRAGMA {pragma} = {valor};")
+
+
+class DatabaseBusyError(RuntimeError):
+    """
+    La base de datos siguió bloqueada por otra conexión (de este u otro
+    proceso) tras agotar la espera de busy_timeout y los reintentos. Es
+    un error transitorio: la misma operación puede funcionar más tarde.
+    Hereda de RuntimeError, así que el código que ya captura los errores
+    de inventory.crud la sigue capturando.
+    """
+
+
+# Reintentos de una transacción de escritura que encuentra la base de datos
+# bloqueada, con espera exponencial y aleatoria (full jitter) entre ellos
+LOCK_RETRIES: int = 3
+LOCK_BACKOFF_BASE: float = 0.01  # segundos
+LOCK_BACKOFF_MAX: float = 0.5    # segundos
+
+_lock_stats_lock = threading.Lock()
+_lock_stats: Dict[str, int] = {"retries": 0, "busy_errors": 0}
+
+
+def is_lock_error(error: BaseException) -> bool:
+    """
+    Indica si 'error' es un bloqueo transitorio de SQLite (SQLITE_BUSY o
+    SQLITE_LOCKED, con cualquiera de sus códigos extendidos), es decir,
+    "database is locked" y similares.
+    """
+    return isinstance(error, sqlite3.OperationalError) and (
+        getattr(error, "sqlite_errorcode", 0) & 0xFF in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+    )
+
+
+def _backoff(intento: int) -> float:
+    """
+    Segundos a esperar antes del reintento 'intento' (0, 1, ...): un valor
+    al azar entre 0 y min(LOCK_BACKOFF_MAX, LOCK_BACKOFF_BASE * 2**intento),
+    para que los escritores que chocaron no vuelvan a chocar a la vez.
+    """
+    return random.uniform(0, min(LOCK_BACKOFF_MAX, LOCK_BACKOFF_BASE * 2 ** intento))
+
+
+def _contar_bloqueo(clave: str) -> None:
+    with _lock_stats_lock:
+        _lock_stats[clave] += 1
+
+
+def lock_stats() -> Dict[str, int]:
+    """
+    Devuelve los contadores de bloqueos de este proceso: "retries"
+    (transacciones repetidas tras un bloqueo) y "busy_errors" (las que
+    agotaron los reintentos y lanzaron DatabaseBusyError).
+    """
+    with _lock_stats_lock:
+        return dict(_lock_stats)
+
+
+def reset_lock_stats() -> None:
+    """
+    Pone a cero los contadores de lock_stats().
+    """
+    with _lock_stats_lock:
+        _lock_stats.update(retries=0, busy_errors=0)
+
+
+# Funciones a invocar sobre cada conexión nueva del pool (tras las PRAGMAs)
+_connect_hooks: List[Callable[[sqlite3.Connection], None]] = []
+
+
+def register_connect_hook(hook: Callable[[sqlite3.Connection], None]) -> None:
+    """
+    Registra una función que recibirá cada conexión que abra el pool, justo
+    después de aplicar SQLITE_PRAGMAS. Para que afecte también a las
+    conexiones ya abiertas, llama después a reconfigure_pool().
+    """
+    _connect_hooks.append(hook)
+
+
+class _ConexionDelHilo:
+    """
+    Conexión de un hilo y su estado en el pool. Solo la referencia el
+    threading.local del pool: cuando el hilo termina se destruye, y un
+    weakref.finalize cierra la conexión y la retira del pool.
+    """
+    __slots__ = ("conn", "generation", "config", "depth", "cierre", "__weakref__")
+
+    def __init__(self, conn: sqlite3.Connection, generation: int, config: int) -> None:
+        self.conn = conn
+        self.generation = generation
+        self.config = config
+        self.depth = 0
+
+
+class ConnectionPool:
+    """
+    Pool de conexiones SQLite con una conexión reutilizable por hilo.
+
+    Cada hilo obtiene siempre la misma conexión (ya configurada con
+    SQLITE_PRAGMAS), de modo que el coste de abrirla se paga una sola vez.
+    Cuando el hilo termina, su conexión se cierra y sale del pool, así que
+    los hilos de vida corta no acumulan conexiones ni descriptores abiertos.
+    `close()` cierra todas las conexiones abiertas e invalida las que
+    quedasen guardadas en otros hilos, que se reabrirán al volver a usarse.
+    `reconfigure()` no cierra nada: cada hilo sustituye su conexión la
+    próxima vez que la pida sin tenerla ya en uso.
+    """
+
+    def __init__(self, factory: Callable[[], sqlite3.Connection]) -> None:
+        self._factory = factory
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections: List[sqlite3.Connection] = []
+        self._generation = 0
+        self._config_generation = 0
+
+    def acquire(self) -> sqlite3.Connection:
+        """
+        Devuelve la conexión del hilo actual, abriéndola si hace falta.
+        """
+        estado: Optional[_ConexionDelHilo] = getattr(self._local, "estado", None)
+        if estado is not None and estado.generation == self._generation \
+                and estado.config != self._config_generation and estado.depth == 0:
+            # Configuración cambiada y conexión libre: la retiramos nosotros,
+            # que somos el hilo que la usa
+            estado.cierre()
+            estado = None
+        if estado is None or estado.generation != self._generation:
+            conn = self._factory()
+            _apply_pragmas(conn)
+            for hook in _connect_hooks:
+                hook(conn)
+            with self._lock:
+                self._connections.append(conn)
+                estado = _ConexionDelHilo(conn, self._generation, self._config_generation)
+            estado.cierre = weakref.finalize(estado, self._descartar, conn)
+            self._local.estado = estado
+        estado.depth += 1
+        return estado.conn
+
+    def _descartar(self, conn: sqlite3.Connection) -> None:
+        """
+        Cierra 'conn' y la retira del pool (al morir su hilo o al sustituirla).
+        """
+        with self._lock:
+            if conn in self._connections:
+                self._connections.remove(conn)
+        try:
+            conn.close()
+        except sqlite3.ProgrammingError:
+            # Conexión ligada a otro hilo: se liberará cuando muera el hilo
+            pass
+
+    def size(self) -> int:
+        """
+        Devuelve el número de conexiones abiertas por el pool.
+        """
+        with self._lock:
+            return len(self._connections)
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        """
+        Devuelve la conexión al pool. Si es el último uso anidado del hilo y
+        quedó una transacción abierta, se deshace para no filtrarla al
+        siguiente usuario.
+        """
+        estado = self._local.estado
+        estado.depth -= 1
+        if estado.depth == 0 and conn.in_transaction:
+            conn.rollback()
+
+    def reconfigure(self) -> None:
+        """
+        Marca todas las conexiones como obsoletas para que cada hilo abra
+        una nueva (con los hooks de conexión actuales) en su próximo uso.
+        """
+        with self._lock:
+            self._config_generation += 1
+
+    def close(self) -> None:
+        """
+        Cierra todas las conexiones del pool.
+        """
+        with self._lock:
+            conexiones = self._connections
+            self._connections = []
+            self._generation += 1
+        for conn in conexiones:
+            try:
+                conn.close()
+            except sqlite3.ProgrammingError:
+                # Conexión ligada a otro hilo: se liberará cuando muera el hilo
+                pass
+
+
+# Fábrica que sustituye a get_connection mientras está establecida (p. ej.
+# la réplica en memoria de inventory.mirror); None = get_connection
+_connection_factory: Optional[Callable[[], sqlite3.Connection]] = None
+
+# Pool global. La fábrica se resuelve en cada apertura para que
+# sustituir `get_connection` (p. ej. en los tests) tenga efecto.
+_pool: Final[ConnectionPool] = ConnectionPool(lambda: (_connection_factory or get_connection)())
+
+
+# El esquema se prepara en la primera conexión que se presta, no al importar
+_schema_ready: bool = False
+_schema_lock = threading.RLock()
+
+
+@contextmanager
+def connection() -> Iterator[sqlite3.Connection]:
+    """
+    Context manager que presta la conexión del pool para el hilo actual.
+
+    Uso:
+        with connection() as conn:
+            with conn:  # transacción
+                conn.execute(...)
+    """
+    conn = _pool.acquire()
+    try:
+        if not _schema_ready:
+            _ensure_schema(conn)
+        yield conn
+    finally:
+        _pool.release(conn)
+
+
+def reconfigure_pool() -> None:
+    """
+    Hace que cada hilo sustituya su conexión del pool en su próximo uso,
+    sin interrumpir las transacciones en curso. Se usa tras cambiar la
+    configuración que reciben las conexiones nuevas (p. ej. los hooks).
+    """
+    _pool.reconfigure()
+
+
+def set_connection_factory(factory: Optional[Callable[[], sqlite3.Connection]]) -> None:
+    """
+    Hace que el pool abra sus conexiones con 'factory' en lugar de con
+    get_connection (o que vuelva a get_connection si es None). Las
+    conexiones ya abiertas se sustituyen en su próximo uso, sin interrumpir
+    las que estén prestadas en ese momento.
+    """
+    global _connection_factory
+    _connection_factory = factory
+    _pool.reconfigure()
+
+
+def configure_locking(
+    busy_timeout_ms: Optional[int] = None,
+    retries: Optional[int] = None,
+    backoff_base: Optional[float] = None,
+    backoff_max: Optional[float] = None
+) -> None:
+    """
+    Ajusta cómo se espera a otras conexiones que tienen la base de datos
+    bloqueada. Los parámetros a None no se cambian.
+
+    Args:
+        busy_timeout_ms (Optional[int]): PRAGMA busy_timeout de las
+            conexiones del pool (las abiertas la adoptan en su próximo uso).
+        retries         (Optional[int]): Reintentos de run_in_transaction.
+        backoff_base    (Optional[float]): Espera máxima del primer
+            reintento, en segundos; se duplica en cada uno.
+        backoff_max     (Optional[float]): Tope de la espera entre reintentos.
+    """
+    global LOCK_RETRIES, LOCK_BACKOFF_BASE, LOCK_BACKOFF_MAX
+    if busy_timeout_ms is not None and busy_timeout_ms < 0:
+        raise ValueError("busy_timeout_ms no puede ser negativo")
+    if retries is not None and retries < 0:
+        raise ValueError("retries no puede ser negativo")
+    if any(v is not None and v < 0 for v in (backoff_base, backoff_max)):
+        raise ValueError("Las esperas entre reintentos no pueden ser negativas")
+
+    if retries is not None:
+        LOCK_RETRIES = retries
+    if backoff_base is not None:
+        LOCK_BACKOFF_BASE = backoff_base
+    if backoff_max is not None:
+        LOCK_BACKOFF_MAX = backoff_max
+    if busy_timeout_ms is not None:
+        SQLITE_PRAGMAS["busy_timeout"] = int(busy_timeout_ms)
+        _pool.reconfigure()
+
+
+T = TypeVar("T")
+
+
+def run_in_transaction(
+    func: Callable[[sqlite3.Connection], T],
+    conn: Optional[sqlite3.Connection] = None
+) -> T:
+    """
+    Ejecuta func(conn) con la conexión del pool (o con 'conn', para
+    conexiones propias fuera del pool) dentro de una transacción
+    BEGIN IMMEDIATE y la confirma. Al reservar el bloqueo de escritura
+    desde el principio, SQLite aplica busy_timeout al BEGIN y la
+    transacción no puede fallar a mitad al intentar pasar de lectura a
+    escritura. Si aun así la base de datos está bloqueada, se deshace todo
+    y se repite hasta LOCK_RETRIES veces con espera aleatoria creciente;
+    'func' debe poder ejecutarse de nuevo desde el principio.
+
+    Si la conexión ya está dentro de una transacción (la abrió quien nos
+    llama), 'func' se ejecuta en ella, sin reintentos ni commit.
+
+    Args:
+        func (Callable[[sqlite3.Connection], T]): Trabajo de la transacción.
+        conn (Optional[sqlite3.Connection]): Conexión a usar en lugar de la del pool.
+
+    Returns:
+        T: Lo que devuelva 'func'.
+
+    Raises:
+        DatabaseBusyError: Si la base de datos sigue bloqueada tras los reintentos.
+    """
+    intento = 0
+    while True:
+        with (connection() if conn is None else nullcontext(conn)) as conexion:
+            if conexion.in_transaction:
+                return func(conexion)
+            try:
+                conexion.execute("BEGIN IMMEDIATE;")
+                try:
+                    resultado = func(conexion)
+                    conexion.commit()
+                except BaseException:
+                    conexion.rollback()
+                    raise
+                return resultado
+            except sqlite3.OperationalError as e:
+                if not is_lock_error(e):
+                    raise
+                if intento >= LOCK_RETRIES:
+                    _contar_bloqueo("busy_errors")
+                    raise DatabaseBusyError(
+                        f"La base de datos sigue bloqueada tras {intento + 1} intentos: {e}"
+                    ) from e
+        _contar_bloqueo("retries")
+        time.sleep(_backoff(intento))
+        intento += 1
+
+
+# Funciones a invocar cuando se cierra el pool (cachés ligadas a la BD)
+_close_hooks: List[Callable[[], None]] = []
+
+
+def register_close_hook(hook: Callable[[], None]) -> None:
+    """
+    Registra una función sin argumentos que se ejecutará cada vez que se
+    cierre el pool. La usan las cachés en memoria derivadas de la base de
+    datos para invalidarse si la siguiente conexión apunta a otro fichero.
+    """
+    _close_hooks.append(hook)
+
+
+# Funciones a invocar tras confirmar las rutinas de mantenimiento de este módulo
+_write_hooks: List[Callable[[], None]] = []
+
+
+def register_write_hook(hook: Callable[[], None]) -> None:
+    """
+    Registra una función sin argumentos que se ejecutará después de que
+    rebuild_fts_index() o rebuild_category_counts() confirmen sus cambios.
+    Esos commits se hacen en la conexión del propio hilo, cuyo
+    PRAGMA data_version no cambia, así que las cachés no podrían notarlos.
+    """
+    _write_hooks.append(hook)
+
+
+def _notificar_escritura() -> None:
+    for hook in _write_hooks:
+        hook()
+
+
+def close_pool() -> None:
+    """
+    Cierra todas las conexiones abiertas por el pool. Se registra con
+    atexit, pero puede llamarse explícitamente al apagar la aplicación.
+    """
+    global _schema_ready
+    _pool.close()
+    # La próxima conexión puede apuntar a otro fichero: se volverá a comprobar
+    _schema_ready = False
+    for hook in _close_hooks:
+        hook()
+
+
+atexit.register(close_pool)
+
+
+def _initialize_schema(conn: sqlite3.Connection) -> bool:
+    """
+    Crea las tablas en la base de datos, rellena las categorías
+    predefinidas y aplica las migraciones pendientes (ver
+    inventory.migrations). Si la versión guardada en PRAGMA user_version ya
+    es la última, no hace nada más: es idempotente y, en una base de datos
+    al día, no abre ninguna transacción de escritura.
+
+    Returns:
+        bool: True si hubo que crear o migrar algo.
+    """
+    if get_schema_version(conn) >= SCHEMA_VERSION:
+        return False
+
+    with conn:
+        cursor = conn.cursor()
+        # 1. Crear tabla de categories
+        cursor.execute(SQL_CREATE_TABLE_CATEGORIES)
+        # 2. Crear tabla de products
+        cursor.execute(SQL_CREATE_TABLE_PRODUCTS)
+        # 3. Insertar cada categoría de la lista (sin duplicados)
+        for nombre in CATEGORIAS_PREDEFINIDAS:
+            cursor.execute(SQL_INSERT_CATEGORY, (nombre,))
+    # 4. Índices y demás cambios de esquema versionados
+    migrate(conn)
+    return True
+
+
+def _ensure_schema(conn: sqlite3.Connection) -> None:
+    """
+    Prepara el esquema una sola vez por proceso (y por base de datos: se
+    repite tras close_pool()). La llama connection() en su primer uso.
+    """
+    global _schema_ready
+    with _schema_lock:
+        if _schema_ready:
+            return
+        try:
+            _initialize_schema(conn)
+        except Exception as e:
+            raise RuntimeError(f"Error al inicializar la base de datos: {e}") from e
+        _schema_ready = True
+
+
 def _initialize_database() -> None:
     """
-    Crea las tablas en la base de datos y rellena las categorías
-    predefinidas. Solo debe ejecutarse una vez por arranque.
+    Prepara el esquema de la base de datos ya, sin esperar al primer uso
+    (p. ej. tras cambiar de fichero en los tests o antes de poblarla).
     """
-    # Sentencia para insertar categorías sin duplicar (si ya existían, IGNORE)
-    categorias_insert: str = "INSERT OR IGNORE INTO categories(name) VALUES (?);"
+    global _schema_ready
+    with _schema_lock:
+        _schema_ready = False
+        with connection():
+            pass
+
+
+def rebuild_fts_index() -> bool:
+    """
+    Reconstruye desde cero el índice FTS5 de nombres de producto
+    (creándolo si no existía). Útil tras importar datos sin triggers o
+    tras un VACUUM, que puede renumerar los rowid de 'products'.
+
+    Returns:
+        bool: True si se reconstruyó, False si SQLite no tiene FTS5.
+    """
+    def reconstruir(conn: sqlite3.Connection) -> bool:
+        cursor = conn.cursor()
+        if not create_fts_index(cursor):
+            return False
+        cursor.execute(SQL_REBUILD_PRODUCTS_FTS)
+        return True
 
-    # Abrimos conexión (get_connection ya se encarga de crear la carpeta data/ si no existe)
-    conn = get_connection()
     try:
-        with conn:
-            cursor = conn.cursor()
-            # 1. Crear tabla de categories
-            cursor.execute(SQL_CREATE_TABLE_CATEGORIES)
-            # 2. Crear tabla de products
-            cursor.execute(SQL_CREATE_TABLE_PRODUCTS)
-            # 3. Insertar cada categoría de la lista (sin duplicados)
-            for nombre in CATEGORIAS_PREDEFINIDAS:
-                cursor.execute(categorias_insert, (nombre,))
+        reconstruido = run_in_transaction(reconstruir)
+    except DatabaseBusyError:
+        raise
     except Exception as e:
-        # Opcional: si quieres personalizar el mensaje de error
-        raise RuntimeError(f"Error al inicializar la base de datos: {e}") from e
-    finally:
-        # Nos aseguramos de cerrar siempre la conexión
-        conn.close()
-            
+        raise RuntimeError(f"Error al reconstruir el índice de búsqueda: {e}") from e
+
+    if reconstruido:
+        _notificar_escritura()
+    return reconstruido
+
+
+def check_category_counts() -> Dict[str, Tuple[int, int]]:
+    """
+    Compara la tabla category_counts con un recuento real sobre products.
+
+    Returns:
+        Dict[str, Tuple[int, int]]: Las categorías descuadradas, con
+                                    (recuento guardado, recuento real).
+                                    Vacío si todo es coherente.
+    """
+    try:
+        with connection() as conn:
+            guardados = {
+                row["category"]: row["total"]
+                for row in conn.execute(SQL_SELECT_ALL_CATEGORIES_COUNT)
+            }
+            reales = {
+                row["category"]: row["total"]
+                for row in conn.execute(SQL_COUNT_PRODUCTS_BY_CATEGORY)
+            }
+    except Exception as e:
+        raise RuntimeError(f"Error al comprobar los recuentos de categorías: {e}") from e
+
+    return {
+        categoria: (guardados.get(categoria, 0), total)
+        for categoria, total in reales.items()
+        if guardados.get(categoria, 0) != total
+    }
+
+
+def rebuild_category_counts() -> None:
+    """
+    Recalcula desde cero la tabla category_counts a partir de products.
+    """
+    def recalcular(conn: sqlite3.Connection) -> None:
+        for statement in SQL_REBUILD_CATEGORY_COUNTS:
+            conn.execute(statement)
+
+    try:
+        run_in_transaction(recalcular)
+    except DatabaseBusyError:
+        raise
+    except Exception as e:
+        raise RuntimeError(f"Error al recalcular los recuentos de categorías: {e}") from e
+
+    _notificar_escritura()
+
+
+# Valores representativos con los que explain_query_plans() completa las
+# plantillas de inventory.schemas (además de las de paginación, {seek})
+_PLAN_TEMPLATE_VALUES: Dict[str, Dict[str, str]] = {
+    "SQL_UPDATE_PRODUCT_RETURNING": {"asignaciones": "price = ?"},
+    "SQL_UPDATE_PRODUCTS_FROM_VALUES": {
+        "columnas": "price",
+        "filas": "(?, ?), (?, ?)",
+        "asignaciones": "price = cambios.price",
+    },
+    "SQL_SNAPSHOT_PRODUCTS_BY_ROWID": {"marcadores": "?, ?, ?"},
+}
+
+
+def explain_query_plans() -> Dict[str, List[str]]:
+    """
+    Ejecuta EXPLAIN QUERY PLAN sobre cada consulta SQL_* de
+    inventory.schemas (SELECT, INSERT, UPDATE y DELETE), con NULL en los
+    parámetros. Sirve para detectar de un vistazo si alguna consulta ha
+    dejado de usar índices ("SCAN products" en lugar de "SEARCH ... USING INDEX").
+
+    Returns:
+        Dict[str, List[str]]: Para cada constante, las líneas del plan
+                              indentadas según su nivel.
+    """
+    planes: Dict[str, List[str]] = {}
 
+    with connection() as conn:
+        # La copia de la migración 7 se explica contra una products_compact
+        # temporal y vacía (y una encode_product_id de paso), que se
+        # eliminan al terminar
+        temporal = conn.execute(SQL_TABLE_EXISTS, ("products_compact",)).fetchone() is None
+        if temporal:
+            conn.execute(SQL_CREATE_TABLE_PRODUCTS_COMPACT.replace("CREATE TABLE", "CREATE TEMP TABLE", 1))
+        conn.create_function("encode_product_id", 1, lambda valor: valor, deterministic=True)
+        try:
+            for nombre, sql in vars(schemas).items():
+                if not nombre.startswith("SQL_") or not isinstance(sql, str):
+                    continue
+                # Las plantillas se explican ya formateadas
+                if "{seek}" in sql:
+                    sql = sql.format(seek="", order="p.id")
+                elif nombre in _PLAN_TEMPLATE_VALUES:
+                    sql = sql.format(**_PLAN_TEMPLATE_VALUES[nombre])
+                if sql.split(None, 1)[0].upper() not in ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH"):
+                    continue
+                planes[nombre] = _explicar(conn, sql)
+        finally:
+            conn.create_function("encode_product_id", 1, None)
+            if temporal:
+                conn.execute("DROP TABLE temp.products_compact;")
 
-try:
-    _initialize_database()
-except Exception as e:
-    raise
\ No newline at end of file
+    return planes
+
+
+def _explicar(conn: sqlite3.Connection, sql: str) -> List[str]:
+    """
+    Devuelve las líneas de EXPLAIN QUERY PLAN de 'sql', indentadas según
+    su nivel, con NULL en los parámetros.
+    """
+    try:
+        filas = conn.execute("EXPLAIN QUERY PLAN " + sql, (None,) * sql.count("?")).fetchall()
+    except sqlite3.OperationalError as e:
+        return [f"(sin plan: {e})"]
+
+    # Cada fila es (id, parent, notused, detail): indentamos por nivel
+    niveles: Dict[int, int] = {0: -1}
+    lineas: List[str] = []
+    for id_nodo, padre, _, detalle in filas:
+        niveles[id_nodo] = niveles.get(padre, -1) + 1
+        lineas.append("  " * niveles[id_nodo] + detalle)
+    return lineas
+
+
+def print_query_plans() -> None:
+    """
+    Imprime el resultado de explain_query_plans().
+    """
+    for nombre, lineas in explain_query_plans().items():
+        print(nombre)
+        for linea in lineas:
+            print(f"    {linea}")
@@ -0,0 +1,335 @@
+"""
+Instrumentación de consultas y registro de consultas lentas.
+
+Desactivada por defecto y sin coste mientras lo está: las conexiones no
+llevan callback de traza y las funciones decoradas con @instrumented solo
+comprueban un booleano antes de llamar a la original.
+
+Al activarla (`enable()`), cada conexión del pool recibe un callback de
+`set_trace_callback` que atribuye cada sentencia SQL a la función de crud
+que la está ejecutando en ese hilo, y se acumulan por función:
+    - llamadas, tiempo total y máximo,
+    - sentencias que SQLite pasa al callback de traza ("queries"),
+    - elementos devueltos al llamador ("returned") y filas modificadas
+      ("changes", de total_changes).
+
+"queries" no cuenta solo el SQL de la función: incluye BEGIN y COMMIT,
+las comprobaciones de PRAGMA data_version de la caché y del registro de
+categorías y las sentencias que SQLite ejecuta por dentro (las del índice
+FTS5 y la sentencia original, que se vuelve a notificar al entrar en cada
+trigger). Solo se descartan las del cuerpo de los triggers, que llegan
+como comentarios "-- ...". Sirve para comparar una función consigo misma,
+no como número exacto de consultas.
+
+"returned" tampoco son filas leídas de SQLite, sino lo que recibe el
+llamador: la longitud de la lista o del dict devuelto, cada elemento de
+un generador, 1 si devuelve un solo objeto (p. ej. el id de add_product)
+y 0 si devuelve un booleano, un número o None, aunque haya leído filas.
+
+El tiempo de cada sentencia se mide desde que empieza hasta que empieza la
+siguiente o termina la llamada (incluye, por tanto, la lectura de sus
+filas). Las que superen `slow_query_threshold` se guardan en el registro
+de consultas lentas junto con la función y el punto de llamada.
+"""
+import collections
+import functools
+import inspect
+import os
+import sqlite3
+import sys
+import threading
+import time
+from typing import Callable, Deque, Dict, Iterator, List, Optional, TextIO, TypeVar
+
+from inventory import db
+
+F = TypeVar("F", bound=Callable)
+
+# Umbral por defecto del registro de consultas lentas (segundos)
+SLOW_QUERY_THRESHOLD: float = 0.1
+# Entradas máximas que conserva el registro de consultas lentas
+SLOW_QUERY_LOG_SIZE: int = 1000
+
+# Nombre con el que se agrupan las sentencias que no ocurren dentro de
+# ninguna función instrumentada (p. ej. las del hilo de writequeue)
+SIN_FUNCION: str = "(sin función)"
+
+_PAQUETE_DIR: str = os.path.dirname(os.path.abspath(__file__))
+
+_enabled: bool = False
+_threshold: float = SLOW_QUERY_THRESHOLD
+_lock = threading.Lock()
+_local = threading.local()
+_stats: Dict[str, Dict[str, float]] = {}
+_slow_queries: Deque[Dict[str, object]] = collections.deque(maxlen=SLOW_QUERY_LOG_SIZE)
+
+
+class _Llamada:
+    """
+    Estado de una llamada instrumentada en curso (una por hilo y nivel).
+    """
+    __slots__ = ("nombre", "call_site", "queries", "sql", "inicio_sql")
+
+    def __init__(self, nombre: str, call_site: str) -> None:
+        self.nombre = nombre
+        self.call_site = call_site
+        self.queries = 0
+        self.sql: Optional[str] = None
+        self.inicio_sql = 0.0
+
+
+def _call_site() -> str:
+    """
+    Devuelve "fichero:línea" del primer marco de la pila fuera del paquete
+    inventory (quién llamó a la función de crud).
+    """
+    marco = sys._getframe(2)
+    while marco is not None:
+        fichero = os.path.abspath(marco.f_code.co_filename)
+        if not fichero.startswith(_PAQUETE_DIR):
+            return f"{fichero}:{marco.f_lineno}"
+        marco = marco.f_back
+    return "?"
+
+
+def _acumular(nombre: str, **valores: float) -> Dict[str, float]:
+    entrada = _stats.get(nombre)
+    if entrada is None:
+        entrada = _stats[nombre] = {
+            "calls": 0, "total_time": 0.0, "max_time": 0.0,
+            "queries": 0, "returned": 0, "changes": 0,
+        }
+    for clave, valor in valores.items():
+        if clave == "max_time":
+            entrada[clave] = max(entrada[clave], valor)
+        else:
+            entrada[clave] += valor
+    return entrada
+
+
+def _cerrar_sentencia(llamada: _Llamada, ahora: float) -> None:
+    """
+    Da por terminada la sentencia en curso de 'llamada' y, si ha sido
+    lenta, la anota en el registro.
+    """
+    if llamada.sql is None:
+        return
+    duracion = ahora - llamada.inicio_sql
+    if duracion >= _threshold:
+        with _lock:
+            _slow_queries.append({
+                "sql": llamada.sql.strip(),
+                "seconds": duracion,
+                "function": llamada.nombre,
+                "call_site": llamada.call_site,
+                "thread": threading.current_thread().name,
+                "timestamp": time.time(),
+            })
+    llamada.sql = None
+
+
+def _trace(sql: str) -> None:
+    """
+    Callback de set_trace_callback: atribuye la sentencia a la llamada
+    instrumentada en curso en este hilo.
+    """
+    # Las sentencias de los triggers llegan como comentarios "-- TRIGGER x"
+    if sql.startswith("--"):
+        return
+    ahora = time.perf_counter()
+    pila: List[_Llamada] = getattr(_local, "pila", None) or []
+    if pila:
+        llamada = pila[-1]
+        _cerrar_sentencia(llamada, ahora)
+        llamada.queries += 1
+        llamada.sql = sql
+        llamada.inicio_sql = ahora
+    else:
+        with _lock:
+            _acumular(SIN_FUNCION, queries=1)
+
+
+def _on_connect(conn: sqlite3.Connection) -> None:
+    if _enabled:
+        conn.set_trace_callback(_trace)
+
+
+db.register_connect_hook(_on_connect)
+
+
+def _empezar(nombre: str) -> _Llamada:
+    llamada = _Llamada(nombre, _call_site())
+    pila = getattr(_local, "pila", None)
+    if pila is None:
+        pila = _local.pila = []
+    pila.append(llamada)
+    return llamada
+
+
+def _terminar(llamada: _Llamada, segundos: float, devueltos: int, cambios: int) -> None:
+    _cerrar_sentencia(llamada, time.perf_counter())
+    _local.pila.remove(llamada)
+    with _lock:
+        _acumular(
+            llamada.nombre, calls=1, total_time=segundos, max_time=segundos,
+            queries=llamada.queries, returned=devueltos, changes=cambios
+        )
+
+
+def _total_changes() -> int:
+    with db.connection() as conn:
+        return conn.total_changes
+
+
+def _contar_devueltos(resultado: object) -> int:
+    if isinstance(resultado, tuple) and resultado and isinstance(resultado[0], list):
+        # Funciones paginadas: (productos, cursor)
+        return len(resultado[0])
+    if isinstance(resultado, (list, dict)):
+        return len(resultado)
+    if resultado is None or isinstance(resultado, (bool, int, float)):
+        return 0
+    return 1
+
+
+def instrumented(funcion: F) -> F:
+    """
+    Decorador para las funciones públicas de crud. Si la instrumentación
+    está desactivada, llama directamente a la función original.
+    """
+    nombre = funcion.__name__
+
+    if inspect.isgeneratorfunction(funcion):
+        def _iterar(args, kwargs) -> Iterator:
+            llamada = _empezar(nombre)
+            inicio = time.perf_counter()
+            cambios = _total_changes()
+            devueltos = 0
+            try:
+                for elemento in funcion(*args, **kwargs):
+                    devueltos += 1
+                    yield elemento
+            finally:
+                _terminar(
+                    llamada, time.perf_counter() - inicio, devueltos,
+                    _total_changes() - cambios
+                )
+
+        @functools.wraps(funcion)
+        def envoltorio_gen(*args, **kwargs):
+            if not _enabled:
+                return funcion(*args, **kwargs)
+            return _iterar(args, kwargs)
+
+        return envoltorio_gen  # type: ignore[return-value]
+
+    @functools.wraps(funcion)
+    def envoltorio(*args, **kwargs):
+        if not _enabled:
+            return funcion(*args, **kwargs)
+        llamada = _empezar(nombre)
+        inicio = time.perf_counter()
+        cambios = _total_changes()
+        devueltos = 0
+        try:
+            resultado = funcion(*args, **kwargs)
+            devueltos = _contar_devueltos(resultado)
+            return resultado
+        finally:
+            _terminar(
+                llamada, time.perf_counter() - inicio, devueltos,
+                _total_changes() - cambios
+            )
+
+    return envoltorio  # type: ignore[return-value]
+
+
+def enable(slow_query_threshold: float = SLOW_QUERY_THRESHOLD) -> None:
+    """
+    Activa la instrumentación. Las conexiones del pool se sustituyen (sin
+    interrumpir transacciones en curso) por otras con el callback de traza.
+
+    Args:
+        slow_query_threshold (float): Segundos a partir de los cuales una
+                                      sentencia se anota como lenta.
+    """
+    global _enabled, _threshold
+    _threshold = slow_query_threshold
+    if not _enabled:
+        _enabled = True
+        db.reconfigure_pool()
+
+
+def disable() -> None:
+    """
+    Desactiva la instrumentación y retira el callback de traza de las
+    conexiones. Los contadores se conservan hasta llamar a reset().
+    """
+    global _enabled
+    if _enabled:
+        _enabled = False
+        db.reconfigure_pool()
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def reset() -> None:
+    """
+    Pone a cero los contadores y vacía el registro de consultas lentas.
+    """
+    with _lock:
+        _stats.clear()
+        _slow_queries.clear()
+
+
+def stats() -> Dict[str, Dict[str, float]]:
+    """
+    Devuelve una copia de los contadores por función: "calls",
+    "total_time", "max_time", "avg_time", "queries", "returned" y
+    "changes" (ver el docstring del módulo).
+    """
+    with _lock:
+        copia = {nombre: dict(valores) for nombre, valores in _stats.items()}
+    for valores in copia.values():
+        valores["avg_time"] = valores["total_time"] / valores["calls"] if valores["calls"] else 0.0
+    return copia
+
+
+def slow_queries() -> List[Dict[str, object]]:
+    """
+    Devuelve el registro de consultas lentas (de la más antigua a la más reciente).
+    """
+    with _lock:
+        return list(_slow_queries)
+
+
+def dump_stats(salida: Optional[TextIO] = None) -> None:
+    """
+    Escribe un resumen legible de los contadores y de las consultas lentas.
+    """
+    salida = salida or sys.stdout
+    contadores = stats()
+    print(
+        f"{'función':28s} {'llamadas':>9s} {'total s':>9s} {'media ms':>9s} "
+        f"{'máx ms':>9s} {'SQL':>7s} {'devueltos':>9s} {'cambios':>8s}",
+        file=salida
+    )
+    for nombre, v in sorted(contadores.items(), key=lambda kv: -kv[1]["total_time"]):
+        print(
+            f"{nombre:28s} {v['calls']:9d} {v['total_time']:9.3f} "
+            f"{v['avg_time'] * 1000:9.3f} {v['max_time'] * 1000:9.3f} "
+            f"{v['queries']:7d} {v['returned']:9d} {v['changes']:8d}",
+            file=salida
+        )
+    lentas = slow_queries()
+    if lentas:
+        print(f"\nConsultas lentas (>= {_threshold * 1000:.0f} ms):", file=salida)
+        for entrada in lentas:
+            sql = " ".join(str(entrada["sql"]).split())
+            print(
+                f"  {entrada['seconds'] * 1000:9.3f} ms  {entrada['function']}  "
+                f"{entrada['call_site']}\n      {sql}",
+                file=salida
+            )
@@ -0,0 +1,206 @@
+"""
+Migraciones versionadas del esquema.
+
+La versión del esquema de cada base de datos se guarda en
+`PRAGMA user_version`. Cada migración tiene un número de versión
+consecutivo y se aplica, junto con la actualización de user_version, en
+una única transacción; así una base de datos existente evoluciona en el
+sitio y nunca queda a medio migrar.
+
+Para añadir una migración basta con añadir una entrada al final de
+MIGRATIONS; nunca se deben modificar ni reordenar las ya publicadas.
+"""
+import sqlite3
+from typing import Callable, List, NamedTuple, Optional
+
+from inventory.models import encode_product_id
+from inventory.schemas import (
+    SQL_COPY_PRODUCTS_COMPACT,
+    SQL_CREATE_TABLE_CATEGORY_COUNTS,
+    SQL_CREATE_TABLE_IMPORT_PROGRESS,
+    SQL_CREATE_TABLE_PRODUCT_CHANGES,
+    SQL_CREATE_TRIGGERS_CATEGORY_COUNTS,
+    SQL_REBUILD_CATEGORY_COUNTS,
+    SQL_CREATE_INDEX_PRODUCTS_CATEGORY,
+    SQL_CREATE_INDEX_PRODUCTS_CATEGORY_ID,
+    SQL_CREATE_INDEX_PRODUCTS_CATEGORY_NAME,
+    SQL_CREATE_INDEX_PRODUCTS_CATEGORY_PRICE,
+    SQL_CREATE_INDEX_PRODUCTS_NAME,
+    SQL_CREATE_TABLE_PRODUCTS_COMPACT,
+    SQL_CREATE_TABLE_PRODUCTS_FTS,
+    SQL_CREATE_TRIGGERS_PRODUCTS_FTS,
+    SQL_DROP_INDEX_PRODUCTS_CATEGORY,
+    SQL_REBUILD_PRODUCTS_FTS,
+    SQL_REPLACE_PRODUCTS_COMPACT,
+    SQL_TABLE_EXISTS
+)
+
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    apply: Callable[[sqlite3.Cursor], None]
+
+
+def _sql(*statements: str) -> Callable[[sqlite3.Cursor], None]:
+    """
+    Crea una función de migración que ejecuta las sentencias dadas en orden.
+    """
+    def aplicar(cursor: sqlite3.Cursor) -> None:
+        for statement in statements:
+            cursor.execute(statement)
+    return aplicar
+
+
+def create_fts_index(cursor: sqlite3.Cursor) -> bool:
+    """
+    Crea la tabla products_fts y sus triggers si SQLite tiene FTS5.
+    Si la tabla no existía (p. ej. en una base de datos anterior), la
+    rellena con los productos que ya hubiera.
+
+    Returns:
+        bool: True si el índice está disponible, False si falta FTS5.
+    """
+    ya_existia = cursor.execute(SQL_TABLE_EXISTS, ("products_fts",)).fetchone() is not None
+    try:
+        cursor.execute(SQL_CREATE_TABLE_PRODUCTS_FTS)
+    except sqlite3.OperationalError:
+        # SQLite compilado sin FTS5: search_product usará LIKE
+        return False
+    for trigger in SQL_CREATE_TRIGGERS_PRODUCTS_FTS:
+        cursor.execute(trigger)
+    if not ya_existia:
+        cursor.execute(SQL_REBUILD_PRODUCTS_FTS)
+    return True
+
+
+def compact_product_ids(cursor: sqlite3.Cursor) -> None:
+    """
+    Reconstruye products con los ids como BLOB de 16 bytes. Se copian las
+    filas conservando su rowid y después se recrean los índices y los
+    triggers, que desaparecen al borrar la tabla antigua.
+    """
+    def codificar(valor: object) -> object:
+        return encode_product_id(valor) if isinstance(valor, str) else valor
+
+    cursor.connection.create_function("encode_product_id", 1, codificar, deterministic=True)
+
+    # 1. Copiar a la tabla nueva y sustituir la antigua
+    cursor.execute(SQL_CREATE_TABLE_PRODUCTS_COMPACT)
+    cursor.execute(SQL_COPY_PRODUCTS_COMPACT)
+    for statement in SQL_REPLACE_PRODUCTS_COMPACT:
+        cursor.execute(statement)
+
+    # 2. Índices de las migraciones 2 y 4
+    for statement in (
+        SQL_CREATE_INDEX_PRODUCTS_NAME,
+        SQL_CREATE_INDEX_PRODUCTS_CATEGORY_NAME,
+        SQL_CREATE_INDEX_PRODUCTS_CATEGORY_PRICE,
+        SQL_CREATE_INDEX_PRODUCTS_CATEGORY_ID,
+    ):
+        cursor.execute(statement)
+
+    # 3. Triggers de category_counts y, si existe el índice, de products_fts
+    for trigger in SQL_CREATE_TRIGGERS_CATEGORY_COUNTS:
+        cursor.execute(trigger)
+    if cursor.execute(SQL_TABLE_EXISTS, ("products_fts",)).fetchone() is not None:
+        for trigger in SQL_CREATE_TRIGGERS_PRODUCTS_FTS:
+            cursor.execute(trigger)
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(
+        1, "Índice products(category_id) para búsquedas y recuentos por categoría",
+        _sql(SQL_CREATE_INDEX_PRODUCTS_CATEGORY)
+    ),
+    Migration(
+        2, "Índice products(name) para ordenar y buscar por nombre exacto",
+        _sql(SQL_CREATE_INDEX_PRODUCTS_NAME)
+    ),
+    Migration(
+        3, "Índice de texto completo products_fts (si SQLite tiene FTS5)",
+        create_fts_index
+    ),
+    Migration(
+        4, "Índices compuestos por categoría (name/price/id) para paginar sin OFFSET",
+        _sql(
+            SQL_CREATE_INDEX_PRODUCTS_CATEGORY_NAME,
+            SQL_CREATE_INDEX_PRODUCTS_CATEGORY_PRICE,
+            SQL_CREATE_INDEX_PRODUCTS_CATEGORY_ID,
+            SQL_DROP_INDEX_PRODUCTS_CATEGORY
+        )
+    ),
+    Migration(
+        5, "Tabla category_counts mantenida por triggers para get_categories",
+        _sql(
+            SQL_CREATE_TABLE_CATEGORY_COUNTS,
+            *SQL_CREATE_TRIGGERS_CATEGORY_COUNTS,
+            *SQL_REBUILD_CATEGORY_COUNTS
+        )
+    ),
+    Migration(
+        6, "Tabla import_progress para reanudar importaciones interrumpidas",
+        _sql(SQL_CREATE_TABLE_IMPORT_PROGRESS)
+    ),
+    Migration(
+        7, "Ids de producto compactos: UUID en BLOB de 16 bytes",
+        compact_product_ids
+    ),
+    Migration(
+        8, "Tabla product_changes para refrescar las copias en memoria",
+        _sql(SQL_CREATE_TABLE_PRODUCT_CHANGES)
+    ),
+]
+
+# Versión de esquema que deja la última migración
+SCHEMA_VERSION: int = MIGRATIONS[-1].version
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """
+    Devuelve la versión de esquema guardada en PRAGMA user_version.
+    """
+    return conn.execute("PRAGMA user_version;").fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection, target: Optional[int] = None) -> List[Migration]:
+    """
+    Aplica, en orden, las migraciones pendientes hasta 'target' (por defecto,
+    hasta la última). Cada una se ejecuta en su propia transacción junto con
+    la actualización de PRAGMA user_version.
+
+    Args:
+        conn   (sqlite3.Connection): Conexión sobre la que migrar.
+        target (Optional[int]): Versión final deseada.
+
+    Returns:
+        List[Migration]: Las migraciones aplicadas (vacía si ya estaba al día).
+    """
+    if target is None:
+        target = SCHEMA_VERSION
+
+    actual = get_schema_version(conn)
+    aplicadas: List[Migration] = []
+
+    for migracion in MIGRATIONS:
+        if migracion.version <= actual or migracion.version > target:
+            continue
+
+        cursor = conn.cursor()
+        # BEGIN explícito: sqlite3 no abre transacción por sí solo ante DDL.
+        # IMMEDIATE reserva la escritura antes de volver a leer la versión,
+        # por si otro proceso que arrancó a la vez ya aplicó esta migración
+        cursor.execute("BEGIN IMMEDIATE;")
+        try:
+            if get_schema_version(conn) >= migracion.version:
+                conn.rollback()
+                continue
+            migracion.apply(cursor)
+            cursor.execute(f"PRAGMA user_version = {migracion.version:d};")
+        except Exception:
+            conn.rollback()
+            raise
+        conn.commit()
+        aplicadas.append(migracion)
+
+    return aplicadas
@@ -0,0 +1,208 @@
+"""
+Réplica de solo lectura en memoria para los nodos que solo sirven
+lecturas (search_product, search_category, get_categories...).
+
+Desactivada por defecto. Al activarla (`enable()`), el contenido de la base
+de datos se copia con la API de backup de SQLite a una base de datos en
+memoria y el pool pasa a prestar conexiones a esa copia: ninguna lectura
+vuelve a tocar el fichero ni sus bloqueos. Las conexiones a la réplica
+tienen `PRAGMA query_only`, así que cualquier escritura falla mientras
+está activa.
+
+La réplica se refresca cada `refresh_interval` segundos desde un hilo en
+segundo plano, o a demanda con `refresh()`. Solo se vuelve a copiar si
+`PRAGMA data_version`, leído en una conexión propia al fichero, indica que
+otra conexión (de este u otro proceso) ha confirmado cambios; a diferencia
+de la fecha de modificación del fichero, también detecta los commits que
+todavía están solo en el WAL. Cada copia nueva es una base de datos en
+memoria distinta: se rellena entera y después se cambia la fábrica del
+pool, de modo que cada consulta ve la copia anterior o la nueva completas,
+nunca una a medias. La anterior se libera cuando la última conexión que
+la usa pasa a la nueva.
+"""
+import itertools
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+from inventory import db
+from inventory.categories import registry
+
+# Intervalo de refresco por defecto
+MIRROR_REFRESH_INTERVAL: float = 5.0  # segundos
+
+_enabled: bool = False
+_lock = threading.RLock()
+# Conexión al fichero: origen del backup y de data_version
+_origen: Optional[sqlite3.Connection] = None
+# Conexión que mantiene viva la copia en memoria vigente, y su URI
+_copia: Optional[sqlite3.Connection] = None
+_uri: Optional[str] = None
+_version: Optional[int] = None
+_nombres = itertools.count(1)
+_hilo: Optional[threading.Thread] = None
+_parar = threading.Event()
+_stats: Dict[str, object] = {
+    "checks": 0, "refreshes": 0, "errors": 0, "last_refresh_seconds": 0.0, "last_error": None,
+}
+
+
+def _abrir_replica() -> sqlite3.Connection:
+    """
+    Fábrica de conexiones del pool mientras la réplica está activa.
+    """
+    conn = sqlite3.connect(_uri, uri=True, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA query_only = ON;")
+    return conn
+
+
+def refresh(force: bool = False) -> bool:
+    """
+    Vuelve a copiar la base de datos a memoria si ha cambiado desde la
+    última copia (o siempre, con 'force').
+
+    Returns:
+        bool: True si se hizo una copia nueva.
+    """
+    global _copia, _uri, _version
+    with _lock:
+        if not _enabled:
+            raise RuntimeError("La réplica en memoria no está activada")
+        try:
+            # 1. ¿Ha confirmado cambios otra conexión desde la última copia?
+            version = _origen.execute("PRAGMA data_version;").fetchone()[0]
+            _stats["checks"] += 1
+            if not force and version == _version:
+                return False
+
+            # 2. Copia completa a una base de datos en memoria nueva
+            inicio = time.perf_counter()
+            uri = f"file:inventory-mirror-{next(_nombres)}?mode=memory&cache=shared"
+            nueva = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            try:
+                _origen.backup(nueva)
+            except Exception:
+                nueva.close()
+                raise
+
+            # 3. Cambio atómico: las conexiones nuevas del pool abren la copia nueva
+            anterior = _copia
+            _copia, _uri, _version = nueva, uri, version
+            db.set_connection_factory(_abrir_replica)
+            registry.invalidate()
+            if anterior is not None:
+                anterior.close()
+
+            _stats["refreshes"] += 1
+            _stats["last_refresh_seconds"] = time.perf_counter() - inicio
+            return True
+
+        except Exception as e:
+            _stats["errors"] += 1
+            _stats["last_error"] = str(e)
+            raise RuntimeError(f"Error al refrescar la réplica en memoria: {e}") from e
+
+
+def _refrescar_periodicamente(intervalo: float, parar: threading.Event) -> None:
+    while not parar.wait(intervalo):
+        try:
+            refresh()
+        except RuntimeError:
+            # Se sigue sirviendo la copia anterior; el error queda en stats()
+            pass
+
+
+def enable(refresh_interval: Optional[float] = MIRROR_REFRESH_INTERVAL) -> None:
+    """
+    Copia la base de datos a memoria y hace que todas las lecturas se
+    sirvan desde ella (o cambia el intervalo, volviendo a copiar).
+
+    Args:
+        refresh_interval (Optional[float]): Segundos entre comprobaciones de
+            cambios. None para refrescar solo a demanda con refresh().
+    """
+    global _enabled, _origen, _hilo, _parar
+    if refresh_interval is not None and refresh_interval <= 0:
+        raise ValueError("refresh_interval debe ser mayor que 0")
+    disable()
+
+    with _lock:
+        # El esquema del fichero se prepara antes de copiarlo
+        with db.connection():
+            pass
+        _origen = db.get_connection()
+        _enabled = True
+        try:
+            refresh(force=True)
+        except Exception:
+            disable()
+            raise
+
+        if refresh_interval is not None:
+            _parar = threading.Event()
+            _hilo = threading.Thread(
+                target=_refrescar_periodicamente, args=(refresh_interval, _parar),
+                name="inventory-mirror", daemon=True
+            )
+            _hilo.start()
+
+
+def disable() -> None:
+    """
+    Vuelve a servir las lecturas desde el fichero y libera la réplica.
+    """
+    global _enabled, _origen, _copia, _uri, _version, _hilo
+    hilo = _hilo
+    if hilo is not None:
+        _parar.set()
+        if hilo is not threading.current_thread():
+            hilo.join()
+        _hilo = None
+
+    with _lock:
+        if not _enabled:
+            return
+        _enabled = False
+        db.set_connection_factory(None)
+        registry.invalidate()
+        for conn in (_copia, _origen):
+            if conn is not None:
+                try:
+                    conn.close()
+                except sqlite3.ProgrammingError:
+                    pass
+        _origen = _copia = _uri = _version = None
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def reset() -> None:
+    """
+    Pone a cero los contadores de stats().
+    """
+    with _lock:
+        _stats.update(checks=0, refreshes=0, errors=0, last_refresh_seconds=0.0, last_error=None)
+
+
+def stats() -> Dict[str, object]:
+    """
+    Devuelve "enabled", "checks", "refreshes", "errors", "last_error",
+    "last_refresh_seconds" y "bytes" (tamaño de la copia vigente).
+    """
+    with _lock:
+        copia = dict(_stats)
+        copia["enabled"] = _enabled
+        copia["bytes"] = 0
+        if _copia is not None:
+            paginas = _copia.execute("PRAGMA page_count;").fetchone()[0]
+            tamano = _copia.execute("PRAGMA page_size;").fetchone()[0]
+            copia["bytes"] = paginas * tamano
+    return copia
+
+
+# Al cerrar el pool (p. ej. al cambiar de base de datos) la réplica deja de valer
+db.register_close_hook(disable)
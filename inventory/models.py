@@ -0,0 +1,117 @@
+"""
+Tipo de registro compacto para los productos devueltos por las búsquedas,
+y conversión de los identificadores de producto.
+
+Por defecto las funciones de búsqueda de inventory.crud devuelven un dict
+por fila. Con compact=True devuelven objetos Product, que son tuplas con
+nombre: no tienen __dict__ por instancia ni repiten las cuatro claves en
+cada fila, y se construyen directamente desde el cursor mediante un
+row_factory, sin pasar por sqlite3.Row.
+
+Los identificadores son UUID versión 7 (ordenados por tiempo), que en la
+base de datos se guardan como BLOB de 16 bytes en lugar de como texto de
+36 caracteres. La API pública sigue usando cadenas: encode_product_id y
+decode_product_id convierten en la frontera. Los ids que no son un UUID
+canónico (p. ej. importados de otro sistema) se guardan tal cual, como
+texto.
+"""
+import os
+import sqlite3
+import time
+import uuid
+from typing import Callable, Dict, NamedTuple, Tuple, Union
+
+
+def new_product_id() -> uuid.UUID:
+    """
+    Genera un UUID versión 7 (RFC 9562): 48 bits de milisegundos Unix
+    seguidos de 74 bits aleatorios. Los ids consecutivos quedan ordenados
+    por tiempo, así que las inserciones van al final del índice de clave
+    primaria en lugar de repartirse por todas sus páginas.
+    """
+    return make_product_id(time.time_ns() // 1_000_000, int.from_bytes(os.urandom(10), "big"))
+
+
+def make_product_id(milisegundos: int, aleatorio: int) -> uuid.UUID:
+    """
+    Compone un UUID versión 7 a partir del instante en milisegundos y de
+    80 bits aleatorios (de los que se conservan 74). Permite generar ids
+    reproducibles a partir de una semilla, p. ej. en populate_db.py.
+    """
+    valor = (milisegundos & 0xFFFF_FFFF_FFFF) << 80 | (aleatorio & ((1 << 80) - 1))
+    # Versión 7 (bits 76-79) y variante RFC 4122 (bits 62-63)
+    valor = (valor & ~(0xF << 76)) | (0x7 << 76)
+    valor = (valor & ~(0x3 << 62)) | (0x2 << 62)
+    return uuid.UUID(int=valor)
+
+
+def encode_product_id(product_id: str) -> Union[bytes, str]:
+    """
+    Convierte un id de la API al valor guardado en la base de datos: los
+    UUID en forma canónica (minúsculas con guiones) pasan a 16 bytes; el
+    resto se deja como texto.
+    """
+    if (
+        len(product_id) == 36
+        and product_id[8] == product_id[13] == product_id[18] == product_id[23] == "-"
+        and product_id == product_id.lower()
+    ):
+        try:
+            return bytes.fromhex(product_id.replace("-", ""))
+        except ValueError:
+            pass
+    return product_id
+
+
+def decode_product_id(valor: Union[bytes, str]) -> str:
+    """
+    Inversa de encode_product_id: convierte el valor guardado en el id de
+    la API.
+    """
+    if type(valor) is bytes:
+        h = valor.hex()
+        return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+    return valor
+
+
+class Product(NamedTuple):
+    """
+    Producto del inventario. Se accede por atributo (p.name) o por
+    posición, y as_dict() devuelve el mismo dict que las búsquedas
+    clásicas.
+    """
+    product_id: str
+    category: str
+    name: str
+    price: float
+
+    def as_dict(self) -> Dict[str, object]:
+        return {
+            "product_id": self.product_id,
+            "category":   self.category,
+            "name":       self.name,
+            "price":      self.price,
+        }
+
+
+# Constructor de tuplas sin la validación de Product.__new__: la tupla ya
+# trae exactamente (product_id, category, name, price)
+_nueva_tupla = tuple.__new__
+
+
+def product_row_factory(cursor: sqlite3.Cursor, row: Tuple) -> Product:
+    """
+    row_factory para las consultas que devuelven las columnas
+    (product_id, category, name, price) en ese orden.
+    """
+    return _nueva_tupla(Product, (decode_product_id(row[0]), row[1], row[2], row[3]))
+
+
+def category_row_factory(category: str) -> Callable[[sqlite3.Cursor, Tuple], Product]:
+    """
+    Devuelve un row_factory para las consultas por categoría, que solo
+    devuelven (product_id, name, price): la categoría es la buscada.
+    """
+    def factory(cursor: sqlite3.Cursor, row: Tuple) -> Product:
+        return _nueva_tupla(Product, (decode_product_id(row[0]), category, row[1], row[2]))
+    return factory
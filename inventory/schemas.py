@@ -1,4 +1,4 @@
-from typing import List
+from typing import Dict, List
 
 CATEGORIAS_PREDEFINIDAS: List[str] = [
     "alimentación",
@@ -26,6 +26,221 @@ CREATE TABLE IF NOT EXISTS products (
 );
 """
 
+# Tabla products con los ids compactos: UUID en BLOB de 16 bytes en lugar
+# de TEXT de 36 caracteres (la crea la migración 7 y pasa a llamarse
+# products). Sigue siendo una tabla con rowid porque products_fts enlaza
+# con ella por rowid.
+SQL_CREATE_TABLE_PRODUCTS_COMPACT: str = """
+CREATE TABLE products_compact (
+    id          BLOB PRIMARY KEY,
+    category_id INTEGER NOT NULL,
+    name        TEXT NOT NULL,
+    price       REAL NOT NULL,
+    FOREIGN KEY (category_id) REFERENCES categories(id)
+);
+"""
+
+# Copiar los productos conservando su rowid (el índice FTS5 sigue valiendo).
+# encode_product_id es una función SQL registrada por la migración.
+SQL_COPY_PRODUCTS_COMPACT: str = """
+INSERT INTO products_compact (rowid, id, category_id, name, price)
+SELECT rowid, encode_product_id(id), category_id, name, price
+  FROM products
+ ORDER BY rowid;
+"""
+
+SQL_REPLACE_PRODUCTS_COMPACT: List[str] = [
+    "DROP TABLE products;",
+    "ALTER TABLE products_compact RENAME TO products;",
+]
+
+# Índices secundarios sobre products (los crean las migraciones)
+SQL_CREATE_INDEX_PRODUCTS_CATEGORY: str = """
+CREATE INDEX IF NOT EXISTS idx_products_category_id
+    ON products (category_id);
+"""
+
+SQL_CREATE_INDEX_PRODUCTS_NAME: str = """
+CREATE INDEX IF NOT EXISTS idx_products_name
+    ON products (name);
+"""
+
+# Índices compuestos para recorrer una categoría ordenada por nombre o
+# precio (paginación por clave, sin OFFSET). Incluyen el id porque es el
+# desempate de la ordenación; así el ORDER BY sale entero del índice.
+SQL_CREATE_INDEX_PRODUCTS_CATEGORY_NAME: str = """
+CREATE INDEX IF NOT EXISTS idx_products_category_name
+    ON products (category_id, name, id);
+"""
+
+SQL_CREATE_INDEX_PRODUCTS_CATEGORY_PRICE: str = """
+CREATE INDEX IF NOT EXISTS idx_products_category_price
+    ON products (category_id, price, id);
+"""
+
+SQL_CREATE_INDEX_PRODUCTS_CATEGORY_ID: str = """
+CREATE INDEX IF NOT EXISTS idx_products_category_product_id
+    ON products (category_id, id);
+"""
+
+# idx_products_category_id queda cubierto por los índices compuestos
+SQL_DROP_INDEX_PRODUCTS_CATEGORY: str = """
+DROP INDEX IF EXISTS idx_products_category_id;
+"""
+
+# Recuento materializado de productos por categoría. Lo mantienen los
+# triggers de products, de modo que get_categories no recorre la tabla.
+SQL_CREATE_TABLE_CATEGORY_COUNTS: str = """
+CREATE TABLE IF NOT EXISTS category_counts (
+    category_id INTEGER PRIMARY KEY,
+    total       INTEGER NOT NULL DEFAULT 0,
+    FOREIGN KEY (category_id) REFERENCES categories(id)
+);
+"""
+
+SQL_CREATE_TRIGGERS_CATEGORY_COUNTS: List[str] = [
+    """
+    CREATE TRIGGER IF NOT EXISTS category_counts_ai AFTER INSERT ON products BEGIN
+        INSERT INTO category_counts(category_id, total) VALUES (new.category_id, 1)
+            ON CONFLICT(category_id) DO UPDATE SET total = total + 1;
+    END;
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS category_counts_ad AFTER DELETE ON products BEGIN
+        UPDATE category_counts SET total = total - 1
+         WHERE category_id = old.category_id;
+    END;
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS category_counts_au
+    AFTER UPDATE OF category_id ON products
+    WHEN old.category_id IS NOT new.category_id BEGIN
+        UPDATE category_counts SET total = total - 1
+         WHERE category_id = old.category_id;
+        INSERT INTO category_counts(category_id, total) VALUES (new.category_id, 1)
+            ON CONFLICT(category_id) DO UPDATE SET total = total + 1;
+    END;
+    """,
+]
+
+# Recalcular category_counts desde cero a partir de products
+SQL_REBUILD_CATEGORY_COUNTS: List[str] = [
+    """
+    DELETE FROM category_counts;
+    """,
+    """
+    INSERT INTO category_counts(category_id, total)
+    SELECT category_id, COUNT(*)
+      FROM products
+     GROUP BY category_id;
+    """,
+]
+
+# Progreso de las importaciones, para poder reanudar una interrumpida.
+# Se actualiza en la misma transacción que cada bloque importado.
+SQL_CREATE_TABLE_IMPORT_PROGRESS: str = """
+CREATE TABLE IF NOT EXISTS import_progress (
+    source      TEXT PRIMARY KEY,
+    size        INTEGER NOT NULL,
+    mtime       REAL NOT NULL,
+    rows_done   INTEGER NOT NULL,
+    updated_at  TEXT NOT NULL DEFAULT (datetime('now'))
+);
+"""
+
+# Registro de cambios de products para refrescar incrementalmente las
+# copias en memoria (inventory.snapshot). Cada fila apunta al rowid
+# modificado y guarda la categoría y el precio que tenía antes del cambio
+# (NULL si la fila es nueva). Solo se rellena mientras existen sus triggers.
+SQL_CREATE_TABLE_PRODUCT_CHANGES: str = """
+CREATE TABLE IF NOT EXISTS product_changes (
+    seq              INTEGER PRIMARY KEY AUTOINCREMENT,
+    product_rowid    INTEGER NOT NULL,
+    old_category_id  INTEGER,
+    old_price        REAL
+);
+"""
+
+# Cambios que conserva product_changes: cada trigger borra los que quedan
+# más atrás, así que el registro nunca crece por encima de este tamaño
+PRODUCT_CHANGES_KEEP: int = 100_000
+
+SQL_CREATE_TRIGGERS_PRODUCT_CHANGES: List[str] = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS product_changes_ai AFTER INSERT ON products BEGIN
+        INSERT INTO product_changes(product_rowid) VALUES (new.rowid);
+        DELETE FROM product_changes WHERE seq <= last_insert_rowid() - {PRODUCT_CHANGES_KEEP:d};
+    END;
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS product_changes_ad AFTER DELETE ON products BEGIN
+        INSERT INTO product_changes(product_rowid, old_category_id, old_price)
+        VALUES (old.rowid, old.category_id, old.price);
+        DELETE FROM product_changes WHERE seq <= last_insert_rowid() - {PRODUCT_CHANGES_KEEP:d};
+    END;
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS product_changes_au AFTER UPDATE ON products BEGIN
+        INSERT INTO product_changes(product_rowid, old_category_id, old_price)
+        VALUES (old.rowid, old.category_id, old.price);
+        DELETE FROM product_changes WHERE seq <= last_insert_rowid() - {PRODUCT_CHANGES_KEEP:d};
+    END;
+    """,
+]
+
+SQL_DROP_TRIGGERS_PRODUCT_CHANGES: List[str] = [
+    "DROP TRIGGER IF EXISTS product_changes_ai;",
+    "DROP TRIGGER IF EXISTS product_changes_ad;",
+    "DROP TRIGGER IF EXISTS product_changes_au;",
+    "DELETE FROM product_changes;",
+    "DELETE FROM sqlite_sequence WHERE name = 'product_changes';",
+]
+
+# Índice de texto completo (FTS5) sobre el nombre de los productos.
+# Es una tabla "external content": no duplica los nombres, enlaza con
+# products por rowid y se mantiene sincronizada mediante triggers.
+SQL_CREATE_TABLE_PRODUCTS_FTS: str = """
+CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+    name,
+    content = 'products',
+    content_rowid = 'rowid',
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+SQL_CREATE_TRIGGERS_PRODUCTS_FTS: List[str] = [
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts(rowid, name) VALUES (new.rowid, new.name);
+    END;
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name)
+        VALUES ('delete', old.rowid, old.name);
+    END;
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE OF name ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name)
+        VALUES ('delete', old.rowid, old.name);
+        INSERT INTO products_fts(rowid, name) VALUES (new.rowid, new.name);
+    END;
+    """,
+]
+
+# Reconstruir el índice FTS5 a partir del contenido actual de products
+SQL_REBUILD_PRODUCTS_FTS = """
+INSERT INTO products_fts(products_fts) VALUES ('rebuild');
+"""
+
+# Comprobar si existe una tabla (o tabla virtual) por nombre
+SQL_TABLE_EXISTS = """
+SELECT 1
+  FROM sqlite_master
+ WHERE type = 'table' AND name = ?;
+"""
+
 # Obtener el id de una categoría dado su nombre
 SQL_SELECT_CATEGORY_ID = """
 SELECT id
@@ -33,6 +248,17 @@ SELECT id
  WHERE name = ?;
 """
 
+# Insertar una categoría sin duplicar (si ya existía, IGNORE)
+SQL_INSERT_CATEGORY = """
+INSERT OR IGNORE INTO categories(name) VALUES (?);
+"""
+
+# Obtener todas las categorías con su id (para resolverlas en memoria)
+SQL_SELECT_ALL_CATEGORIES = """
+SELECT id, name
+  FROM categories;
+"""
+
 # Insertar un nuevo producto
 SQL_INSERT_PRODUCT_IN_DB = """
 INSERT INTO products (
@@ -43,6 +269,28 @@ INSERT INTO products (
 ) VALUES (?, ?, ?, ?);
 """
 
+# Actualizar un producto ({asignaciones} es "col = ?, ..."); devuelve su
+# id si existía
+SQL_UPDATE_PRODUCT_RETURNING = """
+UPDATE products
+   SET {asignaciones}
+ WHERE id = ?
+RETURNING id;
+"""
+
+# Actualizar varios productos con los mismos campos cambiados. Plantilla:
+# {columnas} son las columnas cambiadas, {filas} un "(?, ...)" por producto
+# (id seguido de los valores) y {asignaciones} "col = cambios.col, ...".
+# Devuelve los ids de los productos que existían y se actualizaron.
+SQL_UPDATE_PRODUCTS_FROM_VALUES = """
+WITH cambios(id, {columnas}) AS (VALUES {filas})
+UPDATE products
+   SET {asignaciones}
+  FROM cambios
+ WHERE products.id = cambios.id
+RETURNING products.id;
+"""
+
 # Borrar un producto por su id
 SQL_DELETE_PRODUCT_IN_DB = """
 DELETE FROM products
@@ -62,6 +310,22 @@ SELECT
  WHERE p.name LIKE '%' || ? || '%';
 """
 
+# Buscar productos por palabras completas o prefijos usando el índice FTS5
+SQL_SEARCH_PRODUCTS_BY_NAME_FTS = """
+SELECT
+    p.id       AS product_id,
+    c.name     AS category,
+    p.name     AS name,
+    p.price    AS price
+  FROM products_fts
+  JOIN products p
+    ON p.rowid = products_fts.rowid
+  JOIN categories c
+    ON p.category_id = c.id
+ WHERE products_fts MATCH ?
+ ORDER BY products_fts.rank;
+"""
+
 # Buscar productos que pertenezcan a una categoría (por nombre de categoría)
 SQL_SEARCH_PRODUCTS_BY_CATEGORY = """
 SELECT
@@ -74,13 +338,266 @@ SELECT
  WHERE c.name = ?;
 """
 
-# Obtener todas las categorías con su recuento de productos
+# Productos de una categoría en un rango de precios, ordenados por precio.
+# Es un recorrido acotado del índice (category_id, price, id), que ya da el
+# orden: los límites que no se indican se pasan como -inf / +inf y
+# LIMIT -1 equivale a sin límite.
+SQL_SEARCH_PRODUCTS_BY_PRICE_RANGE = """
+SELECT
+    p.id    AS product_id,
+    p.name  AS name,
+    p.price AS price
+  FROM products p
+ WHERE p.category_id = ?
+   AND p.price BETWEEN ? AND ?
+ ORDER BY p.price, p.id
+ LIMIT ?;
+"""
+
+SQL_SEARCH_PRODUCTS_BY_PRICE_RANGE_DESC = """
+SELECT
+    p.id    AS product_id,
+    p.name  AS name,
+    p.price AS price
+  FROM products p
+ WHERE p.category_id = ?
+   AND p.price BETWEEN ? AND ?
+ ORDER BY p.price DESC, p.id DESC
+ LIMIT ?;
+"""
+
+# Los N productos más baratos de cada categoría (todas, o solo una si el
+# parámetro no es NULL). La subconsulta correlacionada lee, para cada
+# categoría, solo las N primeras entradas del índice (category_id, price,
+# id); ROW_NUMBER numera después esas pocas filas dentro de su categoría.
+# (Un ROW_NUMBER sobre products filtrado por el puesto recorrería la
+# tabla entera: SQLite no corta la ventana al llegar a N.)
+SQL_TOP_PRODUCTS_BY_PRICE = """
+SELECT
+    p.id    AS product_id,
+    c.name  AS category,
+    p.name  AS name,
+    p.price AS price,
+    ROW_NUMBER() OVER (PARTITION BY p.category_id ORDER BY p.price, p.id) AS puesto
+  FROM categories c
+  JOIN products p
+    ON p.rowid IN (
+        SELECT rowid
+          FROM products
+         WHERE category_id = c.id
+         ORDER BY price, id
+         LIMIT ?
+    )
+ WHERE ? IS NULL OR c.name = ?
+ ORDER BY c.name, puesto;
+"""
+
+# Igual, con los N más caros
+SQL_TOP_PRODUCTS_BY_PRICE_DESC = """
+SELECT
+    p.id    AS product_id,
+    c.name  AS category,
+    p.name  AS name,
+    p.price AS price,
+    ROW_NUMBER() OVER (PARTITION BY p.category_id ORDER BY p.price DESC, p.id DESC) AS puesto
+  FROM categories c
+  JOIN products p
+    ON p.rowid IN (
+        SELECT rowid
+          FROM products
+         WHERE category_id = c.id
+         ORDER BY price DESC, id DESC
+         LIMIT ?
+    )
+ WHERE ? IS NULL OR c.name = ?
+ ORDER BY c.name, puesto;
+"""
+
+# Exportar el catálogo completo, en orden de inserción
+SQL_EXPORT_PRODUCTS = """
+SELECT
+    p.id       AS product_id,
+    c.name     AS category,
+    p.name     AS name,
+    p.price    AS price
+  FROM products p
+  JOIN categories c
+    ON p.category_id = c.id
+ ORDER BY p.rowid;
+"""
+
+# Exportar los productos de una categoría (por id de categoría), en orden
+# de id: lo da el índice (category_id, id), así que las filas salen en
+# streaming. Ordenar por rowid obligaría a ordenar antes toda la categoría
+# en un B-tree temporal (en memoria, con temp_store=MEMORY).
+SQL_EXPORT_PRODUCTS_BY_CATEGORY = """
+SELECT
+    p.id       AS product_id,
+    c.name     AS category,
+    p.name     AS name,
+    p.price    AS price
+  FROM products p
+  JOIN categories c
+    ON p.category_id = c.id
+ WHERE p.category_id = ?
+ ORDER BY p.id;
+"""
+
+# Progreso guardado de una importación
+SQL_SELECT_IMPORT_PROGRESS = """
+SELECT size, mtime, rows_done
+  FROM import_progress
+ WHERE source = ?;
+"""
+
+SQL_UPSERT_IMPORT_PROGRESS = """
+INSERT INTO import_progress (source, size, mtime, rows_done)
+VALUES (?, ?, ?, ?)
+    ON CONFLICT(source) DO UPDATE
+   SET rows_done = excluded.rows_done,
+       updated_at = datetime('now');
+"""
+
+SQL_DELETE_IMPORT_PROGRESS = """
+DELETE FROM import_progress
+ WHERE source = ?;
+"""
+
+# Último número de secuencia asignado en product_changes (aunque la fila
+# ya se haya borrado del registro)
+SQL_PRODUCT_CHANGES_LAST_SEQ = """
+SELECT seq
+  FROM sqlite_sequence
+ WHERE name = 'product_changes';
+"""
+
+# Cambios posteriores a un número de secuencia, en orden
+SQL_SELECT_PRODUCT_CHANGES_SINCE = """
+SELECT seq, product_rowid, old_category_id, old_price
+  FROM product_changes
+ WHERE seq > ?
+ ORDER BY seq;
+"""
+
+# Columnas que guarda la copia en memoria, ordenadas por categoría y precio
+# (recorrido del índice (category_id, price, id))
+SQL_SNAPSHOT_PRODUCTS = """
+SELECT category_id, price, rowid, id, name
+  FROM products
+ ORDER BY category_id, price;
+"""
+
+# Las mismas columnas para una lista de rowids; {marcadores} es "?, ?, ..."
+SQL_SNAPSHOT_PRODUCTS_BY_ROWID = """
+SELECT category_id, price, rowid, id, name
+  FROM products
+ WHERE rowid IN ({marcadores});
+"""
+
+# Obtener todas las categorías con su recuento de productos, leído de la
+# tabla category_counts que mantienen los triggers (no recorre products)
 SQL_SELECT_ALL_CATEGORIES_COUNT = """
+SELECT
+    c.name                  AS category,
+    COALESCE(cc.total, 0)   AS total
+  FROM categories c
+  LEFT JOIN category_counts cc
+    ON cc.category_id = c.id;
+"""
+
+# Agregados de precio por categoría (todas, o solo una si el parámetro no
+# es NULL). Se resuelven leyendo el índice (category_id, price, id).
+SQL_CATEGORY_PRICE_AGGREGATES = """
+SELECT
+    c.id            AS category_id,
+    c.name          AS category,
+    COUNT(p.price)  AS total,
+    MIN(p.price)    AS min_price,
+    MAX(p.price)    AS max_price,
+    AVG(p.price)    AS avg_price
+  FROM categories c
+  LEFT JOIN products p
+    ON p.category_id = c.id
+ WHERE ? IS NULL OR c.name = ?
+ GROUP BY c.id
+ ORDER BY c.name;
+"""
+
+# Precios de una categoría ya ordenados (recorrido del índice, sin ordenar)
+SQL_CATEGORY_PRICES_SORTED = """
+SELECT price
+  FROM products
+ WHERE category_id = ?
+ ORDER BY price;
+"""
+
+# Recontar los productos de cada categoría recorriendo products
+# (COUNT sobre category_id para que baste con leer un índice por categoría)
+SQL_COUNT_PRODUCTS_BY_CATEGORY = """
 SELECT
     c.name  AS category,
-    COUNT(p.id) AS total
+    COUNT(p.category_id) AS total
   FROM categories c
   LEFT JOIN products p
     ON p.category_id = c.id
  GROUP BY c.name;
 """
+
+
+# -------------------------------------------------------------------
+# Paginación por clave (keyset). Son plantillas: {seek} se sustituye por
+# la condición "posterior al cursor" (o nada en la primera página) y
+# {order} por la ordenación; ambas se construyen a partir de
+# PAGE_SORT_COLUMNS, nunca de texto del usuario.
+# -------------------------------------------------------------------
+
+# Columnas por las que se puede ordenar una página (el id desempata)
+PAGE_SORT_COLUMNS: Dict[str, str] = {
+    "name":  "p.name",
+    "price": "p.price",
+    "id":    "p.id",
+}
+
+SQL_PAGE_PRODUCTS_BY_NAME = """
+SELECT
+    p.id       AS product_id,
+    c.name     AS category,
+    p.name     AS name,
+    p.price    AS price
+  FROM products p
+  JOIN categories c
+    ON p.category_id = c.id
+ WHERE p.name LIKE '%' || ? || '%'
+   {seek}
+ ORDER BY {order}
+ LIMIT ?;
+"""
+
+SQL_PAGE_PRODUCTS_BY_NAME_FTS = """
+SELECT
+    p.id       AS product_id,
+    c.name     AS category,
+    p.name     AS name,
+    p.price    AS price
+  FROM products_fts
+  JOIN products p
+    ON p.rowid = products_fts.rowid
+  JOIN categories c
+    ON p.category_id = c.id
+ WHERE products_fts MATCH ?
+   {seek}
+ ORDER BY {order}
+ LIMIT ?;
+"""
+
+SQL_PAGE_PRODUCTS_BY_CATEGORY = """
+SELECT
+    p.id    AS product_id,
+    p.name  AS name,
+    p.price AS price
+  FROM products p
+ WHERE p.category_id = ?
+   {seek}
+ ORDER BY {order}
+ LIMIT ?;
+"""
@@ -0,0 +1,619 @@
+"""
+Copia en memoria, por columnas, del catálogo de productos para filtros y
+agregados de solo lectura (rangos de precio, categorías).
+
+Cada categoría se guarda como un bloque de columnas contiguas ordenadas por
+precio: un array('d') de precios, un array('q') de rowids, un array('l')
+con el código del nombre en un pool de nombres sin repetir y una lista con
+los ids tal y como están en la base de datos (BLOB de 16 bytes o TEXT). Al
+estar ordenadas, un rango de precios dentro de una categoría se localiza
+con dos búsquedas binarias; contar es restar posiciones, el mínimo y el
+máximo son los extremos del rango y la suma se hace en C sobre el trozo de
+array, sin ningún viaje a SQLite. El pool cuenta cuántas filas usan cada
+nombre y se compacta cuando los nombres que ya no usa nadie pasan de la
+mitad.
+
+La copia se refresca de forma incremental a partir de la tabla
+product_changes, que rellenan unos triggers sobre products (se crean la
+primera vez que se carga una copia). Antes de cada consulta se comprueba
+`PRAGMA data_version` en la conexión propia de la copia: si otra conexión
+(de este u otro proceso) ha confirmado cambios, se leen solo los cambios
+posteriores al último aplicado y se vuelven a leer únicamente esas filas.
+Si faltan cambios (el registro solo conserva los últimos
+PRODUCT_CHANGES_KEEP) o ha cambiado el esquema, se recarga todo.
+
+Mientras existen los triggers, cada escritura en products añade una fila
+al registro (un 10-15 % menos de altas por segundo); drop_change_log() los
+quita cuando ya no se usan copias en memoria.
+"""
+import math
+import sqlite3
+import threading
+import weakref
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from itertools import compress, count, groupby
+from operator import itemgetter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from inventory import db
+from inventory.models import Product, decode_product_id
+from inventory.schemas import (
+    SQL_CREATE_TRIGGERS_PRODUCT_CHANGES,
+    SQL_DROP_TRIGGERS_PRODUCT_CHANGES,
+    SQL_PRODUCT_CHANGES_LAST_SEQ,
+    SQL_SELECT_ALL_CATEGORIES,
+    SQL_SELECT_PRODUCT_CHANGES_SINCE,
+    SQL_SNAPSHOT_PRODUCTS,
+    SQL_SNAPSHOT_PRODUCTS_BY_ROWID
+)
+
+# Filas leídas del cursor en cada fetchmany al cargar la copia
+FETCH_BATCH_SIZE: int = 10_000
+
+# Rowids por consulta al volver a leer las filas cambiadas
+REFRESH_CHUNK_SIZE: int = 500
+
+# Cambios en una misma categoría a partir de los cuales sale más barato
+# reconstruir sus columnas que borrar e insertar fila a fila
+REBUILD_THRESHOLD: int = 256
+
+# Nombres sin uso en el pool (y fracción del pool) a partir de los cuales
+# se compacta: renombrar o borrar productos deja nombres que nadie usa
+NAME_POOL_MIN_DEAD: int = 1024
+NAME_POOL_DEAD_RATIO: float = 0.5
+
+
+class _Columnas:
+    """
+    Columnas de una categoría, ordenadas por precio.
+    """
+    __slots__ = ("precios", "rowids", "nombres", "ids")
+
+    def __init__(self) -> None:
+        self.precios = array("d")
+        self.rowids = array("q")
+        self.nombres = array("l")
+        self.ids: List[object] = []
+
+    def __len__(self) -> int:
+        return len(self.precios)
+
+
+def _crear_triggers(conn: sqlite3.Connection) -> None:
+    for trigger in SQL_CREATE_TRIGGERS_PRODUCT_CHANGES:
+        conn.execute(trigger)
+
+
+# Copias vivas, para soltar su conexión cuando se cierra el pool
+_instancias: "weakref.WeakSet[CatalogSnapshot]" = weakref.WeakSet()
+
+
+class CatalogSnapshot:
+    """
+    Copia en memoria del catálogo. Se carga en la primera consulta (o con
+    refresh()) y se mantiene al día sola si 'auto_refresh' es True; si no,
+    solo cambia al llamar a refresh().
+
+    Uso:
+        copia = CatalogSnapshot()
+        copia.count(category="bebidas", max_price=2.0)
+        copia.price_summary(min_price=10, max_price=20)
+    """
+
+    def __init__(self, auto_refresh: bool = True) -> None:
+        self.auto_refresh = auto_refresh
+        self._lock = threading.RLock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._version: Optional[int] = None
+        self._esquema: Optional[int] = None
+        self._seq: int = 0
+        self._columnas: Dict[int, _Columnas] = {}
+        self._categorias: Dict[int, str] = {}
+        self._ids_categoria: Dict[str, int] = {}
+        self._nombres: List[str] = []
+        self._codigos: Dict[str, int] = {}
+        self._usos = array("l")
+        self._sin_uso: int = 0
+        self._stats: Dict[str, int] = {"full_loads": 0, "refreshes": 0, "changes": 0}
+        _instancias.add(self)
+
+    # ---------------------------------------------------------------
+    # Carga y refresco
+    # ---------------------------------------------------------------
+
+    def _conectar(self) -> sqlite3.Connection:
+        if self._conn is None:
+            # El pool prepara el esquema en su primer uso
+            with db.connection():
+                pass
+            # Conexión propia (fuera del pool): su data_version cambia con
+            # los commits de cualquier otra conexión, incluidas las del pool
+            self._conn = db.get_connection()
+            # Las mismas PRAGMAs que las conexiones del pool (caché de páginas y mmap)
+            db._apply_pragmas(self._conn)
+            self._version = None
+        return self._conn
+
+    def _codigos_nombres(self, nombres: Iterable[str]) -> List[int]:
+        """
+        Códigos de los nombres en el pool, añadiendo los que falten, y suma
+        sus usos. Cada nombre distinto se guarda una sola vez, lo repitan
+        cuantos productos lo repitan; todo el trabajo se hace con dicts y sets.
+        """
+        nombres = tuple(nombres)
+        codigos = self._codigos
+        nuevos = tuple(set(nombres).difference(codigos))
+        codigos.update(zip(nuevos, count(len(self._nombres))))
+        self._nombres.extend(nuevos)
+        self._usos.extend([0] * len(nuevos))
+        self._sin_uso += len(nuevos)
+
+        resultado = list(map(codigos.__getitem__, nombres))
+        usos = self._usos
+        for codigo, veces in Counter(resultado).items():
+            if not usos[codigo]:
+                self._sin_uso -= 1
+            usos[codigo] += veces
+        return resultado
+
+    def _soltar_nombres(self, codigos: Iterable[int]) -> None:
+        """
+        Resta los usos de los nombres de las filas que salen de la copia.
+        """
+        usos = self._usos
+        for codigo, veces in Counter(codigos).items():
+            usos[codigo] -= veces
+            if not usos[codigo]:
+                self._sin_uso += 1
+
+    def _compactar_nombres(self) -> None:
+        """
+        Quita del pool los nombres sin uso si son demasiados, renumerando
+        los códigos de todas las columnas.
+        """
+        if self._sin_uso <= max(NAME_POOL_MIN_DEAD, len(self._nombres) * NAME_POOL_DEAD_RATIO):
+            return
+
+        usos = self._usos
+        vivos = [codigo for codigo in range(len(usos)) if usos[codigo]]
+        nuevos = array("l", [-1]) * len(usos)
+        for nuevo, codigo in enumerate(vivos):
+            nuevos[codigo] = nuevo
+
+        self._nombres = [self._nombres[codigo] for codigo in vivos]
+        self._codigos = dict(zip(self._nombres, count()))
+        self._usos = array("l", map(usos.__getitem__, vivos))
+        self._sin_uso = 0
+        for columnas in self._columnas.values():
+            columnas.nombres = array("l", map(nuevos.__getitem__, columnas.nombres))
+
+    def _cargar_categorias(self, conn: sqlite3.Connection) -> None:
+        filas = conn.execute(SQL_SELECT_ALL_CATEGORIES).fetchall()
+        self._categorias = {fila[0]: fila[1] for fila in filas}
+        self._ids_categoria = {fila[1]: fila[0] for fila in filas}
+
+    def _ultima_secuencia(self, conn: sqlite3.Connection) -> int:
+        fila = conn.execute(SQL_PRODUCT_CHANGES_LAST_SEQ).fetchone()
+        return fila[0] if fila is not None else 0
+
+    def _carga_completa(self, conn: sqlite3.Connection) -> None:
+        """
+        Vuelve a leer el catálogo entero. Se ejecuta dentro de una
+        transacción de lectura, junto con la lectura de la secuencia.
+        """
+        columnas: Dict[int, _Columnas] = {}
+        self._nombres = []
+        self._codigos = {}
+        self._usos = array("l")
+        self._sin_uso = 0
+        self._cargar_categorias(conn)
+
+        cursor = conn.cursor()
+        # Tuplas en lugar de sqlite3.Row: se descartan al copiarlas a las columnas
+        cursor.row_factory = None
+        try:
+            cursor.execute(SQL_SNAPSHOT_PRODUCTS)
+            while True:
+                filas = cursor.fetchmany(FETCH_BATCH_SIZE)
+                if not filas:
+                    break
+                # Las filas llegan ordenadas por categoría y precio: cada
+                # grupo se añade al final de las columnas de su categoría,
+                # traspuesto en C con zip()
+                for category_id, grupo in groupby(filas, key=itemgetter(0)):
+                    _, precios, rowids, ids, nombres = zip(*grupo)
+                    destino = columnas.setdefault(category_id, _Columnas())
+                    destino.precios.extend(precios)
+                    destino.rowids.extend(rowids)
+                    destino.ids.extend(ids)
+                    destino.nombres.extend(self._codigos_nombres(nombres))
+        finally:
+            cursor.close()
+
+        self._columnas = columnas
+        self._stats["full_loads"] += 1
+
+    def _posicion(self, columnas: _Columnas, precio: float, rowid: int) -> int:
+        """
+        Posición de la fila 'rowid' (con ese precio) en las columnas, o -1.
+        """
+        precios = columnas.precios
+        i = bisect_left(precios, precio)
+        # Entre los productos con el mismo precio, buscamos el rowid
+        while i < len(precios) and precios[i] == precio:
+            if columnas.rowids[i] == rowid:
+                return i
+            i += 1
+        return -1
+
+    def _actualizar_columnas(
+        self,
+        columnas: _Columnas,
+        posiciones: List[int],
+        filas: List[Tuple[int, float, int, object, str]]
+    ) -> None:
+        """
+        Quita las filas de 'posiciones' e inserta 'filas' (category_id,
+        price, rowid, id, name) manteniendo el orden por precio.
+        """
+        self._soltar_nombres(columnas.nombres[i] for i in posiciones)
+
+        if len(posiciones) + len(filas) <= REBUILD_THRESHOLD:
+            # Pocos cambios: borrar e insertar en su sitio (memmove en C)
+            for i in sorted(posiciones, reverse=True):
+                del columnas.precios[i]
+                del columnas.rowids[i]
+                del columnas.nombres[i]
+                del columnas.ids[i]
+            for _, precio, rowid, product_id, nombre in filas:
+                i = bisect_right(columnas.precios, precio)
+                columnas.precios.insert(i, precio)
+                columnas.rowids.insert(i, rowid)
+                columnas.nombres.insert(i, self._codigos_nombres((nombre,))[0])
+                columnas.ids.insert(i, product_id)
+            return
+
+        # Muchos cambios: filtrar con una máscara, añadir las filas nuevas al
+        # final y reordenar una sola vez (el sort detecta el tramo ya ordenado)
+        mascara = bytearray(b"\x01") * len(columnas)
+        for i in posiciones:
+            mascara[i] = 0
+        precios = array("d", compress(columnas.precios, mascara))
+        rowids = array("q", compress(columnas.rowids, mascara))
+        nombres = array("l", compress(columnas.nombres, mascara))
+        ids = list(compress(columnas.ids, mascara))
+        if filas:
+            _, nuevos_precios, nuevos_rowids, nuevos_ids, nuevos_nombres = zip(*filas)
+            precios.extend(nuevos_precios)
+            rowids.extend(nuevos_rowids)
+            nombres.extend(self._codigos_nombres(nuevos_nombres))
+            ids.extend(nuevos_ids)
+        orden = sorted(range(len(precios)), key=precios.__getitem__)
+        columnas.precios = array("d", map(precios.__getitem__, orden))
+        columnas.rowids = array("q", map(rowids.__getitem__, orden))
+        columnas.nombres = array("l", map(nombres.__getitem__, orden))
+        columnas.ids = list(map(ids.__getitem__, orden))
+
+    def _aplicar_cambios(self, conn: sqlite3.Connection,
+                         cambios: List[Tuple[int, int, Optional[int], Optional[float]]]) -> bool:
+        """
+        Aplica los cambios leídos de product_changes. Devuelve False si la
+        copia no coincide con lo que dicen los cambios (hay que recargar).
+        """
+        # 1. Estado de cada fila según la copia: el del primer cambio que la toca
+        anteriores: Dict[int, Optional[Tuple[int, float]]] = {}
+        for _, rowid, category_id, precio in cambios:
+            if rowid not in anteriores:
+                anteriores[rowid] = None if category_id is None else (category_id, precio)
+
+        # 2. Posiciones de las versiones antiguas, por categoría
+        posiciones: Dict[int, List[int]] = {}
+        for rowid, anterior in anteriores.items():
+            if anterior is None:
+                continue
+            columnas = self._columnas.get(anterior[0])
+            i = -1 if columnas is None else self._posicion(columnas, anterior[1], rowid)
+            if i < 0:
+                return False
+            posiciones.setdefault(anterior[0], []).append(i)
+
+        # 3. Volver a leer solo las filas tocadas; las borradas ya no aparecen
+        filas: Dict[int, List[Tuple[int, float, int, object, str]]] = {}
+        rowids = list(anteriores)
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        try:
+            for inicio in range(0, len(rowids), REFRESH_CHUNK_SIZE):
+                bloque = rowids[inicio:inicio + REFRESH_CHUNK_SIZE]
+                sentencia = SQL_SNAPSHOT_PRODUCTS_BY_ROWID.format(
+                    marcadores=", ".join("?" * len(bloque))
+                )
+                for fila in cursor.execute(sentencia, bloque):
+                    filas.setdefault(fila[0], []).append(fila)
+        finally:
+            cursor.close()
+
+        # 4. Aplicar los cambios de cada categoría
+        if any(category_id not in self._categorias for category_id in filas):
+            # Categoría creada después de la carga
+            self._cargar_categorias(conn)
+        for category_id in posiciones.keys() | filas.keys():
+            columnas = self._columnas.setdefault(category_id, _Columnas())
+            self._actualizar_columnas(
+                columnas, posiciones.get(category_id, []), filas.get(category_id, [])
+            )
+        self._compactar_nombres()
+        return True
+
+    def refresh(self) -> Dict[str, object]:
+        """
+        Pone la copia al día con la base de datos.
+
+        Returns:
+            Dict[str, object]: {"mode": "full" | "incremental" | "none",
+                                "changes": cambios aplicados}
+        """
+        try:
+            with self._lock:
+                resultado = self._refrescar()
+                if resultado is None:
+                    # Faltan cambios o la copia no cuadra: recarga completa,
+                    # volviendo a crear los triggers por si alguien los quitó
+                    self._version = None
+                    resultado = self._refrescar()
+                return resultado
+
+        except db.DatabaseBusyError:
+            raise
+
+        except Exception as e:
+            raise RuntimeError(f"Error al refrescar la copia en memoria del catálogo: {e}") from e
+
+    def _refrescar(self) -> Optional[Dict[str, object]]:
+        """
+        Un intento de refresco. Devuelve None si los cambios no bastan para
+        poner la copia al día.
+        """
+        conn = self._conectar()
+        cargada = self._version is not None
+
+        # 1. Triggers del registro de cambios (no hace nada si ya existen)
+        if not cargada:
+            db.run_in_transaction(_crear_triggers, conn)
+
+        # 2. Lectura consistente de la secuencia y de las filas
+        conn.execute("BEGIN;")
+        try:
+            version = conn.execute("PRAGMA data_version;").fetchone()[0]
+            esquema = conn.execute("PRAGMA schema_version;").fetchone()[0]
+            ultima = self._ultima_secuencia(conn)
+
+            if cargada and esquema != self._esquema:
+                # Cambió el esquema (p. ej. se quitaron los triggers o se migró)
+                return None
+            if not cargada:
+                self._carga_completa(conn)
+                modo, aplicados = "full", 0
+            elif ultima == self._seq:
+                modo, aplicados = "none", 0
+            else:
+                cambios = []
+                if ultima > self._seq:
+                    cambios = [
+                        tuple(fila) for fila in
+                        conn.execute(SQL_SELECT_PRODUCT_CHANGES_SINCE, (self._seq,))
+                    ]
+                # Si al registro le falta algún cambio intermedio, se perdieron
+                if not cambios or len(cambios) != ultima - self._seq \
+                        or not self._aplicar_cambios(conn, cambios):
+                    return None
+                modo, aplicados = "incremental", len(cambios)
+                self._stats["refreshes"] += 1
+                self._stats["changes"] += aplicados
+
+            self._version = version
+            self._esquema = esquema
+            self._seq = ultima
+        finally:
+            conn.rollback()
+
+        return {"mode": modo, "changes": aplicados}
+
+    def _al_dia(self) -> None:
+        """
+        Antes de cada consulta: carga la copia si hace falta y, con
+        auto_refresh, la refresca si otra conexión ha confirmado cambios.
+        """
+        if self._conn is None or self._version is None:
+            self.refresh()
+        elif self.auto_refresh:
+            try:
+                version = self._conn.execute("PRAGMA data_version;").fetchone()[0]
+            except sqlite3.Error as e:
+                raise RuntimeError(f"Error al comprobar la copia en memoria del catálogo: {e}") from e
+            if version != self._version:
+                self.refresh()
+
+    def close(self) -> None:
+        """
+        Cierra la conexión propia. La siguiente consulta la reabre y vuelve a
+        cargar la copia entera.
+        """
+        with self._lock:
+            if self._conn is not None:
+                try:
+                    self._conn.close()
+                except sqlite3.ProgrammingError:
+                    pass
+            self._conn = None
+            self._version = None
+
+    # ---------------------------------------------------------------
+    # Consultas
+    # ---------------------------------------------------------------
+
+    def _rangos(
+        self,
+        category: Optional[str],
+        min_price: Optional[float],
+        max_price: Optional[float]
+    ) -> List[Tuple[int, _Columnas, int, int]]:
+        """
+        Posiciones [inicio, fin) de los productos que cumplen el filtro en
+        cada bloque de categoría, en orden de id de categoría.
+        """
+        if category is not None:
+            category_id = self._ids_categoria.get(category)
+            if category_id is None or category_id not in self._columnas:
+                return []
+            bloques = [(category_id, self._columnas[category_id])]
+        else:
+            bloques = sorted(self._columnas.items())
+
+        rangos = []
+        for category_id, columnas in bloques:
+            precios = columnas.precios
+            inicio = 0 if min_price is None else bisect_left(precios, min_price)
+            fin = len(precios) if max_price is None else bisect_right(precios, max_price)
+            if fin > inicio:
+                rangos.append((category_id, columnas, inicio, fin))
+        return rangos
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._al_dia()
+            return sum(len(columnas) for columnas in self._columnas.values())
+
+    def count(
+        self,
+        category: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None
+    ) -> int:
+        """
+        Número de productos de 'category' (o de todas) con
+        min_price <= price <= max_price (límites opcionales).
+        """
+        with self._lock:
+            self._al_dia()
+            return sum(fin - inicio for _, _, inicio, fin in self._rangos(category, min_price, max_price))
+
+    def price_summary(
+        self,
+        category: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None
+    ) -> Dict[str, Optional[float]]:
+        """
+        Agregados de precio de los productos que cumplen el filtro (mismos
+        parámetros que count()).
+
+        Returns:
+            Dict[str, Optional[float]]: "count", "sum", "min", "max" y "avg"
+                (None salvo "count" y "sum" si ningún producto cumple el filtro).
+        """
+        with self._lock:
+            self._al_dia()
+            total = 0
+            sumas: List[float] = []
+            minimo: Optional[float] = None
+            maximo: Optional[float] = None
+            for _, columnas, inicio, fin in self._rangos(category, min_price, max_price):
+                precios = columnas.precios
+                total += fin - inicio
+                sumas.append(math.fsum(precios[inicio:fin]))
+                # Bloques ordenados: los extremos del rango son el mínimo y el máximo
+                minimo = precios[inicio] if minimo is None else min(minimo, precios[inicio])
+                maximo = precios[fin - 1] if maximo is None else max(maximo, precios[fin - 1])
+
+        suma = math.fsum(sumas)
+        return {
+            "count": total,
+            "sum": suma,
+            "min": minimo,
+            "max": maximo,
+            "avg": suma / total if total else None,
+        }
+
+    def select(
+        self,
+        category: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        limit: Optional[int] = None
+    ) -> List[Product]:
+        """
+        Productos que cumplen el filtro (mismos parámetros que count()),
+        ordenados por precio dentro de cada categoría.
+
+        Args:
+            limit (Optional[int]): Número máximo de productos a devolver.
+
+        Returns:
+            List[Product]: Registros compactos, como las búsquedas de crud
+                con compact=True.
+        """
+        with self._lock:
+            self._al_dia()
+            resultado: List[Product] = []
+            for category_id, columnas, inicio, fin in self._rangos(category, min_price, max_price):
+                if limit is not None:
+                    fin = min(fin, inicio + limit - len(resultado))
+                categoria = self._categorias[category_id]
+                nombres = self._nombres
+                resultado.extend(
+                    Product(
+                        decode_product_id(columnas.ids[i]),
+                        categoria,
+                        nombres[columnas.nombres[i]],
+                        columnas.precios[i],
+                    )
+                    for i in range(inicio, fin)
+                )
+                if limit is not None and len(resultado) >= limit:
+                    break
+            return resultado
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Devuelve "rows", "categories", "names" (tamaño del pool),
+        "unused_names" (nombres del pool que ya no usa ninguna fila), "seq"
+        (último cambio aplicado), "full_loads", "refreshes" y "changes".
+        """
+        with self._lock:
+            copia = dict(self._stats)
+            copia["rows"] = sum(len(columnas) for columnas in self._columnas.values())
+            copia["categories"] = sum(1 for columnas in self._columnas.values() if len(columnas))
+            copia["names"] = len(self._nombres)
+            copia["unused_names"] = self._sin_uso
+            copia["seq"] = self._seq
+        return copia
+
+
+def drop_change_log() -> None:
+    """
+    Elimina los triggers de product_changes y vacía el registro, para que
+    las escrituras dejen de pagar su coste. Las copias que sigan abiertas
+    vuelven a crearlos en su siguiente carga.
+    """
+    def quitar(conn: sqlite3.Connection) -> None:
+        for statement in SQL_DROP_TRIGGERS_PRODUCT_CHANGES:
+            conn.execute(statement)
+
+    try:
+        db.run_in_transaction(quitar)
+    except db.DatabaseBusyError:
+        raise
+    except Exception as e:
+        raise RuntimeError(f"Error al eliminar el registro de cambios: {e}") from e
+
+
+def _al_cerrar_pool() -> None:
+    # El pool puede volver a abrirse contra otro fichero: cada copia se recargará
+    for copia in list(_instancias):
+        copia.close()
+
+
+db.register_close_hook(_al_cerrar_pool)
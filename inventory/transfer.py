@@ -0,0 +1,255 @@
+"""
+Importación y exportación del catálogo en CSV o JSONL, en streaming.
+
+Ambas operaciones usan memoria constante: la exportación recorre el cursor
+fila a fila escribiendo según lee, y la importación lee el fichero fila a
+fila e inserta por bloques de 'chunk_size' filas, una transacción por
+bloque. Las categorías se resuelven con el registro en memoria: las que no
+existen se guardan como "otros", igual que en add_product.
+
+El progreso de cada importación (filas ya confirmadas) se guarda en la
+tabla import_progress en la misma transacción que cada bloque, de modo
+que si se interrumpe, al volver a lanzarla sobre el mismo fichero continúa
+donde se quedó sin duplicar ni perder filas.
+
+Formato de columnas (CSV con cabecera, o un objeto JSON por línea):
+    product_id (opcional), category, name, price
+"""
+import csv
+import json
+import os
+import sqlite3
+import sys
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional, TextIO, Tuple
+
+from inventory import cache
+from inventory.categories import registry
+from inventory.db import DatabaseBusyError, connection, run_in_transaction
+from inventory.models import decode_product_id, encode_product_id, new_product_id
+from inventory.schemas import (
+    SQL_DELETE_IMPORT_PROGRESS,
+    SQL_EXPORT_PRODUCTS,
+    SQL_EXPORT_PRODUCTS_BY_CATEGORY,
+    SQL_INSERT_PRODUCT_IN_DB,
+    SQL_SELECT_IMPORT_PROGRESS,
+    SQL_UPSERT_IMPORT_PROGRESS
+)
+
+FORMATOS = ("csv", "jsonl")
+COLUMNAS = ("product_id", "category", "name", "price")
+
+# Filas por transacción al importar
+IMPORT_CHUNK_SIZE: int = 10_000
+
+
+def _detectar_formato(path: str, formato: Optional[str]) -> str:
+    if formato is None:
+        extension = os.path.splitext(path)[1].lower().lstrip(".")
+        formato = "jsonl" if extension in ("jsonl", "ndjson") else "csv"
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato no soportado: {formato!r}")
+    return formato
+
+
+@contextmanager
+def _abrir_salida(path: str) -> Iterator[TextIO]:
+    if path == "-":
+        yield sys.stdout
+    else:
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            yield f
+
+
+def _resultado(filas: int, segundos: float, **extra: int) -> Dict[str, float]:
+    return {
+        "rows": filas,
+        "seconds": segundos,
+        "rows_per_sec": filas / segundos if segundos else 0.0,
+        **extra,
+    }
+
+
+def export_products(
+    path: str,
+    formato: Optional[str] = None,
+    category: Optional[str] = None
+) -> Dict[str, float]:
+    """
+    Exporta el catálogo (o una categoría) a 'path' recorriendo el cursor
+    directamente, sin cargar los productos en memoria.
+
+    Args:
+        path     (str): Fichero de destino, o "-" para la salida estándar.
+        formato  (Optional[str]): "csv" o "jsonl"; por defecto se deduce
+                                  de la extensión (csv si no es .jsonl).
+        category (Optional[str]): Exportar solo esta categoría.
+
+    Returns:
+        Dict[str, float]: "rows", "seconds" y "rows_per_sec".
+
+    Raises:
+        ValueError: Si el formato no está soportado o la categoría no existe
+                    (en ese caso 'path' no se crea ni se trunca).
+    """
+    formato = _detectar_formato(path, formato)
+    inicio = time.perf_counter()
+    filas = 0
+
+    # La categoría se resuelve antes de abrir el fichero de destino
+    category_id = None if category is None else registry.get_id(category)
+    if category is not None and category_id is None:
+        raise ValueError(f"Categoría desconocida: {category!r}")
+
+    try:
+        with connection() as conn, _abrir_salida(path) as salida:
+            if category_id is None:
+                cursor = conn.execute(SQL_EXPORT_PRODUCTS)
+            else:
+                cursor = conn.execute(SQL_EXPORT_PRODUCTS_BY_CATEGORY, (category_id,))
+
+            try:
+                if formato == "csv":
+                    writer = csv.writer(salida)
+                    writer.writerow(COLUMNAS)
+                    for product_id, categoria, nombre, precio in cursor:
+                        writer.writerow((decode_product_id(product_id), categoria, nombre, precio))
+                        filas += 1
+                else:
+                    for product_id, categoria, nombre, precio in cursor:
+                        fila = (decode_product_id(product_id), categoria, nombre, precio)
+                        salida.write(json.dumps(dict(zip(COLUMNAS, fila)), ensure_ascii=False))
+                        salida.write("\n")
+                        filas += 1
+            finally:
+                cursor.close()
+
+    except Exception as e:
+        raise RuntimeError(f"Error al exportar el catálogo: {e}") from e
+
+    return _resultado(filas, time.perf_counter() - inicio)
+
+
+def _leer_filas(f: TextIO, formato: str) -> Iterator[Tuple[Optional[str], str, str, float]]:
+    """
+    Produce (product_id, category, name, price) por cada fila del fichero.
+    """
+    if formato == "csv":
+        registros: Iterator[Dict[str, object]] = csv.DictReader(f)
+    else:
+        registros = (json.loads(linea) for linea in f if linea.strip())
+
+    for numero, registro in enumerate(registros, start=1):
+        try:
+            product_id = registro.get("product_id")
+            yield (
+                str(product_id) if product_id else None,
+                registro["category"],
+                registro["name"],
+                float(registro["price"]),
+            )
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"Fila {numero} no válida: {registro!r}") from e
+
+
+def import_products(
+    path: str,
+    formato: Optional[str] = None,
+    chunk_size: int = IMPORT_CHUNK_SIZE,
+    restart: bool = False,
+    progress: Optional[Callable[[int], None]] = None
+) -> Dict[str, float]:
+    """
+    Importa productos desde un fichero CSV o JSONL por bloques de
+    'chunk_size' filas, cada uno en su propia transacción. Si el fichero
+    trae 'product_id' se conserva; si no, se genera uno nuevo.
+
+    Si una importación anterior del mismo fichero quedó a medias, se
+    reanuda a partir de la primera fila no confirmada (salvo con
+    restart=True). Si el fichero cambió desde entonces, se rechaza la
+    reanudación para no mezclar datos.
+
+    Args:
+        path       (str): Fichero de origen.
+        formato    (Optional[str]): "csv" o "jsonl"; por defecto según la extensión.
+        chunk_size (int): Filas por transacción.
+        restart    (bool): Ignorar el progreso guardado y empezar desde el principio.
+        progress   (Optional[Callable[[int], None]]): Se llama tras cada bloque
+                                                      con el total de filas confirmadas.
+
+    Returns:
+        Dict[str, float]: "rows" (filas importadas en esta ejecución),
+                          "skipped" (filas ya importadas antes), "seconds"
+                          y "rows_per_sec".
+    """
+    if chunk_size <= 0:
+        raise ValueError("chunk_size debe ser mayor que 0")
+    formato = _detectar_formato(path, formato)
+
+    source = os.path.abspath(path)
+    estado = os.stat(source)
+    inicio = time.perf_counter()
+
+    try:
+        with connection() as conn:
+            # 1. ¿Hay una importación previa de este fichero a medias?
+            ya_hechas = 0
+            previo = conn.execute(SQL_SELECT_IMPORT_PROGRESS, (source,)).fetchone()
+            if previo is not None and not restart:
+                if previo["size"] != estado.st_size or previo["mtime"] != estado.st_mtime:
+                    raise RuntimeError(
+                        "El fichero ha cambiado desde la importación interrumpida; "
+                        "usa restart=True para empezar de nuevo."
+                    )
+                ya_hechas = previo["rows_done"]
+
+            hechas = ya_hechas
+            with open(source, encoding="utf-8", newline="") as f:
+                filas = _leer_filas(f, formato)
+
+                # 2. Saltar las filas ya confirmadas
+                for _ in range(ya_hechas):
+                    next(filas, None)
+
+                # 3. Insertar por bloques; cada bloque y su progreso, juntos
+                while True:
+                    bloque = []
+                    for product_id, category, name, price in filas:
+                        bloque.append((
+                            encode_product_id(product_id) if product_id else new_product_id().bytes,
+                            registry.resolve(category),
+                            name,
+                            price,
+                        ))
+                        if len(bloque) == chunk_size:
+                            break
+                    if not bloque:
+                        break
+
+                    def guardar(conn: sqlite3.Connection) -> None:
+                        conn.executemany(SQL_INSERT_PRODUCT_IN_DB, bloque)
+                        conn.execute(
+                            SQL_UPSERT_IMPORT_PROGRESS,
+                            (source, estado.st_size, estado.st_mtime, hechas + len(bloque))
+                        )
+
+                    run_in_transaction(guardar)
+                    hechas += len(bloque)
+                    if progress is not None:
+                        progress(hechas)
+
+            # 4. Terminada: olvidamos el progreso
+            run_in_transaction(lambda conn: conn.execute(SQL_DELETE_IMPORT_PROGRESS, (source,)))
+
+    except DatabaseBusyError:
+        raise
+
+    except Exception as e:
+        raise RuntimeError(f"Error al importar el catálogo: {e}") from e
+
+    finally:
+        # Los bloques confirmados son visibles aunque la importación falle
+        cache.invalidate()
+
+    return _resultado(hechas - ya_hechas, time.perf_counter() - inicio, skipped=ya_hechas)
@@ -0,0 +1,245 @@
+"""
+Cola de escritura con commit agrupado (group commit).
+
+En el modo normal cada add_product, update_product o delete_product
+confirma su propia transacción, así que con muchos productores
+concurrentes el rendimiento queda limitado por los fsync. Con el modo de
+escritura diferida activado (`enable()`), esas funciones encolan su
+operación y esperan su resultado en un Future; un único hilo escritor
+vacía la cola en una sola transacción cuando se reúnen `max_batch_size`
+operaciones o cuando vence la ventana de `max_delay` segundos desde la
+primera operación pendiente.
+
+Cada operación se ejecuta dentro de su propio SAVEPOINT: si una falla,
+solo se deshace esa operación y su Future recibe la excepción; el resto
+del lote se confirma igualmente.
+"""
+import atexit
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional, Tuple
+
+from inventory.db import run_in_transaction
+
+# Valores por defecto del modo de escritura diferida
+WRITE_BATCH_SIZE: int = 256
+WRITE_BATCH_WINDOW: float = 0.005  # segundos
+
+# Operación encolada: función(cursor, *args), argumentos, Future e instante de encolado
+_Operacion = Tuple[Callable[..., object], tuple, Future, float]
+
+
+class WriteQueue:
+    """
+    Cola de operaciones de escritura vaciada por un único hilo escritor en
+    transacciones agrupadas.
+
+    Args:
+        max_batch_size (int): Operaciones máximas por transacción.
+        max_delay      (float): Segundos máximos que espera una operación a
+                                que se llene el lote antes de confirmarlo.
+    """
+
+    def __init__(
+        self,
+        max_batch_size: int = WRITE_BATCH_SIZE,
+        max_delay: float = WRITE_BATCH_WINDOW
+    ) -> None:
+        if max_batch_size <= 0:
+            raise ValueError("max_batch_size debe ser mayor que 0")
+        if max_delay < 0:
+            raise ValueError("max_delay no puede ser negativo")
+
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self._cola: "queue.Queue[Optional[_Operacion]]" = queue.Queue()
+        # Protege el paso de abierta a cerrada: tras encolar el None de
+        # close() nadie puede encolar más operaciones
+        self._cierre_lock = threading.Lock()
+        self._cerrada = False
+        self._stats_lock = threading.Lock()
+        self._stats: Dict[str, float] = {
+            "flushes": 0,
+            "operations": 0,
+            "max_batch_size": 0,
+            "total_wait": 0.0,
+            "max_wait": 0.0,
+        }
+        self._hilo = threading.Thread(
+            target=self._bucle, name="inventory-write-queue", daemon=True
+        )
+        self._hilo.start()
+
+    def submit(self, funcion: Callable[..., object], *args) -> Future:
+        """
+        Encola 'funcion(cursor, *args)' y devuelve el Future con su resultado.
+        La función no debe hacer commit ni rollback: lo gestiona la cola.
+        """
+        futuro: Future = Future()
+        with self._cierre_lock:
+            if self._cerrada or not self._hilo.is_alive():
+                raise RuntimeError("La cola de escritura está detenida.")
+            self._cola.put((funcion, args, futuro, time.perf_counter()))
+        return futuro
+
+    def close(self) -> None:
+        """
+        Confirma las operaciones pendientes y detiene el hilo escritor.
+        """
+        with self._cierre_lock:
+            if not self._cerrada:
+                self._cerrada = True
+                self._cola.put(None)
+        if self._hilo is not threading.current_thread():
+            self._hilo.join()
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Devuelve los contadores de la cola:
+            - "flushes":        transacciones confirmadas.
+            - "operations":     operaciones procesadas.
+            - "max_batch_size": mayor lote confirmado.
+            - "avg_batch_size": operaciones medias por transacción.
+            - "total_wait" / "max_wait" / "avg_wait": segundos entre el
+              encolado de una operación y la resolución de su Future.
+        """
+        with self._stats_lock:
+            stats = dict(self._stats)
+        flushes = stats["flushes"] or 1
+        operaciones = stats["operations"] or 1
+        stats["avg_batch_size"] = stats["operations"] / flushes
+        stats["avg_wait"] = stats["total_wait"] / operaciones
+        return stats
+
+    def _bucle(self) -> None:
+        try:
+            self._procesar()
+        finally:
+            with self._cierre_lock:
+                self._cerrada = True
+            # Ninguna operación debería quedar tras el None de close(); si
+            # queda alguna (o el hilo falló), su Future no se queda esperando
+            while True:
+                try:
+                    operacion = self._cola.get_nowait()
+                except queue.Empty:
+                    break
+                if operacion is not None:
+                    operacion[2].set_exception(RuntimeError("La cola de escritura está detenida."))
+
+    def _procesar(self) -> None:
+        detener = False
+        while not detener:
+            primera = self._cola.get()
+            if primera is None:
+                break
+
+            # Reunimos operaciones hasta llenar el lote o agotar la ventana
+            lote: List[_Operacion] = [primera]
+            limite = time.perf_counter() + self.max_delay
+            while len(lote) < self.max_batch_size:
+                restante = limite - time.perf_counter()
+                try:
+                    siguiente = (
+                        self._cola.get(timeout=restante) if restante > 0
+                        else self._cola.get_nowait()
+                    )
+                except queue.Empty:
+                    break
+                if siguiente is None:
+                    detener = True
+                    break
+                lote.append(siguiente)
+
+            self._flush(lote)
+
+    @staticmethod
+    def _ejecutar_lote(conn: sqlite3.Connection, lote: List[_Operacion]) -> List[Tuple[Future, bool, object]]:
+        resultados: List[Tuple[Future, bool, object]] = []
+        cursor = conn.cursor()
+        for funcion, args, futuro, _ in lote:
+            cursor.execute("SAVEPOINT operacion;")
+            try:
+                valor = funcion(cursor, *args)
+            except Exception as e:
+                # Solo se deshace esta operación
+                cursor.execute("ROLLBACK TO operacion;")
+                cursor.execute("RELEASE operacion;")
+                resultados.append((futuro, False, e))
+            else:
+                cursor.execute("RELEASE operacion;")
+                resultados.append((futuro, True, valor))
+        return resultados
+
+    def _flush(self, lote: List[_Operacion]) -> None:
+        try:
+            # Si la base de datos está bloqueada, el lote entero se repite
+            resultados = run_in_transaction(lambda conn: self._ejecutar_lote(conn, lote))
+        except Exception as e:
+            # Falló la transacción completa (p. ej. el COMMIT): nada se guardó
+            resultados = [(futuro, False, e) for _, _, futuro, _ in lote]
+
+        ahora = time.perf_counter()
+        esperas = [ahora - encolado for _, _, _, encolado in lote]
+        with self._stats_lock:
+            self._stats["flushes"] += 1
+            self._stats["operations"] += len(lote)
+            self._stats["max_batch_size"] = max(self._stats["max_batch_size"], len(lote))
+            self._stats["total_wait"] += sum(esperas)
+            self._stats["max_wait"] = max(self._stats["max_wait"], max(esperas))
+
+        for futuro, ok, valor in resultados:
+            if ok:
+                futuro.set_result(valor)
+            else:
+                futuro.set_exception(valor)
+
+
+# Cola activa del modo de escritura diferida (None = modo normal)
+_active: Optional[WriteQueue] = None
+_active_lock = threading.Lock()
+
+
+def enable(
+    max_batch_size: int = WRITE_BATCH_SIZE,
+    max_delay: float = WRITE_BATCH_WINDOW
+) -> WriteQueue:
+    """
+    Activa el modo de escritura diferida para add_product, update_product y
+    delete_product. Si ya estaba activo, confirma la cola anterior y la
+    sustituye por una con la nueva configuración.
+
+    Returns:
+        WriteQueue: La cola activa (para consultar sus estadísticas).
+    """
+    global _active
+    nueva = WriteQueue(max_batch_size, max_delay)
+    with _active_lock:
+        anterior, _active = _active, nueva
+    if anterior is not None:
+        anterior.close()
+    return nueva
+
+
+def disable() -> None:
+    """
+    Confirma las operaciones pendientes y vuelve al modo normal.
+    """
+    global _active
+    with _active_lock:
+        anterior, _active = _active, None
+    if anterior is not None:
+        anterior.close()
+
+
+def get_queue() -> Optional[WriteQueue]:
+    """
+    Devuelve la cola activa, o None si el modo de escritura diferida está apagado.
+    """
+    return _active
+
+
+atexit.register(disable)
@@ -5,8 +5,8 @@ import sys
 from inventory.crud import (
     add_product,
     delete_product,
-    search_product,
-    search_category,
+    iter_search_product,
+    iter_search_category,
     get_categories,
     update_product
 )
@@ -40,19 +40,20 @@ def main():
                 print("No se encontró el producto.")
         elif opción == "3":
             txt = input("Texto a buscar en nombre: ")
-            res = search_product(txt)
-            if res:
-                for p in res:
-                    print(f"{p['product_id']} | {p['category']} | {p['name']} | {p['price']}")
-            else:
+            encontrados = 0
+            # Los resultados se imprimen según llegan del cursor
+            for p in iter_search_product(txt):
+                print(f"{p['product_id']} | {p['category']} | {p['name']} | {p['price']}")
+                encontrados += 1
+            if not encontrados:
                 print("No se encontraron coincidencias.")
         elif opción == "4":
             cat = input("Categoría a buscar: ")
-            res = search_category(cat)
-            if res:
-                for p in res:
-                    print(f"{p['product_id']} | {p['name']} | {p['price']}")
-            else:
+            encontrados = 0
+            for p in iter_search_category(cat):
+                print(f"{p['product_id']} | {p['name']} | {p['price']}")
+                encontrados += 1
+            if not encontrados:
                 print("No hay productos en esa categoría o la categoría no existe.")
         elif opción == "5":
             cuentas = get_categories()
@@ -1,44 +1,193 @@
+import argparse
 import os
 import random
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import accumulate
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from inventory.db import _initialize_database
+from inventory.crud import add_category
+from inventory.categories import registry
+from inventory.models import make_product_id
+from inventory.schemas import CATEGORIAS_PREDEFINIDAS, SQL_INSERT_PRODUCT_IN_DB
+from inventory.db import run_in_transaction
+
+# Semilla por defecto: sin cambiarla, dos ejecuciones generan lo mismo
+DEFAULT_SEED: int = 42
+
+# Filas que genera cada tarea del pool. Cada bloque tiene su propia semilla,
+# derivada de la semilla global y de su número, así que el resultado no
+# depende del número de procesos (pero sí de este tamaño: no lo cambies)
+GENERATE_CHUNK_SIZE: int = 10_000
+
+# Instante del primer id generado (2024-01-01 00:00 UTC, en milisegundos);
+# cada producto avanza un milisegundo, así los ids quedan ordenados
+BASE_TIMESTAMP_MS: int = 1_704_067_200_000
+
+# Fila lista para SQL_INSERT_PRODUCT_IN_DB: (id, category_id, name, price)
+Fila = Tuple[bytes, int, str, float]
 
-from inventory.db import DB_PATH, _initialize_database
-from inventory.crud import add_product
-from inventory.schemas import CATEGORIAS_PREDEFINIDAS
-from inventory.db import get_connection
 
 def clean_products_table():
-    conn = get_connection()
-    with conn:
-        conn.execute("DELETE FROM products;")
-    conn.close()
+    run_in_transaction(lambda conn: conn.execute("DELETE FROM products;"))
+
 
-def populate_database():
+def parse_distribution(texto: str) -> Dict[str, float]:
     """
-    Elimina el fichero de base actual (si existe), vuelve a inicializar
-    el esquema (tablas y categorías), y agrega 1000 productos de prueba
-    repartidos equitativamente entre las categorías predefinidas.
+    Interpreta una distribución de categorías "bebidas=3,papelería=1" (pesos
+    relativos, no hace falta que sumen 1).
     """
+    distribucion: Dict[str, float] = {}
+    for parte in texto.split(","):
+        nombre, separador, peso = parte.partition("=")
+        if not separador or not nombre.strip():
+            raise ValueError(f"Categoría mal indicada: {parte!r} (se espera nombre=peso)")
+        distribucion[nombre.strip()] = float(peso)
+    if any(peso < 0 for peso in distribucion.values()) or sum(distribucion.values()) <= 0:
+        raise ValueError("Los pesos deben ser positivos")
+    return distribucion
+
+
+def generate_chunk(
+    seed: int,
+    numero: int,
+    inicio: int,
+    total: int,
+    categorias: Tuple[Tuple[str, int], ...],
+    pesos_acumulados: Tuple[float, ...]
+) -> Tuple[List[Fila], float]:
+    """
+    Genera el bloque 'numero' (productos inicio..inicio+total-1) con un
+    generador propio sembrado con (seed, numero). Se ejecuta en los procesos
+    del pool, así que solo recibe y devuelve datos serializables.
+
+    Returns:
+        Tuple[List[Fila], float]: Las filas y los segundos empleados.
+    """
+    comienzo = time.perf_counter()
+    rng = random.Random(f"{seed}:{numero}")
+    elegidas = rng.choices(categorias, cum_weights=pesos_acumulados, k=total)
+    filas: List[Fila] = []
+    for i, (categoria, category_id) in enumerate(elegidas, start=inicio):
+        product_id = make_product_id(BASE_TIMESTAMP_MS + i, rng.getrandbits(80))
+        # Nombre identificable y precio entre 1.0 y 100.0, con dos decimales
+        nombre = f"{categoria.capitalize()}_Producto_{i}"
+        precio = round(rng.uniform(1.0, 100.0), 2)
+        filas.append((product_id.bytes, category_id, nombre, precio))
+    return filas, time.perf_counter() - comienzo
+
+
+def _generate_in_parallel(
+    tareas: Iterable[tuple],
+    workers: int
+) -> Iterator[Tuple[List[Fila], float]]:
+    """
+    Reparte las tareas entre 'workers' procesos y devuelve los bloques en el
+    orden de las tareas. Como mucho hay 2 bloques por proceso esperando a
+    ser escritos, para no acumular en memoria todo el conjunto de datos.
+    """
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pendientes = deque()
+        for tarea in tareas:
+            pendientes.append(pool.submit(generate_chunk, *tarea))
+            if len(pendientes) >= workers * 2:
+                yield pendientes.popleft().result()
+        while pendientes:
+            yield pendientes.popleft().result()
+
+
+def populate_database(
+    total: int = 1000,
+    seed: int = DEFAULT_SEED,
+    distribution: Optional[Dict[str, float]] = None,
+    workers: Optional[int] = None
+) -> Dict[str, float]:
+    """
+    Vacía la tabla de productos, vuelve a inicializar el esquema (tablas y
+    categorías), y agrega 'total' productos de prueba generados en paralelo.
+    Los procesos del pool solo generan filas; las escribe un único escritor
+    (este proceso) por bloques, cada uno en su transacción. Con la misma
+    semilla y distribución el resultado es idéntico, ids incluidos.
+
+    Args:
+        total        (int): Número de productos a generar.
+        seed         (int): Semilla de la generación.
+        distribution (Optional[Dict[str, float]]): Peso relativo de cada
+            categoría (las que no existan se crean). Por defecto, todas
+            las predefinidas con el mismo peso.
+        workers      (Optional[int]): Procesos generadores (por defecto,
+            uno por CPU). Con 1 se genera en este mismo proceso.
+
+    Returns:
+        Dict[str, float]: "rows", "seconds", "rows_per_sec" y
+            "generate_seconds" (suma del tiempo de generación de los bloques).
+    """
+    if distribution is None:
+        distribution = {categoria: 1.0 for categoria in CATEGORIAS_PREDEFINIDAS}
+    if workers is None:
+        workers = os.cpu_count() or 1
+
     # 1. Evita borrar el archivo si ya existe
     clean_products_table()
 
     # 2. Reconstruir la base de datos (crea tablas e inserta categorías)
     _initialize_database()
+    for categoria in distribution:
+        if registry.get_id(categoria) is None:
+            add_category(categoria)
+    categorias = tuple((nombre, registry.get_id(nombre)) for nombre in distribution)
+    pesos_acumulados = tuple(accumulate(distribution.values()))
 
-    # 3. Generar 1000 productos de prueba
-    total = 1000
-    num_cats = len(CATEGORIAS_PREDEFINIDAS)
-    for i in range(total):
-        # Elegir la categoría en ciclo (0,1,2,...)
-        categoria = CATEGORIAS_PREDEFINIDAS[i % num_cats]
-        # Construir un nombre identificable
-        nombre = f"{categoria.capitalize()}_Producto_{i}"
-        # Precio aleatorio entre 1.0 y 100.0, con dos decimales
-        precio = round(random.uniform(1.0, 100.0), 2)
-        # Insertar en la base
-        add_product(categoria, nombre, precio)
+    # 3. Generar en paralelo e insertar los bloques en orden
+    tareas = [
+        (seed, numero, inicio, min(GENERATE_CHUNK_SIZE, total - inicio), categorias, pesos_acumulados)
+        for numero, inicio in enumerate(range(0, total, GENERATE_CHUNK_SIZE))
+    ]
+    if workers > 1 and len(tareas) > 1:
+        bloques = _generate_in_parallel(tareas, workers)
+    else:
+        bloques = (generate_chunk(*tarea) for tarea in tareas)
+
+    inicio = time.perf_counter()
+    generacion = 0.0
+    for filas, segundos in bloques:
+        generacion += segundos
+        run_in_transaction(lambda conn: conn.executemany(SQL_INSERT_PRODUCT_IN_DB, filas))
+    segundos = time.perf_counter() - inicio
 
-    print(f"Base de datos poblada con {total} productos.")
+    resultado = {
+        "rows": total,
+        "seconds": segundos,
+        "rows_per_sec": total / segundos if segundos else 0.0,
+        "generate_seconds": generacion,
+    }
+    print(
+        f"Base de datos poblada con {total} productos en {segundos:.2f} s "
+        f"({resultado['rows_per_sec']:.0f} filas/s; generación: {generacion:.2f} s "
+        f"repartidos entre {min(workers, max(len(tareas), 1))} procesos)."
+    )
+    return resultado
 
 
 if __name__ == "__main__":
-    populate_database()
+    parser = argparse.ArgumentParser(description="Puebla data/inventario.db con productos de prueba.")
+    parser.add_argument(
+        "rows", nargs="?", type=int, default=1000,
+        help="Número de productos a generar (por defecto 1000)."
+    )
+    parser.add_argument(
+        "--seed", type=int, default=DEFAULT_SEED,
+        help=f"Semilla; la misma semilla genera los mismos datos (por defecto {DEFAULT_SEED})."
+    )
+    parser.add_argument(
+        "--categories", type=parse_distribution, default=None,
+        help='Pesos por categoría, p. ej. "bebidas=3,papelería=1" (por defecto, uniforme).'
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None,
+        help="Procesos que generan los datos (por defecto, uno por CPU)."
+    )
+    args = parser.parse_args()
+    populate_database(args.rows, seed=args.seed, distribution=args.categories, workers=args.workers)
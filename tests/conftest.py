@@ -0,0 +1,40 @@
+import sqlite3
+import pytest
+
+from inventory import db
+
+# -------------------------------------------------------------------
+# Fixture que hace que, en cada prueba, get_connection() use un fichero
+# sqlite temporal en tmp_path, y vuelva a inicializar ese esquema limpio
+# -------------------------------------------------------------------
+
+@pytest.fixture(autouse=True)
+def use_temp_db(tmp_path, monkeypatch):
+    """
+    Sustituye `inventory.db.get_connection` (la fábrica del pool de
+    conexiones) por una función que abre la BD en tmp_path/"test.db".
+    Luego invoca db._initialize_database() para crear tablas y categorías.
+    """
+    # 1. Ruta al fichero temporal
+    temp_db_path = tmp_path / "test.db"
+
+    # 2. Definimos un get_connection alternativo que use ese fichero
+    def get_test_connection():
+        conn = sqlite3.connect(str(temp_db_path))
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    # 3. Monkey­patch: db.get_connection debe apuntar al nuevo
+    #    get_test_connection(); cerramos el pool para que no reutilice
+    #    conexiones abiertas contra otra BD
+    db.close_pool()
+    monkeypatch.setattr(db, "get_connection", get_test_connection)
+
+    # 4. Ejecutamos la inicialización del esquema sobre esa BD vacía
+    db._initialize_database()
+
+    yield
+
+    db.close_pool()
+
+    # Al salir de la prueba, tmp_path y su contenido se eliminan automáticamente
@@ -0,0 +1,81 @@
+import asyncio
+import threading
+
+from inventory import aio, crud
+
+
+def _run(corrutina):
+    """
+    Ejecuta la corrutina y detiene después los hilos de inventory.aio,
+    para que cada test empiece con conexiones nuevas.
+    """
+    async def envolver():
+        try:
+            return await corrutina
+        finally:
+            await aio.shutdown()
+    return asyncio.run(envolver())
+
+
+# ---------------------------------
+#  Tests para la API asíncrona
+# ---------------------------------
+
+def test_async_crud_roundtrip():
+    async def flujo():
+        pid = await aio.add_product("bebidas", "Horchata", 2.10)
+        assert [p["product_id"] for p in await aio.search_product("Horchata")] == [pid]
+        assert await aio.update_product(pid, None, None, 2.50) is True
+        assert (await aio.search_category("bebidas"))[0]["price"] == 2.50
+        assert (await aio.get_categories())["bebidas"] == 1
+        assert await aio.delete_product(pid) is True
+        assert await aio.search_product("Horchata") == []
+
+    _run(flujo())
+
+
+def test_concurrent_writes_use_single_writer_thread(monkeypatch):
+    hilos_escritores = set()
+    add_original = crud.add_product
+
+    def add_registrando(*args):
+        hilos_escritores.add(threading.current_thread().name)
+        return add_original(*args)
+
+    monkeypatch.setattr(crud, "add_product", add_registrando)
+
+    async def flujo():
+        escrituras = [
+            aio.add_product("electrónica", f"Sensor {i}", float(i)) for i in range(40)
+        ]
+        lecturas = [aio.get_categories() for _ in range(40)]
+        resultados = await asyncio.gather(*escrituras, *lecturas)
+        return resultados[:40]
+
+    ids = _run(flujo())
+
+    assert len(set(ids)) == 40
+    assert len(hilos_escritores) == 1
+    assert hilos_escritores.pop().startswith("inventory-writer")
+    assert crud.get_categories()["electrónica"] == 40
+
+
+def test_first_use_from_many_threads_creates_one_writer():
+    barrera = threading.Barrier(8)
+    escritores = []
+
+    def primer_uso():
+        barrera.wait()
+        escritores.append(aio._executors()[1])
+
+    hilos = [threading.Thread(target=primer_uso) for _ in range(8)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    # Ningún hilo ve el escritor a None ni uno distinto al de los demás
+    assert len(escritores) == 8
+    assert all(escritor is escritores[0] for escritor in escritores)
+    assert escritores[0] is not None
+    asyncio.run(aio.shutdown())
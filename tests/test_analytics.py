@@ -0,0 +1,36 @@
+import pytest
+
+from inventory import analytics, crud
+
+
+# ---------------------------------------------
+#  Tests para las estadísticas de precio
+# ---------------------------------------------
+
+def test_category_price_stats(tmp_path):
+    # Precios 1..100 desordenados en bebidas, uno solo en papelería
+    crud.add_products(("bebidas", f"Bebida {i}", float(i)) for i in range(100, 0, -1))
+    crud.add_product("papelería", "Lápiz", 0.5)
+
+    stats = analytics.category_price_stats(buckets=4)
+
+    bebidas = stats["bebidas"]
+    assert bebidas["count"] == 100
+    assert (bebidas["min"], bebidas["max"], bebidas["avg"]) == (1.0, 100.0, 50.5)
+    assert bebidas["median"] == pytest.approx(50.5)
+    assert bebidas["p90"] == pytest.approx(90.1)
+    assert bebidas["p99"] == pytest.approx(99.01)
+    assert [cubeta[2] for cubeta in bebidas["histogram"]] == [25, 25, 25, 25]
+    assert bebidas["histogram"][0][0] == 1.0 and bebidas["histogram"][-1][1] == 100.0
+
+    # Un solo precio: una cubeta; sin productos: sin estadísticas
+    assert stats["papelería"]["median"] == 0.5
+    assert stats["papelería"]["histogram"] == [(0.5, 0.5, 1)]
+    assert stats["electrónica"]["count"] == 0 and stats["electrónica"]["p99"] is None
+
+
+def test_category_price_stats_single_category(tmp_path):
+    crud.add_products([("bebidas", "Agua", 1.0), ("alimentación", "Pan", 2.0)])
+
+    assert list(analytics.category_price_stats("alimentación")) == ["alimentación"]
+    assert analytics.category_price_stats("juguetes") == {}
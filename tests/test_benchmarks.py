@@ -0,0 +1,46 @@
+import json
+
+from benchmarks import bench_concurrency, bench_crud
+
+
+# ------------------------------------------------------------
+#  Prueba rápida de la suite de benchmarks (catálogo diminuto)
+# ------------------------------------------------------------
+
+def test_benchmark_suite_smoke(tmp_path):
+    salida = tmp_path / "bench.json"
+    assert bench_crud.main([
+        "--sizes", "50", "--ops", "5", "--max-seconds", "0.1", "--output", str(salida)
+    ]) == 0
+
+    documento = json.loads(salida.read_text(encoding="utf-8"))
+    assert documento["meta"]["sizes"] == [50]
+    nombres = {r["benchmark"] for r in documento["results"]}
+    assert {"seed_add_products", "add_product", "get_categories", "mixed_95r_5w"} <= nombres
+    for resultado in documento["results"]:
+        assert resultado["ops_per_sec"] > 0
+
+    # Comparar un fichero consigo mismo da ratio 1
+    lineas = bench_crud.compare(documento, documento)
+    assert lineas and all("x  1.00" in linea for linea in lineas)
+
+
+def test_generate_catalog_is_deterministic():
+    primera = list(bench_crud.generate_catalog(100, seed=7))
+    segunda = list(bench_crud.generate_catalog(100, seed=7))
+    assert primera == segunda
+    assert primera != list(bench_crud.generate_catalog(100, seed=8))
+
+
+def test_concurrency_stress_smoke(tmp_path):
+    salida = tmp_path / "concurrencia.json"
+    assert bench_concurrency.main([
+        "--workers", "1,2", "--size", "200", "--seconds", "0.2", "--output", str(salida)
+    ]) == 0
+
+    documento = json.loads(salida.read_text(encoding="utf-8"))
+    resultados = {(r["mode"], r["workers"]): r for r in documento["results"]}
+    assert set(resultados) == {("threads", 1), ("threads", 2), ("processes", 1), ("processes", 2)}
+    for resultado in resultados.values():
+        assert resultado["reads"] + resultado["writes"] > 0
+        assert resultado["busy_errors"] == 0 and resultado["errors"] == 0
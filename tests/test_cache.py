@@ -0,0 +1,91 @@
+import time
+
+import pytest
+
+from inventory import cache, crud, db
+from inventory.categories import registry
+
+
+@pytest.fixture
+def read_cache():
+    cache.enable(max_entries=4, ttl=60.0)
+    cache.reset()
+    yield
+    cache.disable()
+
+
+# --------------------------------------
+#  Tests para la caché de resultados
+# --------------------------------------
+
+def test_repeated_reads_hit_the_cache(read_cache):
+    crud.add_product("bebidas", "Agua", 0.50)
+
+    primera = crud.search_product("Agua")
+    segunda = crud.search_product("Agua")
+    assert primera == segunda
+    assert crud.get_categories() == crud.get_categories()
+
+    estadisticas = cache.stats()
+    assert estadisticas["hits"] == 2 and estadisticas["misses"] == 2
+    assert estadisticas["hit_ratio"] == 0.5
+
+    # Modificar el resultado devuelto no altera lo guardado
+    segunda[0]["name"] = "otro"
+    assert crud.search_product("Agua")[0]["name"] == "Agua"
+
+
+def test_writes_invalidate_cached_results(read_cache):
+    pid = crud.add_product("bebidas", "Agua", 0.50)
+    assert crud.search_category("bebidas")[0]["price"] == 0.50
+
+    crud.update_product(pid, None, None, 0.75)
+    assert crud.search_category("bebidas")[0]["price"] == 0.75
+
+    crud.delete_product(pid)
+    assert crud.search_category("bebidas") == []
+    assert crud.get_categories()["bebidas"] == 0
+
+    crud.add_category("juguetes")
+    assert "juguetes" in crud.get_categories()
+
+
+def test_rebuilding_category_counts_invalidates_cached_results(read_cache):
+    crud.add_product("bebidas", "Agua", 0.50)
+    # Recuento descuadrado en la conexión del propio hilo (no cambia data_version)
+    with db.connection() as conn, conn:
+        conn.execute("UPDATE category_counts SET total = 99;")
+    assert crud.get_categories()["bebidas"] == 99
+
+    db.rebuild_category_counts()
+    assert db.check_category_counts() == {}
+    assert crud.get_categories()["bebidas"] == 1
+
+
+def test_changes_from_other_connections_are_detected(read_cache):
+    assert crud.search_product("Zumo") == []
+
+    # Otra conexión (como la de otro proceso) escribe directamente
+    otra = db.get_connection()
+    with otra:
+        otra.execute(
+            "INSERT INTO products VALUES ('externo', ?, 'Zumo', 1.0);",
+            (registry.get_id("bebidas"),)
+        )
+    otra.close()
+
+    assert [p["product_id"] for p in crud.search_product("Zumo")] == ["externo"]
+
+
+def test_lru_eviction_and_ttl(read_cache):
+    for i in range(6):
+        crud.search_product(f"producto {i}")
+    assert cache.stats()["entries"] == 4
+    assert cache.stats()["evictions"] == 2
+
+    cache.enable(max_entries=4, ttl=0.05)
+    cache.reset()
+    crud.get_categories()
+    time.sleep(0.1)
+    crud.get_categories()
+    assert cache.stats()["hits"] == 0 and cache.stats()["misses"] == 2
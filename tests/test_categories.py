@@ -0,0 +1,66 @@
+import sqlite3
+
+from inventory import crud
+from inventory.categories import registry
+from inventory.db import connection
+
+
+# ------------------------------------
+#  Tests para el registro de categorías
+# ------------------------------------
+
+def test_registry_serves_ids_from_memory():
+    id_bebidas = registry.get_id("bebidas")
+    assert isinstance(id_bebidas, int)
+
+    # Las búsquedas de nombres conocidos no vuelven a leer la tabla
+    consultas = []
+    with connection() as conn:
+        conn.set_trace_callback(consultas.append)
+        try:
+            assert registry.get_id("bebidas") == id_bebidas
+            # Un nombre inexistente relee la tabla como mucho una vez
+            assert registry.get_id("juguetes") is None
+            assert registry.get_id("juguetes") is None
+        finally:
+            conn.set_trace_callback(None)
+    assert sum("FROM categories" in c for c in consultas) <= 1
+
+    registry.invalidate()
+    assert registry.get_id("bebidas") == id_bebidas
+
+
+def test_registry_sees_categories_added_by_other_connections(tmp_path):
+    assert crud.add_product("bebidas", "Agua", 1.0)
+
+    # Otro proceso crea una categoría con su propia conexión
+    otra = sqlite3.connect(str(tmp_path / "test.db"))
+    with otra:
+        otra.execute("INSERT INTO categories(name) VALUES ('juguetes');")
+    otra.close()
+
+    crud.add_product("juguetes", "Peonza", 3.50)
+    assert crud.search_product("Peonza")[0]["category"] == "juguetes"
+    assert [p["name"] for p in crud.search_category("juguetes")] == ["Peonza"]
+    assert crud.get_categories()["juguetes"] == 1
+
+
+def test_resolve_falls_back_to_otros():
+    assert registry.resolve("juguetes") == registry.get_id("otros")
+    assert registry.resolve("papelería") == registry.get_id("papelería")
+
+
+def test_add_category_at_runtime():
+    # Antes de crearla, los productos de "juguetes" van a "otros"
+    crud.add_product("juguetes", "Peonza", 3.50)
+    assert crud.search_product("Peonza")[0]["category"] == "otros"
+
+    id_juguetes = crud.add_category("juguetes")
+    assert registry.get_id("juguetes") == id_juguetes
+    # Crearla otra vez devuelve el mismo id
+    assert crud.add_category("juguetes") == id_juguetes
+
+    crud.add_product("juguetes", "Yoyó", 2.00)
+    assert crud.search_product("Yoyó")[0]["category"] == "juguetes"
+    assert [p["name"] for p in crud.search_category("juguetes")] == ["Yoyó"]
+    assert crud.get_categories()["juguetes"] == 1
@@ -1,45 +1,9 @@
 import os
-import sqlite3
 import pytest
 
 from inventory import db, crud  # Añadimos import de crud aquí
 from inventory.schemas import CATEGORIAS_PREDEFINIDAS
 
-# -------------------------------------------------------------------
-# Fixture que hace que, en cada prueba, get_connection() use un fichero
-# sqlite temporal en tmp_path, y vuelva a inicializar ese esquema limpio
-# -------------------------------------------------------------------
-
-@pytest.fixture(autouse=True)
-def use_temp_db(tmp_path, monkeypatch):
-    """
-    Sustituye `inventory.db.get_connection` y `inventory.crud.get_connection`
-    por una función que abre la BD en tmp_path/"test.db". Luego invoca
-    db._initialize_database() para crear tablas y categorías.
-    """
-    # 1. Ruta al fichero temporal
-    temp_db_path = tmp_path / "test.db"
-
-    # 2. Definimos un get_connection alternativo que use ese fichero
-    def get_test_connection():
-        conn = sqlite3.connect(str(temp_db_path))
-        conn.row_factory = sqlite3.Row
-        return conn
-
-    # 3. Monkey­patch: tanto db.get_connection como crud.get_connection
-    #    deben apuntar al nuevo get_test_connection()
-    monkeypatch.setattr(db,   "get_connection", get_test_connection)
-    monkeypatch.setattr(crud, "get_connection", get_test_connection)
-
-    # 4. Ejecutamos la inicialización del esquema sobre esa BD vacía
-    db._initialize_database()
-
-    yield
-
-    # Al salir de la prueba, tmp_path y su contenido se eliminan automáticamente
-
-
-
 # -----------------------
 #  Tests para add_product
 # -----------------------
@@ -255,3 +219,363 @@ def test_bulk_insert_and_count(tmp_path):
     for cat in CATEGORIAS_PREDEFINIDAS:
         assert cuentas[cat] == 10
 
+
+
+# ----------------------------
+#  Tests para add_products
+# ----------------------------
+
+def test_add_products_from_generator_in_chunks(tmp_path):
+    """
+    add_products consume un generador por bloques, respeta el orden de
+    entrada en los ids devueltos y manda a "otros" las categorías desconocidas.
+    """
+    productos = (
+        (CATEGORIAS_PREDEFINIDAS[i % 5] if i % 7 else "juguetes", f"Bulk {i}", float(i))
+        for i in range(23)
+    )
+    ids = crud.add_products(productos, chunk_size=5)
+
+    assert len(ids) == 23
+    assert len(set(ids)) == 23
+
+    encontrados = crud.search_product("Bulk 14")
+    assert len(encontrados) == 1
+    assert encontrados[0]["product_id"] == ids[14]
+    assert encontrados[0]["category"] == "otros"
+    assert sum(crud.get_categories().values()) == 23
+
+    # Un iterable vacío no inserta nada
+    assert crud.add_products([]) == []
+
+
+# ------------------------------------------
+#  Tests para search_product en modo "fts"
+# ------------------------------------------
+
+def test_search_product_fts_prefix_and_tokens(tmp_path):
+    pid = crud.add_product("bebidas", "Café Molido Natural", 4.20)
+    crud.add_product("bebidas", "Coca-Cola", 1.20)
+    crud.add_product("papelería", "Cuaderno A5", 2.50)
+
+    # Prefijos de varias palabras, en cualquier orden y sin tildes
+    res = crud.search_product("mol caf", mode="fts")
+    assert [p["product_id"] for p in res] == [pid]
+
+    # Las palabras separadas por guion se indexan por separado
+    assert [p["name"] for p in crud.search_product("cola", mode="fts")] == ["Coca-Cola"]
+
+    # La sintaxis de FTS5 del usuario no rompe la consulta
+    assert crud.search_product('"AND (', mode="fts") == []
+
+    # El índice sigue a los UPDATE y DELETE
+    assert crud.update_product(pid, None, "Té Verde", None) is True
+    assert crud.search_product("cafe", mode="fts") == []
+    assert len(crud.search_product("verde", mode="fts")) == 1
+    assert crud.delete_product(pid) is True
+    assert crud.search_product("verde", mode="fts") == []
+
+
+def test_search_product_fts_falls_back_to_like(tmp_path):
+    crud.add_product("papelería", "Carpeta", 3.00)
+
+    # Simulamos una BD sin índice FTS5
+    with db.connection() as conn, conn:
+        for trigger in ("products_fts_ai", "products_fts_ad", "products_fts_au"):
+            conn.execute(f"DROP TRIGGER {trigger};")
+        conn.execute("DROP TABLE products_fts;")
+
+    # "arpe" no es prefijo de ninguna palabra, pero LIKE sí lo encuentra
+    assert [p["name"] for p in crud.search_product("arpe", mode="fts")] == ["Carpeta"]
+
+    # rebuild_fts_index vuelve a crear el índice con los productos existentes
+    assert db.rebuild_fts_index() is True
+    assert [p["name"] for p in crud.search_product("carp", mode="fts")] == ["Carpeta"]
+
+
+# ---------------------------------------------------
+#  Tests para iter_search_product / iter_search_category
+# ---------------------------------------------------
+
+def test_iter_search_matches_list_versions(tmp_path):
+    crud.add_products(
+        ("bebidas", f"Refresco {i}", float(i)) for i in range(12)
+    )
+    crud.add_product("papelería", "Regla", 1.00)
+
+    # Con bloques pequeños, el iterador recorre varios fetchmany
+    por_nombre = list(crud.iter_search_product("Refresco", batch_size=5))
+    assert por_nombre == crud.search_product("Refresco")
+    assert len(por_nombre) == 12
+
+    por_categoria = list(crud.iter_search_category("bebidas", batch_size=5))
+    assert por_categoria == crud.search_category("bebidas")
+
+    assert list(crud.iter_search_category("juguetes")) == []
+    assert list(crud.iter_search_product("InexistenteXYZ")) == []
+
+
+def test_iter_search_releases_connection_when_closed(tmp_path):
+    crud.add_products(("bebidas", f"Zumo {i}", 1.0) for i in range(10))
+
+    iterador = crud.iter_search_category("bebidas", batch_size=2)
+    primero = next(iterador)
+    assert primero["category"] == "bebidas"
+
+    # Mientras está a medias, la conexión sigue prestada (con la lectura abierta)
+    with db.connection():
+        assert db._pool._local.estado.depth == 2
+    iterador.close()
+    assert db._pool._local.estado.depth == 0
+
+    # Y se puede seguir escribiendo con normalidad
+    assert crud.delete_product(primero["product_id"]) is True
+
+
+# ------------------------------------------------------
+#  Tests para search_product_page / search_category_page
+# ------------------------------------------------------
+
+def _todas_las_paginas(funcion, *args, **kwargs):
+    paginas = []
+    cursor = None
+    while True:
+        pagina, cursor = funcion(*args, cursor=cursor, **kwargs)
+        paginas.append(pagina)
+        if cursor is None:
+            return paginas
+
+
+def test_search_category_page_keyset_order(tmp_path):
+    # Precios repetidos para comprobar que el id desempata de forma estable
+    crud.add_products(
+        ("bebidas", f"Bebida {i:02d}", float(i % 4)) for i in range(11)
+    )
+    crud.add_product("papelería", "Grapadora", 7.00)
+
+    for order_by in ("name", "price", "id"):
+        for descending in (False, True):
+            paginas = _todas_las_paginas(
+                crud.search_category_page, "bebidas",
+                page_size=4, order_by=order_by, descending=descending
+            )
+            assert [len(p) for p in paginas] == [4, 4, 3]
+
+            filas = [producto for pagina in paginas for producto in pagina]
+            clave = "product_id" if order_by == "id" else order_by
+            esperado = sorted(
+                crud.search_category("bebidas"),
+                key=lambda p: (p[clave], p["product_id"]),
+                reverse=descending
+            )
+            assert filas == esperado
+
+    assert crud.search_category_page("juguetes") == ([], None)
+
+
+def test_search_product_page_and_cursor_validation(tmp_path):
+    crud.add_products(("alimentación", f"Galleta {i}", 1.0 + i) for i in range(5))
+    crud.add_product("bebidas", "Agua", 0.50)
+
+    paginas = _todas_las_paginas(
+        crud.search_product_page, "Galleta", page_size=2, order_by="price", descending=True
+    )
+    precios = [p["price"] for pagina in paginas for p in pagina]
+    assert precios == [5.0, 4.0, 3.0, 2.0, 1.0]
+
+    # Mismo resultado usando el índice FTS5
+    paginas_fts = _todas_las_paginas(
+        crud.search_product_page, "gall", page_size=2, order_by="price",
+        descending=True, mode="fts"
+    )
+    assert paginas_fts == paginas
+
+    # Una página exacta no deja un cursor a una página vacía
+    pagina, cursor = crud.search_product_page("Galleta", page_size=5)
+    assert len(pagina) == 5 and cursor is None
+
+    # Un cursor de otra ordenación se rechaza
+    _, cursor = crud.search_product_page("Galleta", page_size=2, order_by="name")
+    with pytest.raises(ValueError):
+        crud.search_product_page("Galleta", page_size=2, cursor=cursor, order_by="price")
+    with pytest.raises(ValueError):
+        crud.search_product_page("Galleta", order_by="category")
+
+
+# ------------------------------------------------------
+#  Tests para search_price_range / top_products_by_price
+# ------------------------------------------------------
+
+def test_search_price_range(tmp_path):
+    crud.add_products(("bebidas", f"Bebida {i:02d}", float(i % 10)) for i in range(20))
+    crud.add_product("papelería", "Lápiz", 5.0)
+
+    productos = crud.search_price_range("bebidas", 3, 5)
+    assert [p["price"] for p in productos] == [3.0, 3.0, 4.0, 4.0, 5.0, 5.0]
+    assert {p["category"] for p in productos} == {"bebidas"}
+    # A igual precio, el id desempata
+    assert productos == sorted(productos, key=lambda p: (p["price"], p["product_id"]))
+
+    caros = crud.search_price_range("bebidas", min_price=8, descending=True, compact=True)
+    assert [p.price for p in caros] == [9.0, 9.0, 8.0, 8.0]
+    assert caros == sorted(caros, key=lambda p: (p.price, p.product_id), reverse=True)
+    assert len(crud.search_price_range("bebidas", max_price=1, limit=3)) == 3
+    assert crud.search_price_range("bebidas") == sorted(
+        crud.search_category("bebidas"), key=lambda p: (p["price"], p["product_id"])
+    )
+    assert crud.search_price_range("juguetes") == []
+    with pytest.raises(ValueError):
+        crud.search_price_range("bebidas", limit=0)
+
+
+def test_top_products_by_price(tmp_path):
+    crud.add_products(("bebidas", f"Bebida {i}", float(i)) for i in range(10))
+    crud.add_products(("papelería", f"Lápiz {i}", 0.5 + i) for i in range(2))
+
+    baratos = crud.top_products_by_price(3)
+    assert list(baratos) == sorted(crud.get_categories())
+    assert [p["price"] for p in baratos["bebidas"]] == [0.0, 1.0, 2.0]
+    assert [p["name"] for p in baratos["papelería"]] == ["Lápiz 0", "Lápiz 1"]
+    assert baratos["otros"] == []
+
+    caros = crud.top_products_by_price(2, descending=True, category="bebidas", compact=True)
+    assert list(caros) == ["bebidas"]
+    assert [(p.category, p.price) for p in caros["bebidas"]] == [("bebidas", 9.0), ("bebidas", 8.0)]
+    assert crud.top_products_by_price(category="juguetes") == {}
+
+    # Solo se leen las n primeras entradas del índice de cada categoría
+    planes = db.explain_query_plans()
+    for nombre in ("SQL_TOP_PRODUCTS_BY_PRICE", "SQL_SEARCH_PRODUCTS_BY_PRICE_RANGE"):
+        assert any("idx_products_category_price" in linea for linea in planes[nombre])
+        assert not any(linea.strip().startswith("SCAN p") or "SCAN products" in linea
+                       for linea in planes[nombre])
+
+
+# -----------------------------------------
+#  Tests para los resultados compactos
+# -----------------------------------------
+
+def test_compact_results_match_dicts(tmp_path):
+    from inventory.models import Product
+
+    crud.add_products(("alimentación", f"Galleta {i}", 1.0 + i) for i in range(5))
+    crud.add_product("bebidas", "Galleta líquida", 0.50)
+
+    compactos = crud.search_product("Galleta", compact=True)
+    assert all(isinstance(p, Product) for p in compactos)
+    assert [p.as_dict() for p in compactos] == crud.search_product("Galleta")
+
+    compactos = crud.search_category("alimentación", compact=True)
+    assert compactos[0].category == "alimentación"
+    assert [p.as_dict() for p in compactos] == crud.search_category("alimentación")
+    assert [p.as_dict() for p in crud.iter_search_category("alimentación", compact=True)] == \
+        crud.search_category("alimentación")
+    assert [p.as_dict() for p in crud.iter_search_product("Galleta", compact=True)] == \
+        crud.search_product("Galleta")
+
+    # La paginación funciona igual con registros compactos
+    pagina, cursor = crud.search_category_page(
+        "alimentación", page_size=3, order_by="price", compact=True
+    )
+    siguiente, _ = crud.search_category_page(
+        "alimentación", page_size=3, order_by="price", cursor=cursor, compact=True
+    )
+    assert [p.price for p in pagina + siguiente] == [1.0, 2.0, 3.0, 4.0, 5.0]
+
+
+def test_product_ids_are_time_ordered_and_stored_compact(tmp_path):
+    ids = crud.add_products(("bebidas", f"Agua {i}", 1.0) for i in range(3))
+    ids.append(crud.add_product("bebidas", "Agua 3", 1.0))
+
+    # La API sigue devolviendo cadenas UUID (versión 7, ordenadas por tiempo)
+    assert all(len(pid) == 36 and pid[14] == "7" for pid in ids)
+    assert [pid[:13] for pid in ids] == sorted(pid[:13] for pid in ids)
+
+    # En la base de datos se guardan como 16 bytes
+    with db.connection() as conn:
+        tipos = conn.execute("SELECT DISTINCT typeof(id), length(id) FROM products;").fetchall()
+    assert [tuple(t) for t in tipos] == [("blob", 16)]
+
+    assert crud.update_product(ids[0], None, None, 2.0)
+    assert crud.search_product("Agua 0")[0]["product_id"] == ids[0]
+    assert crud.delete_product(ids[0])
+
+
+# ---------------------------------------
+#  Tests para las operaciones masivas
+# ---------------------------------------
+
+def test_reprice_products_by_category_and_range(tmp_path):
+    crud.add_products([
+        ("bebidas", "Agua", 1.00), ("bebidas", "Zumo", 2.00),
+        ("bebidas", "Vino", 10.00), ("alimentación", "Pan", 1.00),
+    ])
+
+    assert crud.reprice_products(percent=5, category="bebidas") == 3
+    precios = {p["name"]: p["price"] for p in crud.search_product("")}
+    assert precios == {"Agua": 1.05, "Zumo": 2.1, "Vino": 10.5, "Pan": 1.0}
+
+    assert crud.reprice_products(amount=-0.5, category="bebidas", max_price=3) == 2
+    assert crud.search_product("Agua")[0]["price"] == 0.55
+
+    # El precio nunca baja de 0, y una categoría inexistente no toca nada
+    assert crud.reprice_products(amount=-100, min_price=10) == 1
+    assert crud.search_product("Vino")[0]["price"] == 0.0
+    assert crud.reprice_products(percent=10, category="juguetes") == 0
+
+    with pytest.raises(ValueError):
+        crud.reprice_products(percent=5, amount=1)
+
+
+def test_reassign_products(tmp_path):
+    ids = crud.add_products([("bebidas", f"Producto {i}", float(i)) for i in range(6)])
+
+    assert crud.reassign_products("alimentación", category="bebidas", min_price=4) == 2
+    assert crud.reassign_products("electrónica", product_ids=ids[:2]) == 2
+    # Los que ya están en la categoría destino no cuentan
+    assert crud.reassign_products("electrónica", product_ids=ids[:3]) == 1
+    assert crud.get_categories() == {
+        "alimentación": 2, "bebidas": 1, "electrónica": 3, "otros": 0, "papelería": 0,
+    }
+
+
+def test_delete_products_in_chunks(tmp_path):
+    ids = crud.add_products(("bebidas", f"Producto {i}", 1.0) for i in range(25))
+
+    # Ids repartidos en varios bloques, con uno que no existe
+    assert crud.delete_products(ids[:10] + ["no-existe"], chunk_size=3) == 10
+    assert crud.delete_products(category="bebidas", min_price=2) == 0
+    assert crud.delete_products(category="bebidas") == 15
+    assert crud.search_product("Producto") == []
+
+    with pytest.raises(ValueError):
+        crud.delete_products()
+
+
+# ----------------------------
+#  Tests para update_products
+# ----------------------------
+
+def test_update_products_groups_patches_and_reports_each_id(tmp_path):
+    ids = crud.add_products([("bebidas", f"Producto {i}", 1.0) for i in range(5)])
+
+    resultado = crud.update_products([
+        (ids[0], None, None, 2.0),                 # solo precio
+        (ids[1], None, None, 3.0),                 # solo precio (mismo grupo)
+        (ids[2], "alimentación", "Pan", None),     # categoría y nombre
+        (ids[3], None, None, None),                # nada que cambiar
+        ("no-existe", None, "Fantasma", None),     # id inexistente
+        (ids[0], None, "Producto cero", None),     # segundo patch del mismo id
+    ], chunk_size=1)
+
+    assert resultado == {
+        ids[0]: True, ids[1]: True, ids[2]: True, ids[3]: False, "no-existe": False,
+    }
+    productos = {p["product_id"]: p for p in crud.search_product("")}
+    assert productos[ids[0]]["name"] == "Producto cero" and productos[ids[0]]["price"] == 2.0
+    assert productos[ids[1]]["price"] == 3.0
+    assert productos[ids[2]]["category"] == "alimentación" and productos[ids[2]]["name"] == "Pan"
+    assert productos[ids[4]]["price"] == 1.0
+    assert crud.get_categories()["alimentación"] == 1
+    # El índice FTS5 sigue el cambio de nombre
+    assert [p["name"] for p in crud.search_product("pan", mode="fts")] == ["Pan"]
@@ -0,0 +1,287 @@
+import os
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from inventory import crud, db, migrations
+
+
+# ------------------------------------
+#  Tests para el pool de conexiones
+# ------------------------------------
+
+def test_pool_reuses_connection_in_same_thread():
+    with db.connection() as conn1:
+        pass
+    with db.connection() as conn2:
+        pass
+    assert conn1 is conn2
+
+    # Las PRAGMAs de rendimiento se aplicaron al abrirla
+    with db.connection() as conn:
+        modo = conn.execute("PRAGMA journal_mode;").fetchone()[0]
+    assert modo.lower() == "wal"
+
+
+def test_pool_gives_each_thread_its_own_connection():
+    with db.connection() as principal:
+        pass
+
+    conexiones = []
+
+    def trabajador():
+        with db.connection() as conn:
+            conexiones.append(conn)
+
+    hilo = threading.Thread(target=trabajador)
+    hilo.start()
+    hilo.join()
+
+    assert len(conexiones) == 1
+    assert conexiones[0] is not principal
+
+
+def test_pool_closes_connection_when_thread_ends():
+    with db.connection():
+        pass
+    inicial = db._pool.size()
+    descriptores = len(os.listdir("/proc/self/fd")) if os.path.isdir("/proc/self/fd") else None
+
+    def trabajador():
+        with db.connection() as conn:
+            conn.execute("SELECT 1;")
+
+    for _ in range(300):
+        hilo = threading.Thread(target=trabajador)
+        hilo.start()
+        hilo.join()
+
+    # Cada hilo de vida corta se lleva su conexión (y sus ficheros) al terminar
+    assert db._pool.size() == inicial
+    if descriptores is not None:
+        assert len(os.listdir("/proc/self/fd")) <= descriptores + 2
+    # La del hilo principal sigue abierta y en uso
+    with db.connection() as conn:
+        assert conn.execute("SELECT 1;").fetchone()[0] == 1
+
+
+def test_close_pool_reopens_on_next_use():
+    with db.connection() as conn1:
+        pass
+    db.close_pool()
+    with db.connection() as conn2:
+        # La nueva conexión funciona con normalidad
+        assert conn2.execute("SELECT COUNT(*) FROM categories;").fetchone()[0] == 5
+    assert conn1 is not conn2
+
+
+def test_release_rolls_back_unfinished_transaction():
+    with db.connection() as conn:
+        conn.execute("INSERT INTO categories(name) VALUES ('temporal');")
+        # Uso anidado: no debe deshacer la transacción del nivel exterior
+        with db.connection() as anidada:
+            assert anidada.in_transaction
+        assert conn.in_transaction
+
+    with db.connection() as conn:
+        assert not conn.in_transaction
+        fila = conn.execute(
+            "SELECT 1 FROM categories WHERE name = 'temporal';"
+        ).fetchone()
+    assert fila is None
+
+
+# ------------------------------------------------
+#  Tests para la tabla category_counts (triggers)
+# ------------------------------------------------
+
+def test_category_counts_follow_writes():
+    pid = crud.add_product("bebidas", "Limonada", 1.10)
+    crud.add_products([("bebidas", "Tónica", 1.30), ("papelería", "Goma", 0.20)])
+    assert crud.get_categories()["bebidas"] == 2
+
+    # Cambiar de categoría resta en la antigua y suma en la nueva
+    assert crud.update_product(pid, "alimentación", None, None) is True
+    # Cambiar solo el precio no toca los recuentos
+    assert crud.update_product(pid, None, None, 2.00) is True
+    cuentas = crud.get_categories()
+    assert cuentas["bebidas"] == 1
+    assert cuentas["alimentación"] == 1
+
+    assert crud.delete_product(pid) is True
+    assert crud.get_categories()["alimentación"] == 0
+    assert db.check_category_counts() == {}
+
+
+def test_check_and_rebuild_category_counts():
+    crud.add_products(("electrónica", f"Cable {i}", 3.0) for i in range(4))
+
+    # Descuadramos el recuento a propósito
+    with db.connection() as conn, conn:
+        conn.execute("UPDATE category_counts SET total = 99;")
+
+    descuadres = db.check_category_counts()
+    assert descuadres["electrónica"] == (99, 4)
+
+    db.rebuild_category_counts()
+    assert db.check_category_counts() == {}
+    assert crud.get_categories()["electrónica"] == 4
+
+
+# ------------------------------------
+#  Tests para la inicialización perezosa
+# ------------------------------------
+
+def test_import_does_not_touch_database(record_property):
+    # En un proceso nuevo, importar todo el paquete no abre ninguna conexión
+    codigo = (
+        "import sqlite3, time\n"
+        "def prohibido(*args, **kwargs):\n"
+        "    raise AssertionError('conexión abierta al importar')\n"
+        "sqlite3.connect = prohibido\n"
+        "inicio = time.perf_counter()\n"
+        "import inventory.crud, inventory.aio, inventory.analytics, inventory.snapshot\n"
+        "import inventory.transfer, inventory.__main__\n"
+        "print(time.perf_counter() - inicio)\n"
+    )
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    resultado = subprocess.run(
+        [sys.executable, "-c", codigo], cwd=raiz, capture_output=True, text=True
+    )
+    assert resultado.returncode == 0, resultado.stderr
+
+    # Tiempo de arranque en frío (import de todos los módulos), para seguirlo
+    record_property("cold_import_ms", float(resultado.stdout) * 1000)
+
+
+def test_initialization_is_skipped_when_schema_is_current(monkeypatch):
+    sentencias = []
+
+    def trazar(conn):
+        conn.set_trace_callback(sentencias.append)
+
+    monkeypatch.setattr(db, "_connect_hooks", db._connect_hooks + [trazar])
+    db.close_pool()
+
+    inicio = time.perf_counter()
+    assert crud.get_categories()["bebidas"] == 0
+    primer_uso = time.perf_counter() - inicio
+
+    # Solo se lee la versión guardada: ni DDL ni transacciones de escritura
+    assert not [s for s in sentencias if s.split()[0].upper() in ("CREATE", "INSERT", "BEGIN")]
+    assert any("user_version" in s for s in sentencias)
+    assert primer_uso < 1.0
+
+
+def test_initialization_does_not_need_write_lock(tmp_path):
+    # Otro proceso con la base de datos bloqueada para escritura
+    otra = sqlite3.connect(str(tmp_path / "test.db"))
+    otra.execute("BEGIN IMMEDIATE;")
+    try:
+        db.close_pool()
+        inicio = time.perf_counter()
+        db._initialize_database()
+        assert time.perf_counter() - inicio < 1.0
+        assert "bebidas" in crud.get_categories()
+    finally:
+        otra.rollback()
+        otra.close()
+
+
+def test_initialization_creates_and_migrates_new_database(tmp_path, monkeypatch):
+    ruta = tmp_path / "nueva.db"
+
+    def conexion_nueva():
+        conn = sqlite3.connect(str(ruta))
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    db.close_pool()
+    monkeypatch.setattr(db, "get_connection", conexion_nueva)
+    assert not ruta.exists()
+
+    assert crud.get_categories()["otros"] == 0
+    with db.connection() as conn:
+        assert migrations.get_schema_version(conn) == migrations.SCHEMA_VERSION
+
+
+# ----------------------------------------------
+#  Tests para los bloqueos entre varios escritores
+# ----------------------------------------------
+
+def _bloquear_escritura(tmp_path):
+    # Otro proceso con la base de datos bloqueada para escritura
+    otra = sqlite3.connect(str(tmp_path / "test.db"), check_same_thread=False)
+    otra.execute("BEGIN IMMEDIATE;")
+    return otra
+
+
+def test_write_retries_until_lock_is_released(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "LOCK_RETRIES", 50)
+    monkeypatch.setattr(db, "LOCK_BACKOFF_MAX", 0.02)
+    monkeypatch.setitem(db.SQLITE_PRAGMAS, "busy_timeout", 0)
+    db.close_pool()
+    db.reset_lock_stats()
+
+    otra = _bloquear_escritura(tmp_path)
+    liberar = threading.Timer(0.2, otra.rollback)
+    liberar.start()
+    try:
+        product_id = crud.add_product("bebidas", "Agua", 1.0)
+    finally:
+        liberar.join()
+        otra.close()
+
+    assert crud.search_product("Agua")[0]["product_id"] == product_id
+    assert db.lock_stats()["retries"] > 0
+    assert db.lock_stats()["busy_errors"] == 0
+
+
+def test_write_raises_busy_error_after_retries(tmp_path):
+    product_id = crud.add_product("bebidas", "Agua", 1.0)
+    anteriores = (db.SQLITE_PRAGMAS["busy_timeout"], db.LOCK_RETRIES, db.LOCK_BACKOFF_BASE)
+    db.configure_locking(busy_timeout_ms=10, retries=2, backoff_base=0.001)
+    db.reset_lock_stats()
+
+    otra = _bloquear_escritura(tmp_path)
+    try:
+        with pytest.raises(db.DatabaseBusyError, match="bloqueada tras 3 intentos"):
+            crud.update_product(product_id, None, None, 2.0)
+        # Sigue siendo un RuntimeError para el código que ya lo capturaba
+        with pytest.raises(RuntimeError):
+            crud.add_category("nueva")
+    finally:
+        otra.rollback()
+        otra.close()
+        db.configure_locking(*anteriores)
+
+    assert db.lock_stats() == {"retries": 4, "busy_errors": 2}
+    # Nada quedó a medias: la conexión del pool vuelve a escribir con normalidad
+    assert crud.add_category("nueva") > 0
+
+
+def test_maintenance_writes_raise_busy_error(tmp_path):
+    from inventory import snapshot
+
+    anteriores = (db.SQLITE_PRAGMAS["busy_timeout"], db.LOCK_RETRIES, db.LOCK_BACKOFF_BASE)
+    db.configure_locking(busy_timeout_ms=10, retries=1, backoff_base=0.001)
+    copia = snapshot.CatalogSnapshot()
+
+    otra = _bloquear_escritura(tmp_path)
+    try:
+        for rutina in (db.rebuild_category_counts, db.rebuild_fts_index,
+                       snapshot.drop_change_log, copia.refresh):
+            with pytest.raises(db.DatabaseBusyError):
+                rutina()
+    finally:
+        otra.rollback()
+        otra.close()
+        db.configure_locking(*anteriores)
+        copia.close()
+
+    db.rebuild_category_counts()
+    assert copia.refresh()["mode"] == "full"
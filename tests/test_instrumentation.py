@@ -0,0 +1,69 @@
+import io
+
+import pytest
+
+from inventory import crud, instrumentation
+
+
+@pytest.fixture
+def instrumentacion():
+    instrumentation.reset()
+    instrumentation.enable(slow_query_threshold=0.0)
+    yield
+    instrumentation.disable()
+    instrumentation.reset()
+
+
+# ------------------------------------
+#  Tests para la instrumentación
+# ------------------------------------
+
+def test_counts_queries_and_returned_items_per_function(instrumentacion):
+    crud.add_products(("bebidas", f"Batido {i}", 2.0) for i in range(3))
+    crud.search_product("Batido")
+    crud.search_product("Batido")
+    list(crud.iter_search_category("bebidas"))
+
+    stats = instrumentation.stats()
+    assert stats["search_product"]["calls"] == 2
+    assert stats["search_product"]["queries"] == 2
+    assert stats["search_product"]["returned"] == 6
+    assert stats["iter_search_category"]["returned"] == 3
+    # Cada alta cuenta como fila modificada (más las de los triggers)
+    assert stats["add_products"]["changes"] >= 3
+    assert stats["add_products"]["total_time"] >= stats["add_products"]["max_time"] > 0
+
+
+def test_returned_counts_what_the_caller_gets(instrumentacion):
+    pid = crud.add_product("bebidas", "Agua", 1.0)
+    crud.delete_product(pid)
+
+    stats = instrumentation.stats()
+    # El id devuelto cuenta como un elemento; el booleano, como ninguno
+    assert stats["add_product"]["returned"] == 1
+    assert stats["delete_product"]["returned"] == 0
+    # BEGIN IMMEDIATE, el INSERT y COMMIT, como mínimo
+    assert stats["add_product"]["queries"] >= 3
+
+
+def test_slow_query_log_records_sql_and_call_site(instrumentacion):
+    crud.get_categories()
+
+    lentas = instrumentation.slow_queries()
+    entrada = next(e for e in lentas if e["function"] == "get_categories")
+    assert "category_counts" in entrada["sql"]
+    assert entrada["call_site"].startswith(__file__)
+
+    salida = io.StringIO()
+    instrumentation.dump_stats(salida)
+    texto = salida.getvalue()
+    assert "get_categories" in texto and "Consultas lentas" in texto
+
+
+def test_disabled_instrumentation_records_nothing():
+    instrumentation.reset()
+    assert not instrumentation.is_enabled()
+
+    crud.add_product("otros", "Nada", 1.0)
+    assert instrumentation.stats() == {}
+    assert instrumentation.slow_queries() == []
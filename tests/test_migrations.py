@@ -0,0 +1,137 @@
+import sqlite3
+
+from inventory import db, migrations
+from inventory.schemas import SQL_CREATE_TABLE_CATEGORIES, SQL_CREATE_TABLE_PRODUCTS
+
+
+def _indices(conn):
+    filas = conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'products';"
+    ).fetchall()
+    return {fila[0] for fila in filas}
+
+
+# ----------------------------
+#  Tests para las migraciones
+# ----------------------------
+
+def test_new_database_is_at_latest_version():
+    with db.connection() as conn:
+        assert migrations.get_schema_version(conn) == migrations.SCHEMA_VERSION
+        assert {"idx_products_category_name", "idx_products_name"} <= _indices(conn)
+        # Volver a migrar no hace nada
+        assert migrations.migrate(conn) == []
+
+
+def test_migrate_existing_database_in_place(tmp_path):
+    # Base de datos con el esquema original (versión 0) y datos
+    conn = sqlite3.connect(str(tmp_path / "antigua.db"))
+    conn.execute(SQL_CREATE_TABLE_CATEGORIES)
+    conn.execute(SQL_CREATE_TABLE_PRODUCTS)
+    conn.execute("INSERT INTO categories(name) VALUES ('bebidas');")
+    conn.execute("INSERT INTO products VALUES ('p1', 1, 'Agua Mineral', 0.5);")
+    conn.commit()
+    assert migrations.get_schema_version(conn) == 0
+
+    # Primero solo hasta la versión 1
+    aplicadas = migrations.migrate(conn, target=1)
+    assert [m.version for m in aplicadas] == [1]
+    assert migrations.get_schema_version(conn) == 1
+    assert "idx_products_category_id" in _indices(conn)
+    assert "idx_products_name" not in _indices(conn)
+
+    # Después, el resto
+    aplicadas = migrations.migrate(conn)
+    assert [m.version for m in aplicadas] == list(range(2, migrations.SCHEMA_VERSION + 1))
+    assert "idx_products_name" in _indices(conn)
+
+    # El índice FTS5 se rellenó con el producto que ya existía
+    fila = conn.execute(
+        "SELECT rowid FROM products_fts WHERE products_fts MATCH 'mineral';"
+    ).fetchone()
+    assert fila is not None
+    conn.close()
+
+
+def test_failed_migration_is_rolled_back(monkeypatch):
+    def falla(cursor):
+        cursor.execute("CREATE TABLE a_medias (x INTEGER);")
+        raise sqlite3.OperationalError("fallo simulado")
+
+    version = migrations.SCHEMA_VERSION
+    monkeypatch.setattr(
+        migrations, "MIGRATIONS",
+        migrations.MIGRATIONS + [migrations.Migration(version + 1, "rota", falla)]
+    )
+
+    with db.connection() as conn:
+        try:
+            migrations.migrate(conn, target=version + 1)
+        except sqlite3.OperationalError:
+            pass
+        assert migrations.get_schema_version(conn) == version
+        existe = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'a_medias';"
+        ).fetchone()
+        assert existe is None
+
+
+def test_explain_query_plans_uses_category_index():
+    planes = db.explain_query_plans()
+    assert "SQL_SEARCH_PRODUCTS_BY_CATEGORY" in planes
+    assert any(
+        "USING INDEX idx_products_category" in linea
+        for linea in planes["SQL_SEARCH_PRODUCTS_BY_CATEGORY"]
+    )
+
+
+def test_explain_query_plans_covers_templates():
+    planes = db.explain_query_plans()
+    sin_plan = [nombre for nombre, lineas in planes.items()
+                if lineas and lineas[0].startswith("(sin plan")]
+    assert sin_plan == []
+
+    # Las plantillas de UPDATE localizan cada fila por su clave primaria
+    for nombre in ("SQL_UPDATE_PRODUCT_RETURNING", "SQL_UPDATE_PRODUCTS_FROM_VALUES"):
+        assert any("sqlite_autoindex_products_1" in linea or "PRIMARY KEY" in linea
+                   for linea in planes[nombre]), planes[nombre]
+    # El refresco de la copia en memoria lee las filas cambiadas por rowid
+    assert any("INTEGER PRIMARY KEY (rowid=?)" in linea
+               for linea in planes["SQL_SNAPSHOT_PRODUCTS_BY_ROWID"]), planes["SQL_SNAPSHOT_PRODUCTS_BY_ROWID"]
+
+    # La tabla temporal de la migración no queda detrás
+    with db.connection() as conn:
+        assert conn.execute(
+            "SELECT 1 FROM sqlite_temp_master WHERE name = 'products_compact';"
+        ).fetchone() is None
+
+
+def test_compact_ids_migration_keeps_rows_and_indexes(tmp_path):
+    # Base de datos en la versión 6, con ids TEXT: un uuid4 y uno arbitrario
+    conn = sqlite3.connect(str(tmp_path / "v6.db"))
+    conn.execute(SQL_CREATE_TABLE_CATEGORIES)
+    conn.execute(SQL_CREATE_TABLE_PRODUCTS)
+    conn.execute("INSERT INTO categories(name) VALUES ('bebidas');")
+    conn.commit()
+    migrations.migrate(conn, target=6)
+    uuid_texto = "0b7e4a8e-52c9-4f3a-9d5e-2f1c3b4a5d6e"
+    conn.execute("INSERT INTO products VALUES (?, 1, 'Agua Mineral', 0.5);", (uuid_texto,))
+    conn.execute("INSERT INTO products VALUES ('legado-1', 1, 'Zumo', 1.0);")
+    conn.commit()
+
+    assert [m.version for m in migrations.migrate(conn, target=7)] == [7]
+
+    filas = conn.execute("SELECT rowid, typeof(id), id FROM products ORDER BY rowid;").fetchall()
+    assert filas == [
+        (1, "blob", bytes.fromhex(uuid_texto.replace("-", ""))),
+        (2, "text", "legado-1"),
+    ]
+    # Índices, recuentos y FTS siguen funcionando sobre la tabla nueva
+    assert "idx_products_category_price" in _indices(conn)
+    conn.execute("INSERT INTO products VALUES (x'00', 1, 'Agua con gas', 0.7);")
+    assert conn.execute("SELECT total FROM category_counts;").fetchone()[0] == 3
+    encontrados = conn.execute(
+        "SELECT rowid FROM products_fts WHERE products_fts MATCH 'agua' ORDER BY rowid;"
+    ).fetchall()
+    assert [fila[0] for fila in encontrados] == [1, 3]
+    conn.close()
@@ -0,0 +1,112 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from inventory import crud, db, mirror
+
+
+@pytest.fixture(autouse=True)
+def desactivar_replica():
+    mirror.reset()
+    yield
+    mirror.disable()
+
+
+def _escribir_en_fichero(tmp_path, sql, parametros=()):
+    # Escritura desde otra conexión al fichero (como haría otro proceso)
+    conn = sqlite3.connect(str(tmp_path / "test.db"))
+    with conn:
+        conn.execute(sql, parametros)
+    conn.close()
+
+
+# ---------------------------------------------
+#  Tests para la réplica en memoria
+# ---------------------------------------------
+
+def test_mirror_serves_reads_from_memory(tmp_path):
+    crud.add_products([("bebidas", "Agua", 1.0), ("papelería", "Lápiz", 0.5)])
+    mirror.enable(refresh_interval=None)
+
+    with db.connection() as conn:
+        ficheros = [fila[2] for fila in conn.execute("PRAGMA database_list;")]
+    assert ficheros == [""]  # base de datos en memoria
+
+    assert [p["name"] for p in crud.search_category("bebidas")] == ["Agua"]
+    assert crud.search_product("Lápiz", mode="fts")[0]["category"] == "papelería"
+    assert crud.get_categories()["papelería"] == 1
+    assert mirror.stats()["bytes"] > 0
+
+    # Las escrituras no se aceptan mientras la réplica está activa
+    with pytest.raises(RuntimeError):
+        crud.add_product("bebidas", "Zumo", 2.0)
+
+    mirror.disable()
+    with db.connection() as conn:
+        ficheros = [fila[2] for fila in conn.execute("PRAGMA database_list;")]
+    assert ficheros[0].endswith("test.db")
+    crud.add_product("bebidas", "Zumo", 2.0)
+
+
+def test_mirror_refresh_on_demand(tmp_path):
+    crud.add_product("bebidas", "Agua", 1.0)
+    mirror.enable(refresh_interval=None)
+
+    # Sin cambios en el fichero no se vuelve a copiar
+    assert mirror.refresh() is False
+
+    _escribir_en_fichero(tmp_path, "UPDATE products SET name = 'Agua con gas';")
+    _escribir_en_fichero(tmp_path, "INSERT INTO categories(name) VALUES ('juguetes');")
+    assert [p["name"] for p in crud.search_category("bebidas")] == ["Agua"]
+
+    assert mirror.refresh() is True
+    assert [p["name"] for p in crud.search_category("bebidas")] == ["Agua con gas"]
+    assert "juguetes" in crud.get_categories()
+    assert mirror.stats()["refreshes"] == 2
+
+
+def test_mirror_refreshes_periodically(tmp_path, monkeypatch):
+    def conexion_compartible():
+        conn = sqlite3.connect(str(tmp_path / "test.db"), check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    monkeypatch.setattr(db, "get_connection", conexion_compartible)
+    crud.add_product("bebidas", "Agua", 1.0)
+    mirror.enable(refresh_interval=0.02)
+
+    _escribir_en_fichero(tmp_path, "DELETE FROM products;")
+    limite = time.monotonic() + 5
+    while crud.search_category("bebidas") and time.monotonic() < limite:
+        time.sleep(0.01)
+    assert crud.search_category("bebidas") == []
+
+
+def test_mirror_swap_does_not_interrupt_readers(tmp_path):
+    crud.add_products(("bebidas", f"Bebida {i}", 1.0) for i in range(200))
+    mirror.enable(refresh_interval=None)
+    errores = []
+    parar = threading.Event()
+
+    def lector():
+        try:
+            while not parar.is_set():
+                # Cada lectura ve una copia completa: 200 o 201 productos
+                assert len(crud.search_category("bebidas")) in (200, 201)
+        except Exception as e:
+            errores.append(e)
+
+    hilos = [threading.Thread(target=lector) for _ in range(3)]
+    for hilo in hilos:
+        hilo.start()
+    _escribir_en_fichero(tmp_path, "INSERT INTO products VALUES (x'01', 2, 'Nueva', 1.0);")
+    for _ in range(5):
+        mirror.refresh(force=True)
+    parar.set()
+    for hilo in hilos:
+        hilo.join()
+
+    assert errores == []
+    assert len(crud.search_category("bebidas")) == 201
@@ -0,0 +1,50 @@
+import pytest
+
+import populate_db
+from inventory import crud
+from inventory.db import connection
+
+
+def _volcado():
+    with connection() as conn:
+        return [tuple(fila) for fila in conn.execute(
+            "SELECT rowid, id, category_id, name, price FROM products ORDER BY rowid;"
+        )]
+
+
+# ---------------------------------------------
+#  Tests para el generador de datos de prueba
+# ---------------------------------------------
+
+def test_populate_is_deterministic(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(populate_db, "GENERATE_CHUNK_SIZE", 100)
+
+    resultado = populate_db.populate_database(350, seed=7, workers=1)
+    assert resultado["rows"] == 350
+    assert "350 productos" in capsys.readouterr().out
+    primero = _volcado()
+    assert len(primero) == 350
+
+    # Misma semilla, en paralelo: mismo conjunto de datos, ids incluidos
+    populate_db.populate_database(350, seed=7, workers=2)
+    assert _volcado() == primero
+
+    populate_db.populate_database(350, seed=8, workers=1)
+    assert _volcado() != primero
+
+
+def test_populate_distribution(tmp_path, monkeypatch):
+    monkeypatch.setattr(populate_db, "GENERATE_CHUNK_SIZE", 100)
+    distribucion = populate_db.parse_distribution("bebidas=3, juguetes=1")
+    assert distribucion == {"bebidas": 3.0, "juguetes": 1.0}
+
+    populate_db.populate_database(400, distribution=distribucion, workers=1)
+
+    # La categoría que no existía se crea; el resto no recibe productos
+    recuentos = crud.get_categories()
+    assert recuentos["bebidas"] + recuentos["juguetes"] == 400
+    assert 250 < recuentos["bebidas"] < 350
+    assert recuentos["papelería"] == 0
+
+    with pytest.raises(ValueError):
+        populate_db.parse_distribution("bebidas")
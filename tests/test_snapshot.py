@@ -0,0 +1,141 @@
+from inventory import crud, db, snapshot
+from inventory.models import Product
+
+
+def _contenido(copia):
+    return sorted(copia.select())
+
+
+def _recargada():
+    copia = snapshot.CatalogSnapshot()
+    resultado = _contenido(copia)
+    copia.close()
+    return resultado
+
+
+# ---------------------------------------------
+#  Tests para la copia en memoria del catálogo
+# ---------------------------------------------
+
+def test_snapshot_filters(tmp_path):
+    crud.add_products(("bebidas", f"Bebida {i}", float(i)) for i in range(20, 0, -1))
+    crud.add_product("papelería", "Lápiz", 0.5)
+    copia = snapshot.CatalogSnapshot()
+
+    assert len(copia) == 21
+    assert copia.count("bebidas", min_price=5, max_price=10) == 6
+    assert copia.count(max_price=1.0) == 2
+    assert copia.count("juguetes") == 0
+
+    resumen = copia.price_summary("bebidas", min_price=5, max_price=10)
+    assert resumen == {"count": 6, "sum": 45.0, "min": 5.0, "max": 10.0, "avg": 7.5}
+    assert copia.price_summary(min_price=1000)["avg"] is None
+
+    productos = copia.select("bebidas", max_price=3)
+    assert [p.price for p in productos] == [1.0, 2.0, 3.0]
+    assert isinstance(productos[0], Product) and productos[0].name == "Bebida 1"
+    assert len(copia.select(limit=4)) == 4
+
+    # Mismo resultado que las búsquedas de crud
+    assert sorted(copia.select("bebidas")) == sorted(crud.search_category("bebidas", compact=True))
+
+
+def test_snapshot_incremental_refresh(tmp_path):
+    crud.add_products(("bebidas", f"Bebida {i}", float(i)) for i in range(10))
+    copia = snapshot.CatalogSnapshot()
+    assert len(copia) == 10
+
+    nuevo = crud.add_product("bebidas", "Zumo", 2.5)
+    assert copia.count("bebidas", 2.5, 2.5) == 1
+
+    crud.update_product(nuevo, "alimentación", "Pan", 0.25)
+    assert copia.select("alimentación") == [Product(nuevo, "alimentación", "Pan", 0.25)]
+    assert copia.count("bebidas", 2.5, 2.5) == 0
+
+    crud.delete_product(nuevo)
+    assert copia.count("alimentación") == 0
+
+    # Una sola carga completa; el resto, cambios aplicados uno a uno
+    stats = copia.stats()
+    assert stats["full_loads"] == 1
+    assert stats["refreshes"] == 3 and stats["changes"] == 3
+    assert _contenido(copia) == _recargada()
+
+
+def test_snapshot_bulk_refresh(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot, "REBUILD_THRESHOLD", 4)
+    crud.add_products(("bebidas", f"Bebida {i}", float(i)) for i in range(50))
+    copia = snapshot.CatalogSnapshot()
+    len(copia)
+
+    # Muchos cambios en una categoría: se reconstruyen sus columnas
+    crud.reprice_products(percent=-50, category="bebidas", min_price=10)
+    crud.reassign_products("papelería", category="bebidas", max_price=5)
+    crud.add_products(("bebidas", f"Nueva {i}", 7.5) for i in range(10))
+
+    assert copia.refresh()["mode"] == "incremental"
+    assert copia.stats()["full_loads"] == 1
+    assert _contenido(copia) == _recargada()
+    assert [p.price for p in copia.select("bebidas")] == sorted(p.price for p in copia.select("bebidas"))
+
+
+def test_snapshot_name_pool_stays_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot, "NAME_POOL_MIN_DEAD", 8)
+    ids = crud.add_products(("bebidas", f"Bebida {i}", float(i)) for i in range(20))
+    copia = snapshot.CatalogSnapshot()
+    len(copia)
+
+    # Cada ronda renombra todos los productos: los nombres anteriores quedan sin uso
+    for ronda in range(10):
+        for i, product_id in enumerate(ids):
+            crud.update_product(product_id, None, f"Ronda {ronda} - {i}", None)
+        assert len(copia) == 20
+        stats = copia.stats()
+        assert stats["names"] - stats["unused_names"] == 20
+        assert stats["names"] <= 2 * 20 + 8
+
+    assert copia.stats()["full_loads"] == 1
+    assert _contenido(copia) == _recargada()
+    assert {p.name for p in copia.select()} == {f"Ronda 9 - {i}" for i in range(20)}
+
+
+def test_snapshot_without_auto_refresh(tmp_path):
+    crud.add_product("bebidas", "Agua", 1.0)
+    copia = snapshot.CatalogSnapshot(auto_refresh=False)
+    assert len(copia) == 1
+
+    crud.add_product("bebidas", "Zumo", 2.0)
+    assert len(copia) == 1
+    assert copia.refresh() == {"mode": "incremental", "changes": 1}
+    assert len(copia) == 2
+    assert copia.refresh() == {"mode": "none", "changes": 0}
+
+
+def test_snapshot_reloads_when_changes_are_lost(tmp_path):
+    crud.add_product("bebidas", "Agua", 1.0)
+    copia = snapshot.CatalogSnapshot(auto_refresh=False)
+    len(copia)
+
+    # Cambios que ya no están en el registro (p. ej. por superar su tamaño)
+    crud.add_product("bebidas", "Zumo", 2.0)
+    crud.add_product("bebidas", "Leche", 3.0)
+    with db.connection() as conn:
+        with conn:
+            conn.execute("DELETE FROM product_changes WHERE seq = 2;")
+
+    assert copia.refresh()["mode"] == "full"
+    assert len(copia) == 3
+
+
+def test_drop_change_log(tmp_path):
+    crud.add_product("bebidas", "Agua", 1.0)
+    copia = snapshot.CatalogSnapshot(auto_refresh=False)
+    len(copia)
+
+    snapshot.drop_change_log()
+    crud.add_product("bebidas", "Zumo", 2.0)
+    # Sin registro, la copia lo detecta, recarga y vuelve a crear los triggers
+    assert copia.refresh()["mode"] == "full"
+    crud.add_product("bebidas", "Leche", 3.0)
+    assert copia.refresh() == {"mode": "incremental", "changes": 1}
+    assert len(copia) == 3
@@ -0,0 +1,102 @@
+import json
+
+import pytest
+
+from inventory import crud, db, transfer
+from inventory.db import connection
+
+
+# ----------------------------------------------
+#  Tests para la importación/exportación masiva
+# ----------------------------------------------
+
+def test_export_import_roundtrip(tmp_path):
+    ids = crud.add_products([
+        ("bebidas", "Agua", 0.5),
+        ("alimentación", "Patatas, fritas", 1.25),
+        ("electrónica", "Cable \"USB\"", 0.99),
+    ])
+
+    for formato in transfer.FORMATOS:
+        destino = tmp_path / f"catalogo.{formato}"
+        resultado = transfer.export_products(str(destino))
+        assert resultado["rows"] == 3
+
+        # Importamos sobre una base de datos vacía: mismos ids y datos
+        for pid in ids:
+            crud.delete_product(pid)
+        resultado = transfer.import_products(str(destino))
+        assert resultado["rows"] == 3 and resultado["skipped"] == 0
+
+        productos = {p["product_id"]: p for p in crud.search_product("")}
+        assert set(productos) == set(ids)
+        assert productos[ids[1]]["name"] == "Patatas, fritas"
+        assert productos[ids[2]]["category"] == "electrónica"
+
+
+def test_export_by_category_to_jsonl(tmp_path):
+    crud.add_products([("bebidas", "Agua", 0.5), ("alimentación", "Pipas", 1.0)])
+    destino = tmp_path / "bebidas.jsonl"
+
+    resultado = transfer.export_products(str(destino), category="bebidas")
+    assert resultado["rows"] == 1
+    fila = json.loads(destino.read_text(encoding="utf-8"))
+    assert fila["name"] == "Agua" and fila["category"] == "bebidas"
+
+
+def test_export_unknown_category_leaves_file_untouched(tmp_path):
+    destino = tmp_path / "juguetes.csv"
+    destino.write_text("contenido previo\n", encoding="utf-8")
+
+    with pytest.raises(ValueError, match="juguetes"):
+        transfer.export_products(str(destino), category="juguetes")
+    assert destino.read_text(encoding="utf-8") == "contenido previo\n"
+
+    with pytest.raises(ValueError):
+        transfer.export_products(str(tmp_path / "nuevo.csv"), category="juguetes")
+    assert not (tmp_path / "nuevo.csv").exists()
+
+
+def test_export_queries_stream_without_sorting():
+    # Sin B-tree temporal: las filas salen del índice sin cargar antes la categoría
+    planes = db.explain_query_plans()
+    for nombre in ("SQL_EXPORT_PRODUCTS", "SQL_EXPORT_PRODUCTS_BY_CATEGORY"):
+        assert not any("TEMP B-TREE" in linea for linea in planes[nombre]), planes[nombre]
+    assert any(
+        "idx_products_category_product_id" in linea
+        for linea in planes["SQL_EXPORT_PRODUCTS_BY_CATEGORY"]
+    )
+
+
+def test_import_unknown_category_goes_to_otros(tmp_path):
+    origen = tmp_path / "nuevos.csv"
+    origen.write_text("category,name,price\njuguetes,Peonza,3.5\n", encoding="utf-8")
+
+    transfer.import_products(str(origen))
+    producto = crud.search_product("Peonza")[0]
+    assert producto["category"] == "otros"
+    assert producto["product_id"]
+
+
+def test_interrupted_import_resumes(tmp_path):
+    origen = tmp_path / "grande.csv"
+    lineas = ["category,name,price"] + [f"bebidas,Producto {i},{i}.0" for i in range(10)]
+    origen.write_text("\n".join(lineas) + "\n", encoding="utf-8")
+
+    # Simulamos una interrupción tras confirmar el segundo bloque
+    def interrumpir(hechas):
+        if hechas == 4:
+            raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        transfer.import_products(str(origen), chunk_size=2, progress=interrumpir)
+    assert len(crud.search_product("Producto")) == 4
+
+    # La segunda ejecución continúa por la fila 5 sin duplicar
+    resultado = transfer.import_products(str(origen), chunk_size=2)
+    assert resultado["skipped"] == 4 and resultado["rows"] == 6
+    assert len(crud.search_product("Producto")) == 10
+
+    # Al terminar no queda progreso guardado
+    with connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM import_progress;").fetchone()[0] == 0
@@ -0,0 +1,130 @@
+import threading
+from concurrent.futures import Future
+
+import pytest
+
+from inventory import crud, writequeue
+
+
+@pytest.fixture
+def write_behind():
+    """
+    Activa el modo de escritura diferida durante el test.
+    """
+    cola = writequeue.enable(max_batch_size=16, max_delay=0.05)
+    yield cola
+    writequeue.disable()
+
+
+# ------------------------------------------
+#  Tests para la cola de escritura agrupada
+# ------------------------------------------
+
+def test_concurrent_writes_are_grouped(write_behind):
+    ids = []
+    lock = threading.Lock()
+
+    def productor(n):
+        pid = crud.add_product("bebidas", f"Lote {n}", float(n))
+        with lock:
+            ids.append(pid)
+
+    hilos = [threading.Thread(target=productor, args=(n,)) for n in range(32)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    # Cada llamada recibe su propio id y todas quedan guardadas
+    assert len(set(ids)) == 32
+    assert crud.get_categories()["bebidas"] == 32
+
+    stats = write_behind.stats()
+    assert stats["operations"] == 32
+    # Varias escrituras compartieron transacción
+    assert stats["flushes"] < 32
+    assert 1 < stats["max_batch_size"] <= 16
+    assert stats["max_wait"] >= stats["avg_wait"] > 0
+
+
+def test_write_behind_returns_per_call_results(write_behind):
+    pid = crud.add_product("papelería", "Tijeras", 4.00)
+
+    assert crud.update_product(pid, None, None, 4.50) is True
+    assert crud.update_product("no-existe", None, None, 1.00) is False
+    assert crud.update_product(pid, None, None, None) is False
+    assert crud.delete_product(pid) is True
+    assert crud.delete_product(pid) is False
+
+
+def test_failed_operation_does_not_spoil_the_batch(write_behind):
+    resultados = {}
+
+    def valido():
+        resultados["valido"] = crud.add_product("bebidas", "Agua", 0.50)
+
+    def invalido():
+        try:
+            # name NOT NULL: esta operación falla dentro del lote
+            crud.add_product("bebidas", None, 1.00)
+        except RuntimeError as e:
+            resultados["error"] = e
+
+    hilos = [threading.Thread(target=valido), threading.Thread(target=invalido)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert isinstance(resultados["error"], RuntimeError)
+    assert [p["product_id"] for p in crud.search_product("Agua")] == [resultados["valido"]]
+
+
+def test_disable_returns_to_direct_writes():
+    cola = writequeue.enable(max_batch_size=4, max_delay=0.01)
+    crud.add_product("otros", "Cosa", 1.00)
+    writequeue.disable()
+
+    assert writequeue.get_queue() is None
+    crud.add_product("otros", "Otra cosa", 1.00)
+    assert cola.stats()["operations"] == 1
+    assert crud.get_categories()["otros"] == 2
+
+
+def test_submit_racing_close_never_hangs():
+    cola = writequeue.WriteQueue(max_batch_size=4, max_delay=0.001)
+    futuros = []
+    parar = threading.Event()
+
+    def productor():
+        while not parar.is_set():
+            try:
+                futuros.append(cola.submit(lambda cursor: 1))
+            except RuntimeError:
+                return
+
+    hilos = [threading.Thread(target=productor) for _ in range(4)]
+    for hilo in hilos:
+        hilo.start()
+    cola.close()
+    parar.set()
+    for hilo in hilos:
+        hilo.join()
+
+    # Todo lo aceptado antes del cierre se resolvió
+    assert futuros and all(f.result(timeout=5) == 1 for f in futuros)
+    with pytest.raises(RuntimeError, match="detenida"):
+        cola.submit(lambda cursor: 1)
+
+
+def test_leftover_operations_fail_when_writer_stops():
+    cola = writequeue.WriteQueue()
+    futuro = Future()
+    # Una operación que quedase tras el None de close() no se queda esperando
+    with cola._cierre_lock:
+        cola._cola.put(None)
+        cola._cola.put((lambda cursor: 1, (), futuro, 0.0))
+    cola._hilo.join(timeout=5)
+
+    with pytest.raises(RuntimeError, match="detenida"):
+        futuro.result(timeout=5)